@@ -19,6 +19,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Directory holding the Rossmann train.csv / store.csv used by the management commands
+ROSSMANN_DATA_DIR = os.environ.get('ROSSMANN_DATA_DIR', 'C:/Users/laxmi/Downloads/rossman_sales')
+
+# Per-store columnar cache of train.csv built by forecast_sales (rebuilt when the source file changes)
+FORECAST_DATA_CACHE_DIR = os.path.join(BASE_DIR, 'forecast_data_cache')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -129,3 +135,13 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Cache for rendered sales dashboard figures, keyed on the sales data version
+# BACKEND: 'locmem' (per process), 'file' (LOCATION directory, default MEDIA_ROOT/figure_cache)
+# or 'django' (LOCATION is an alias in CACHES)
+
+DASHBOARD_FIGURE_CACHE = {
+    'BACKEND': 'locmem',
+    'MAX_ENTRIES': 64,
+}
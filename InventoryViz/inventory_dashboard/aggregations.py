@@ -0,0 +1,174 @@
+# inventory_dashboard/aggregations.py
+
+import math
+import pandas as pd
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Window
+from django.db.models.functions import Cast, Floor, RowNumber
+from .models import DailyStoreTypeSales, Sales
+
+CUBE_COLUMNS = ['date', 'promo', 'store_type', 'total_sales', 'row_count']
+
+
+def _cube_frame(rows):
+    cube = pd.DataFrame(list(rows), columns=CUBE_COLUMNS)
+    cube['date'] = pd.to_datetime(cube['date'])
+    cube['total_sales'] = cube['total_sales'].astype(float)
+    cube['row_count'] = cube['row_count'].astype(int)
+    return cube
+
+
+def build_sales_cube(queryset=None):
+    """
+    Aggregates Sales in a single grouped scan into a compact
+    date x promo x store type cube (a few thousand rows for the full data set).
+    """
+    if queryset is None:
+        queryset = Sales.objects.all()
+
+    rows = queryset.values_list('date', 'promo', 'store__store_type') \
+                   .annotate(total_sales=Sum('sales'), row_count=Count('id')) \
+                   .order_by()
+    return _cube_frame(rows)
+
+
+def load_sales_cube():
+    """
+    Reads the same cube from the DailyStoreTypeSales rollup table instead of scanning Sales.
+    Falls back to the scan while the rollup is empty but Sales is not (e.g. before a rebuild).
+    """
+    rows = DailyStoreTypeSales.objects.values_list('date', 'promo', 'store_type', 'total_sales', 'row_count')
+    if not rows.exists() and Sales.objects.exists():
+        return build_sales_cube()
+    return _cube_frame(rows)
+
+
+def _month_names(months):
+    return pd.to_datetime(months, format='%m').dt.strftime('%b')
+
+
+def dashboard_series(cube):
+    """
+    Derives every rollup the sales dashboard plots from the sales cube.
+    Averages are computed as sum / row count so they match Avg('sales') over raw rows.
+    """
+    cube = cube.assign(year=cube['date'].dt.year, month=cube['date'].dt.month, day=cube['date'].dt.day)
+
+    # 1. Daily totals + 7-day moving average
+    daily = cube.groupby('date', as_index=False)['total_sales'].sum().sort_values('date')
+    daily['moving_avg'] = daily['total_sales'].rolling(window=7).mean()
+
+    # 2. Totals with/without promotion
+    promo = cube.groupby('promo', as_index=False)['total_sales'].sum().sort_values('promo')
+    promo['promo'] = promo['promo'].astype(int)
+
+    # 3. Year x month totals
+    monthly = cube.groupby(['year', 'month'], as_index=False)['total_sales'].sum().sort_values(['year', 'month'])
+    monthly['month_name'] = _month_names(monthly['month'])
+
+    # 4. Average sales per store type
+    by_type = cube.groupby('store_type', as_index=False)[['total_sales', 'row_count']].sum().sort_values('store_type')
+    by_type['avg_sales'] = by_type['total_sales'] / by_type['row_count']
+    by_type = by_type.rename(columns={'store_type': 'store__store_type'})[['store__store_type', 'avg_sales']]
+
+    # 6. Yearly totals
+    yearly = cube.groupby('year', as_index=False)['total_sales'].sum().sort_values('year')
+
+    # 7. Average sales per calendar month
+    monthly_avg = cube.groupby('month', as_index=False)[['total_sales', 'row_count']].sum().sort_values('month')
+    monthly_avg['avg_sales'] = monthly_avg['total_sales'] / monthly_avg['row_count']
+    monthly_avg['month_name'] = _month_names(monthly_avg['month'])
+    monthly_avg = monthly_avg[['month', 'avg_sales', 'month_name']]
+
+    # 8. Day-of-month x month totals
+    day_month = cube.groupby(['day', 'month'], as_index=False)['total_sales'].sum().sort_values(['month', 'day'])
+
+    return {
+        'daily': daily.reset_index(drop=True),
+        'promo': promo.reset_index(drop=True),
+        'monthly': monthly.reset_index(drop=True),
+        'by_store_type': by_type.reset_index(drop=True),
+        'yearly': yearly.reset_index(drop=True),
+        'monthly_avg': monthly_avg.reset_index(drop=True),
+        'day_month': day_month.reset_index(drop=True),
+    }
+
+
+def _sales_at_ranks(sales, ranks):
+    """
+    Sales values at the given 0-based ranks, in one query: the rows are numbered in sales order
+    (ROW_NUMBER over the sales index) and only the requested ranks are returned.
+    """
+    numbered = sales.annotate(rank=Window(RowNumber(), order_by=F('sales').asc())) \
+                    .filter(rank__in=[rank + 1 for rank in ranks]) \
+                    .values_list('rank', 'sales')
+    return {rank - 1: float(value) for rank, value in numbered}
+
+
+def _sales_quantiles(sales, n, quantiles):
+    # Linear interpolation between closest ranks, same as numpy.quantile's default
+    positions = [(n - 1) * q for q in quantiles]
+    ranks = {math.floor(position) for position in positions} | {math.ceil(position) for position in positions}
+    values = _sales_at_ranks(sales, ranks)
+    return [
+        values[math.floor(position)]
+        + (position - math.floor(position)) * (values[math.ceil(position)] - values[math.floor(position)])
+        for position in positions
+    ]
+
+
+def sales_distribution(bins=30, outlier_limit=100):
+    """
+    Histogram counts and box plot statistics for Sales.sales, computed in SQL.
+
+    Only ever returns `bins` counts, five box statistics and at most
+    `outlier_limit` outlier values, so memory and payload do not grow with the table.
+    Six queries whatever the size of the table; the quartiles take one ordered pass over the
+    sales index. Returns None when there are no sales.
+    """
+    sales = Sales.objects.all()
+    summary = sales.aggregate(n=Count('id'), low=Min('sales'), high=Max('sales'))
+    n = summary['n']
+    if not n:
+        return None
+
+    low, high = float(summary['low']), float(summary['high'])
+    width = (high - low) / bins or 1.0
+
+    # Equal-width bins over [low, high]; the maximum lands in bucket == bins and is folded into the last bin
+    buckets = sales.annotate(bucket=Floor((Cast('sales', FloatField()) - low) / width)) \
+                   .values_list('bucket') \
+                   .annotate(count=Count('id')) \
+                   .order_by()
+    counts = [0] * bins
+    for bucket, count in buckets:
+        counts[min(int(bucket), bins - 1)] += count
+    edges = [low + i * width for i in range(bins + 1)]
+
+    q1, median, q3 = _sales_quantiles(sales, n, (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    lower_limit, upper_limit = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    # Whiskers end at the most extreme observations inside 1.5 IQR, as in Plotly/matplotlib box plots
+    fences = sales.aggregate(
+        lowerfence=Min('sales', filter=Q(sales__gte=lower_limit)),
+        upperfence=Max('sales', filter=Q(sales__lte=upper_limit)),
+        outlier_count=Count('id', filter=Q(sales__lt=lower_limit) | Q(sales__gt=upper_limit)),
+    )
+
+    # Most extreme outliers on each side, read straight off the sales index
+    half = outlier_limit // 2
+    high_outliers = sales.filter(sales__gt=upper_limit).order_by('-sales').values_list('sales', flat=True)[:outlier_limit - half]
+    low_outliers = sales.filter(sales__lt=lower_limit).order_by('sales').values_list('sales', flat=True)[:half]
+
+    return {
+        'n': n,
+        'edges': edges,
+        'counts': counts,
+        'q1': q1,
+        'median': median,
+        'q3': q3,
+        'lowerfence': float(fences['lowerfence']),
+        'upperfence': float(fences['upperfence']),
+        'outlier_count': fences['outlier_count'],
+        'outliers': [float(v) for v in low_outliers] + [float(v) for v in high_outliers],
+    }
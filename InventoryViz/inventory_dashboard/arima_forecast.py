@@ -1,95 +1,356 @@
-from django.conf import settings
+import abc
+import contextlib
 import pandas as pd
 import numpy as np
 import os
-import matplotlib.pyplot as plt
+import signal
+import time
 from statsmodels.tsa.arima.model import ARIMA
 from sklearn.metrics import mean_squared_error
 from statsmodels.tools.eval_measures import rmse
 from pmdarima import auto_arima
+from .ingest import read_table
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-def load_and_preprocess_data(data_path):
-    train = pd.read_csv(f'{data_path}/train.csv', parse_dates=['Date'], dayfirst=False, low_memory=False)
-    store = pd.read_csv(f'{data_path}/store.csv')
+def load_and_preprocess_data(train_source, store_source):
+    # Sources may be CSV (optionally compressed), Parquet or '-' for stdin, see ingest.read_table
+    train = read_table(train_source, parse_dates=['Date'], dtype={'StateHoliday': 'string'})
+    store = read_table(store_source)
     merged_data = pd.merge(train, store, on='Store', how='left')
     return merged_data
 
 def preprocess_store_data(store_data):
-    store_data.set_index('Date', inplace=True)
-    store_data = store_data[store_data['Open'] == 1]
-    store_data.index = pd.to_datetime(store_data.index)
-    store_data = store_data.asfreq('D')
-    store_data['Sales'] = store_data['Sales'].ffill()
-    store_data[['Promo', 'StateHoliday', 'SchoolHoliday']] = store_data[['Promo', 'StateHoliday', 'SchoolHoliday']].ffill()
-    store_data = store_data[['Sales', 'Promo', 'StateHoliday', 'SchoolHoliday']]
+    # Open days on a daily calendar; closed days are forward-filled from the last open day
+    open_days = store_data[store_data['Open'] == 1]
+    open_days = open_days.set_index(pd.DatetimeIndex(open_days['Date']))[['Sales', 'Promo', 'StateHoliday', 'SchoolHoliday']]
+    store_data = open_days.asfreq('D').ffill()
     store_data = store_data.replace([np.inf, -np.inf], np.nan).dropna()
     return store_data
 
 
-def evaluate_arima_model(train, test, train_exog, test_exog):
-    train_log = np.log1p(train)
+FORECAST_HORIZON_DAYS = 30
+
+# A stored order is reused until its holdout RMSE is this much worse than when it was fitted
+RMSE_DEGRADATION_TOLERANCE = 0.10
+
+
+def search_arima_order(train_log, train_exog):
     best_arima = auto_arima(train_log, seasonal=False, stepwise=True, trace=False, exogenous=train_exog)
-    model = ARIMA(train_log, order=best_arima.order, exog=train_exog)
-    model_fit = model.fit()
-    forecast_log = model_fit.forecast(steps=len(test), exog=test_exog)
-    forecast = np.expm1(forecast_log)
-    #error = rmse(test, forecast)
-    error = np.sqrt(np.mean((np.array(test) - np.array(forecast))**2))
-    print(f"Best ARIMA Model: {best_arima.order} with RMSE: {error:.2f}")
-    return model_fit, forecast, error
-
-def forecast_next_30_days(model_fit, train_series, exog_df, log_transformed=True):
+    return tuple(best_arima.order)
+
+
+def fit_arima(train_log, train_exog, order, start_params=None):
+    model = ARIMA(train_log, order=order, exog=train_exog)
+    # Parameters from a model with different exog columns can't seed this one
+    if start_params is not None and len(start_params) != len(model.param_names):
+        start_params = None
+    return model.fit(start_params=start_params)
+
+
+def evaluate_arima_model(train, test, train_exog, test_exog, prior=None, rmse_tolerance=RMSE_DEGRADATION_TOLERANCE):
+    """
+    Fits ARIMA on log sales and scores the forecast on the holdout.
+
+    prior is a stored model state ({'order', 'params', 'rmse'}, rmse being the holdout RMSE when
+    the order was selected). When given, its order is refit warm-started from its parameters and
+    the auto_arima search only runs if the holdout RMSE is more than rmse_tolerance worse.
+    Returns the fitted model, holdout forecast, RMSE and whether an order search ran.
+    """
+    train_log = np.log1p(train)
+
+    def score(model_fit):
+        forecast = np.expm1(model_fit.forecast(steps=len(test), exog=test_exog))
+        return forecast, np.sqrt(np.mean((np.array(test) - np.array(forecast))**2))
+
+    if prior is not None:
+        model_fit = fit_arima(train_log, train_exog, tuple(prior['order']), start_params=prior['params'])
+        forecast, error = score(model_fit)
+        if error <= prior['rmse'] * (1 + rmse_tolerance):
+            print(f"Reused ARIMA Model: {model_fit.model.order} with RMSE: {error:.2f}")
+            return model_fit, forecast, error, False
+
+    model_fit = fit_arima(train_log, train_exog, search_arima_order(train_log, train_exog))
+    forecast, error = score(model_fit)
+    print(f"Best ARIMA Model: {model_fit.model.order} with RMSE: {error:.2f}")
+    return model_fit, forecast, error, True
+
+
+def model_state(model_fit, error, searched):
+    """Picklable summary of a fitted model, persisted as ArimaModelState by the caller."""
+    return {
+        'order': list(model_fit.model.order),
+        'params': [float(value) for value in np.asarray(model_fit.params)],
+        'param_names': list(model_fit.model.param_names),
+        'rmse': float(error),
+        'searched': searched,
+    }
+
+def forecast_next_days(model_fit, train_series, exog_df, horizon=FORECAST_HORIZON_DAYS, log_transformed=True):
     last_date = train_series.index[-1]
-    forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=30)
+    forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=horizon)
     exog_forecast = prepare_future_exog(exog_df, forecast_dates)
-    forecast_log = model_fit.forecast(steps=30, exog=exog_forecast)
+    forecast_log = model_fit.forecast(steps=horizon, exog=exog_forecast)
     forecast = np.expm1(forecast_log) if log_transformed else forecast_log
-    forecast_df = pd.DataFrame({'Forecasted Sales': forecast.values}, index=forecast_dates)
+    forecast_df = pd.DataFrame({'Forecasted Sales': np.asarray(forecast)}, index=forecast_dates)
     return forecast_df
 
-def plot_forecast(test, forecast, best_rmse, forecast_30_days=None, store_id=None):
-    plt.figure(figsize=(12, 6))
-    plt.plot(test.index, test, label='Actual Sales', color='blue')
-    plt.plot(test.index, forecast, label='Predicted Sales', color='red')
+def prepare_future_exog(exog_df, forecast_dates):
+    # The last known exog row held constant over the horizon, repeated as one array
+    last_known = exog_df.to_numpy()[-1:]
+    return pd.DataFrame(np.repeat(last_known, len(forecast_dates), axis=0),
+                        index=forecast_dates, columns=exog_df.columns)
 
-    if forecast_30_days is not None:
-        plt.plot(forecast_30_days.index, forecast_30_days['Forecasted Sales'], label='30-Day Forecast', color='green', linestyle='--')
+EXOG_FEATURES = ["Promo", "StateHoliday", "SchoolHoliday"]
+STATE_HOLIDAY_CODES = {"0": 0, "a": 1, "b": 2, "c": 3}
 
-    plt.title(f'Store {store_id} - ARIMA Sales Forecast (RMSE: {best_rmse:.2f})')
-    plt.xlabel('Date')
-    plt.ylabel('Sales')
-    plt.legend()
-    #plt.tight_layout()
-    #plt.savefig(f"arima_forecast_store_{store_id}.png")
-    #plt.close()
 
-    save_dir = os.path.join(settings.MEDIA_ROOT, 'forecast_plots')
-    os.makedirs(save_dir, exist_ok=True)
+def encode_exog(store_data):
+    """The exogenous regressors of a preprocessed store frame as numbers."""
+    exog = store_data[EXOG_FEATURES].copy()
+    exog["StateHoliday"] = exog["StateHoliday"].map(STATE_HOLIDAY_CODES).fillna(0).astype(float)
+    return exog
 
-    # Save the plot
-    plot_path = os.path.join(save_dir, f'store_{store_id}_forecast.png')
-    plt.savefig(plot_path)
-    plt.close()
 
+def split_store_data(store_data, train_fraction=0.8):
+    """80/20 holdout split of a preprocessed store frame into sales and numeric exog."""
+    train_size = int(len(store_data) * train_fraction)
+    train, test = store_data['Sales'][:train_size], store_data['Sales'][train_size:]
 
-def prepare_future_exog(exog_df, forecast_dates):
-    last_known = exog_df.iloc[-1]
-    future_exog = pd.DataFrame([last_known] * len(forecast_dates), index=forecast_dates)
-    return future_exog
+    # Encode once, then slice both halves out of the same frame
+    exog = encode_exog(store_data)
+    return train, test, exog[:train_size], exog[train_size:]
+
+
+class StoreTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise StoreTimeout()
+
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    Raises StoreTimeout in the block once seconds have passed (no limit when falsy). Relies on
+    SIGALRM, so it only works in a process's main thread and is not enforced on Windows.
+    """
+    if not seconds or not hasattr(signal, 'setitimer'):
+        yield
+        return
+    previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def forecast_store(store_id, store_df, timeout=None, prior=None, rmse_tolerance=RMSE_DEGRADATION_TOLERANCE,
+                   horizon=FORECAST_HORIZON_DAYS):
+    """
+    Fits and forecasts one store without touching the database, so it can run in a worker process.
+
+    Returns a dict with 'status' ('completed', 'failed' or 'timeout'), the holdout series,
+    the 'future_forecast' over the next horizon days, RMSE and the fitted 'model_state'.
+    prior is the store's stored model state to warm-start from (see evaluate_arima_model).
+    Errors are captured in 'error' instead of raised, so one bad store never takes down a
+    batch. The timeout relies on SIGALRM and is not enforced on platforms without it (Windows).
+    """
+    started = time.perf_counter()
+    result = {'store_id': store_id, 'status': 'failed', 'rmse': None, 'error': None}
+
+    try:
+        with time_limit(timeout):
+            if store_df.empty:
+                result['error'] = f"No data for Store {store_id}."
+                return result
+
+            store_data = preprocess_store_data(store_df)
+            if store_data.empty or store_data['Sales'].isnull().all():
+                result['error'] = f"Insufficient data for Store {store_id}."
+                return result
+
+            train, test, train_exog, test_exog = split_store_data(store_data)
+            model_fit, forecast, best_rmse, searched = evaluate_arima_model(
+                train, test, train_exog, test_exog, prior, rmse_tolerance)
+            future_forecast = forecast_next_days(model_fit, store_data, train_exog, horizon)
+            future_forecast['Store'] = store_id
+
+            result.update(status='completed', rmse=float(best_rmse), test=test, forecast=forecast,
+                          future_forecast=future_forecast,
+                          model_state=model_state(model_fit, best_rmse, searched))
+    except StoreTimeout:
+        result.update(status='timeout', error=f"Timed out after {timeout}s")
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['duration'] = time.perf_counter() - started
+    return result
+
+
+class Forecaster(abc.ABC):
+    """
+    A forecasting engine selectable in forecast_sales. Per-store engines implement
+    forecast_store() and run one store per worker process; batched engines (batched = True)
+    implement forecast_stores() over every store at once. Both produce forecast_store-shaped
+    result dicts, so results are saved the same way whatever the engine.
+    """
+    batched = False
+    name = None  # Key in FORECASTERS, set by get_forecaster and recorded on ForecastRun.engine
+
+    @abc.abstractmethod
+    def forecast_store(self, store_id, store_df, horizon=FORECAST_HORIZON_DAYS, **options):
+        """forecast_store() result dict for one store."""
+
+    @abc.abstractmethod
+    def forecast_stores(self, frame, store_ids, horizon=FORECAST_HORIZON_DAYS):
+        """forecast_store() result dicts for store_ids, from a frame holding all their rows."""
+
+
+class ArimaForecaster(Forecaster):
+    """Per-store ARIMA with order search and warm starts (forecast_store)."""
+
+    def forecast_store(self, store_id, store_df, horizon=FORECAST_HORIZON_DAYS, **options):
+        return forecast_store(store_id, store_df, horizon=horizon, **options)
+
+    def forecast_stores(self, frame, store_ids, horizon=FORECAST_HORIZON_DAYS):
+        # Still one fit per store, just in this process
+        for store_id in store_ids:
+            yield self.forecast_store(store_id, frame[frame['Store'] == store_id], horizon=horizon)
+
+
+def sales_matrix(frame, store_ids):
+    """
+    Sales of open days as a stores x days matrix on one daily calendar, closed and missing
+    days forward-filled as preprocess_store_data does (NaN before a store's first open day).
+    Returns the matrix, the store ids of its rows and the DatetimeIndex of its columns.
+    """
+    frame = frame[frame['Store'].isin(store_ids)]
+    if frame.empty:
+        return np.empty((0, 0)), np.array([], dtype=int), pd.DatetimeIndex([])
+
+    dates = pd.to_datetime(frame['Date']).to_numpy(dtype='datetime64[D]')
+    calendar = pd.date_range(dates.min(), dates.max(), freq='D')
+    rows, row_stores = pd.factorize(frame['Store'], sort=True)
+    columns = (dates - dates.min()).astype(int)
+
+    matrix = np.full((len(row_stores), len(calendar)), np.nan)
+    is_open = frame['Open'].to_numpy() == 1
+    matrix[rows[is_open], columns[is_open]] = frame['Sales'].to_numpy(dtype=float)[is_open]
+
+    # Forward fill along days: index of the last observed day at or before each day
+    observed = np.where(~np.isnan(matrix), np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(observed, axis=1, out=observed)
+    matrix = matrix[np.arange(matrix.shape[0])[:, None], observed]
+    return matrix, np.asarray(row_stores), calendar
+
+
+def seasonal_smoothing_forecast(matrix, horizon, season=7, alpha=0.3):
+    """
+    Forecasts every row of a stores x days matrix at once: each day of the horizon is the
+    exponentially weighted average (weight alpha * (1 - alpha) ** k) of the same day of the
+    season in earlier periods, newest first. alpha=1 is the seasonal naive forecast.
+    """
+    n_days = matrix.shape[1]
+    periods = n_days // season
+    weights = alpha * (1 - alpha) ** np.arange(periods)
+
+    profile = np.full((matrix.shape[0], season), np.nan)
+    for slot in range(season):
+        # Columns holding the same day of the season as day n_days + slot, newest first
+        columns = n_days + slot - season * np.arange(1, periods + 1)
+        columns = columns[columns >= 0]
+        values = matrix[:, columns]
+        used = np.where(np.isnan(values), 0, weights[:len(columns)])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            profile[:, slot] = np.nansum(values * used, axis=1) / used.sum(axis=1)
+    return profile[:, np.arange(horizon) % season]
+
+
+class SeasonalBaselineForecaster(Forecaster):
+    """
+    Weekly seasonal exponential smoothing over all stores in one NumPy pass (alpha=1 gives the
+    seasonal naive forecast). The last horizon days are held out to score it, then it is refit
+    on all days for the future forecast.
+    """
+    batched = True
+
+    def __init__(self, alpha=0.3, season=7):
+        self.alpha = alpha
+        self.season = season
+
+    def forecast_store(self, store_id, store_df, horizon=FORECAST_HORIZON_DAYS, **options):
+        # ARIMA's fit options (prior, timeout, ...) don't apply to a closed-form forecast
+        if store_df.empty:
+            return {'store_id': store_id, 'status': 'failed', 'rmse': None, 'duration': 0.0,
+                    'error': f"No data for Store {store_id}."}
+        return next(self.forecast_stores(store_df, [store_id], horizon))
+
+    def forecast_stores(self, frame, store_ids, horizon=FORECAST_HORIZON_DAYS):
+        started = time.perf_counter()
+        matrix, row_stores, calendar = sales_matrix(frame, store_ids)
+        if len(row_stores) and matrix.shape[1] <= 2 * horizon:
+            for store_id in store_ids:
+                yield {'store_id': store_id, 'status': 'failed', 'rmse': None, 'duration': 0.0,
+                       'error': f"Need more than {2 * horizon} days of data for the baseline."}
+            return
+        yield from self._forecast_matrix(matrix, row_stores, calendar, horizon, started)
+
+        found = set(row_stores.tolist())
+        for store_id in store_ids:
+            if store_id not in found:
+                yield {'store_id': store_id, 'status': 'failed', 'rmse': None, 'duration': 0.0,
+                       'error': f"No data for Store {store_id}."}
+
+    def _forecast_matrix(self, matrix, row_stores, calendar, horizon, started):
+        # One result per matrix row; stores with no rows at all are reported by the caller
+        if not len(row_stores):
+            return
+
+        holdout = seasonal_smoothing_forecast(matrix[:, :-horizon], horizon, self.season, self.alpha)
+        future = seasonal_smoothing_forecast(matrix, horizon, self.season, self.alpha)
+        actual = matrix[:, -horizon:]
+        with np.errstate(invalid='ignore'):
+            rmse = np.sqrt(np.nanmean((actual - holdout) ** 2, axis=1))
+
+        test_dates = calendar[-horizon:]
+        future_dates = pd.date_range(calendar[-1] + pd.Timedelta(days=1), periods=horizon)
+        duration = (time.perf_counter() - started) / len(row_stores)
 
-def save_forecast_to_csv(forecast_30_days_df, store_id):
-    save_dir = os.path.join(settings.MEDIA_ROOT, 'forecast_csv')
-    os.makedirs(save_dir, exist_ok=True)  # Create dir if not exists
+        for row, store_id in enumerate(row_stores.tolist()):
+            scored = ~np.isnan(actual[row]) & ~np.isnan(holdout[row])
+            if not scored.any() or np.isnan(future[row]).any():
+                yield {'store_id': store_id, 'status': 'failed', 'rmse': None, 'duration': duration,
+                       'error': f"Insufficient data for Store {store_id}."}
+                continue
+            yield {
+                'store_id': store_id,
+                'status': 'completed',
+                'rmse': float(rmse[row]),
+                'error': None,
+                'test': pd.Series(actual[row][scored], index=test_dates[scored]),
+                'forecast': holdout[row][scored],
+                'future_forecast': pd.DataFrame({'Forecasted Sales': future[row], 'Store': store_id},
+                                                index=future_dates),
+                'duration': duration,
+            }
 
-    file_path = os.path.join(save_dir, f'store_{store_id}_forecast.csv')
 
-    # Ensure index is date-like for writing
-    df_to_save = forecast_30_days_df.copy()
-    df_to_save.reset_index(inplace=True)  # if index is datetime
+FORECASTERS = {
+    'arima': ArimaForecaster,
+    'baseline': SeasonalBaselineForecaster,
+    'seasonal-naive': lambda: SeasonalBaselineForecaster(alpha=1.0),
+}
 
-    df_to_save.rename(columns={"index": "Date"}, inplace=True)
 
-    df_to_save.to_csv(file_path, index=False)
-    print(f"CSV saved for Store {store_id} at: {file_path}")
+def get_forecaster(name):
+    """A forecasting engine by name (see FORECASTERS)."""
+    try:
+        forecaster = FORECASTERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown forecasting engine '{name}'; choose from {', '.join(FORECASTERS)}")
+    forecaster.name = name
+    return forecaster
@@ -0,0 +1,116 @@
+# inventory_dashboard/backtest.py
+
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from .arima_forecast import (
+    FORECAST_HORIZON_DAYS,
+    StoreTimeout,
+    encode_exog,
+    fit_arima,
+    preprocess_store_data,
+    search_arima_order,
+    time_limit,
+)
+
+
+def parse_config(name):
+    """
+    A model configuration by name: 'auto' runs the auto_arima order search on every fold,
+    'p,d,q' (e.g. '1,1,1') fits that fixed order. Returns (name, order or None).
+    """
+    if name == 'auto':
+        return name, None
+    try:
+        order = tuple(int(part) for part in name.split(','))
+    except ValueError:
+        order = ()
+    if len(order) != 3:
+        raise ValueError(f"Unknown configuration '{name}'; use 'auto' or an order like '1,1,1'")
+    return name, order
+
+
+def rolling_origins(n_days, folds, horizon):
+    """Train-end positions for rolling-origin evaluation: the last `folds` windows of `horizon` days."""
+    return [n_days - horizon * (fold + 1) for fold in reversed(range(folds))]
+
+
+def forecast_errors(actual, predicted):
+    actual, predicted = np.asarray(actual, dtype=float), np.asarray(predicted, dtype=float)
+    errors = actual - predicted
+    # MAPE over days with sales only; closed days would divide by zero
+    selling = actual > 0
+    mape = np.mean(np.abs(errors[selling]) / actual[selling]) * 100 if selling.any() else np.nan
+    return float(np.sqrt(np.mean(errors ** 2))), float(mape)
+
+
+def _result_row(store_id, name, fold, error=''):
+    return {'store_id': store_id, 'config': name, 'fold': fold, 'rmse': np.nan, 'mape': np.nan,
+            'fit_seconds': np.nan, 'error': error}
+
+
+def backtest_store(store_id, store_df, configs, folds=3, horizon=FORECAST_HORIZON_DAYS, timeout=None):
+    """
+    Rolling-origin backtest of one store: for each origin, every configuration is fitted on the
+    data before it and scored on the next `horizon` days. Touches no database, so it can run
+    in a worker process. Returns one dict per store, configuration and fold; failures (including
+    unusable store data, and fits over timeout seconds) are recorded in 'error' instead of raised,
+    as forecast_store does.
+    """
+    try:
+        store_data = preprocess_store_data(store_df)
+        exog = encode_exog(store_data)
+        sales_log = np.log1p(store_data['Sales'])
+    except Exception as e:
+        error = f"Could not prepare Store {store_id}: {e}"
+        return [_result_row(store_id, name, fold, error) for fold in range(folds) for name in configs]
+
+    results = []
+    origins = rolling_origins(len(store_data), folds, horizon)
+    for fold, origin in enumerate(origins):
+        for name in configs:
+            row = _result_row(store_id, name, fold)
+            if origin < 2 * horizon:
+                row['error'] = 'Not enough history for this origin'
+                results.append(row)
+                continue
+
+            train_log, train_exog = sales_log.iloc[:origin], exog.iloc[:origin]
+            test_exog = exog.iloc[origin:origin + horizon]
+            actual = store_data['Sales'].iloc[origin:origin + horizon]
+            started = time.perf_counter()
+            try:
+                # Convergence warnings from hundreds of fits would bury the summary; accuracy shows them anyway
+                with warnings.catch_warnings(), time_limit(timeout):
+                    warnings.simplefilter('ignore')
+                    _, order = parse_config(name)
+                    model_fit = fit_arima(train_log, train_exog, order or search_arima_order(train_log, train_exog))
+                    predicted = np.expm1(model_fit.forecast(steps=len(actual), exog=test_exog))
+                row['rmse'], row['mape'] = forecast_errors(actual, predicted)
+            except StoreTimeout:
+                row['error'] = f"Timed out after {timeout}s"
+            except Exception as e:
+                row['error'] = str(e)
+            row['fit_seconds'] = time.perf_counter() - started
+            results.append(row)
+    return results
+
+
+def summarize_backtest(results):
+    """Accuracy and compute cost per configuration, from backtest_store rows."""
+    frame = pd.DataFrame(results)
+    scored = frame[frame['error'] == '']
+    summary = scored.groupby('config').agg(
+        stores=('store_id', 'nunique'),
+        folds=('fold', 'count'),
+        rmse_mean=('rmse', 'mean'),
+        rmse_median=('rmse', 'median'),
+        mape_mean=('mape', 'mean'),
+        fit_seconds_mean=('fit_seconds', 'mean'),
+        fit_seconds_total=('fit_seconds', 'sum'),
+    )
+    # Configurations that failed everywhere still get a row
+    summary = summary.reindex(frame['config'].unique())
+    summary['failed'] = frame[frame['error'] != ''].groupby('config').size()
+    return summary.fillna({'stores': 0, 'folds': 0, 'failed': 0}).astype({'stores': int, 'folds': int, 'failed': int})
@@ -0,0 +1,92 @@
+# inventory_dashboard/charts.py
+
+import math
+from .aggregations import sales_distribution
+
+# Compact, column-oriented payloads for each dashboard chart.
+# The figures themselves are drawn client-side by dashboard.html.
+
+
+def _column(values, digits=2):
+    """Plain floats rounded for the wire, with NaN (e.g. the first 6 moving-average days) as null."""
+    return [None if math.isnan(v) else round(v, digits) for v in map(float, values)]
+
+
+# 1. Sales Trend Over Time (Daily + 7-day Moving Average)
+def sales_trend_data(series):
+    daily = series['daily']
+    return {
+        'date': daily['date'].dt.strftime('%Y-%m-%d').tolist(),
+        'total_sales': _column(daily['total_sales']),
+        'moving_avg': _column(daily['moving_avg']),
+    }
+
+
+# 2. Sales with/without Promotion Status
+def promo_data(series):
+    promo = series['promo']
+    return {'promo': promo['promo'].tolist(), 'total_sales': _column(promo['total_sales'])}
+
+
+# 3. Monthly Sales Trend (Year-over-Year)
+def monthly_yoy_data(series):
+    monthly = series['monthly']
+    return {
+        'year': monthly['year'].tolist(),
+        'month': monthly['month'].tolist(),
+        'total_sales': _column(monthly['total_sales']),
+    }
+
+
+# 4. Store Type vs Average Sales
+def store_type_data(series):
+    by_type = series['by_store_type']
+    return {'store_type': by_type['store__store_type'].tolist(), 'avg_sales': _column(by_type['avg_sales'])}
+
+
+# 5. Sales Distribution Histogram with Boxplot (bins and box statistics precomputed in SQL, not from the series)
+def distribution_data():
+    return sales_distribution(bins=30)
+
+
+# 6. Yearly Total Sales
+def yearly_data(series):
+    yearly = series['yearly']
+    return {'year': yearly['year'].tolist(), 'total_sales': _column(yearly['total_sales'])}
+
+
+# 7. Monthly Average Sales
+def monthly_avg_data(series):
+    monthly_avg = series['monthly_avg']
+    return {'month': monthly_avg['month'].tolist(), 'avg_sales': _column(monthly_avg['avg_sales'])}
+
+
+# 8. Daily Sales Heatmap (Day vs Month), as a day x month matrix
+def heatmap_data(series):
+    pivot = series['day_month'].pivot(index='day', columns='month', values='total_sales')
+    return {
+        'day': pivot.index.tolist(),
+        'month': pivot.columns.tolist(),
+        'total_sales': [_column(row) for row in pivot.to_numpy()],
+    }
+
+
+class DashboardChart:
+    """A chart's data builder, and whether it is built from the dashboard series (see dashboard_series)."""
+
+    def __init__(self, data, uses_series=True):
+        self.data = data
+        self.uses_series = uses_series
+
+
+# URL name -> chart, in page order
+DASHBOARD_CHARTS = {
+    'sales_trend': DashboardChart(sales_trend_data),
+    'promo': DashboardChart(promo_data),
+    'monthly_yoy': DashboardChart(monthly_yoy_data),
+    'heatmap': DashboardChart(heatmap_data),
+    'store_type': DashboardChart(store_type_data),
+    'distribution': DashboardChart(distribution_data, uses_series=False),
+    'yearly': DashboardChart(yearly_data),
+    'monthly_avg': DashboardChart(monthly_avg_data),
+}
@@ -0,0 +1,191 @@
+# inventory_dashboard/exports.py
+
+import csv
+import io
+import zlib
+from django.conf import settings
+from .forecasts import latest_forecasts
+from .models import DummyCategoryInventory, Sales
+
+EXPORT_CHUNK_SIZE = 5000  # Rows fetched per database round trip (server-side cursor on PostgreSQL)
+STREAM_BUFFER_BYTES = 64 * 1024  # Bytes collected before a piece of the response is sent
+
+
+class ExportSpec:
+    """
+    What one export dataset streams: its queryset, the columns (model lookups) and the
+    header names written for them, and which fields the store and date filters apply to.
+    """
+
+    def __init__(self, queryset, columns, header, store_field='store_id', date_field='date'):
+        self.queryset = queryset
+        self.columns = columns
+        self.header = header
+        self.store_field = store_field
+        self.date_field = date_field
+
+    def rows(self, store=None, start=None, end=None):
+        queryset = self.queryset()
+        if store is not None:
+            queryset = queryset.filter(**{self.store_field: store})
+        if start is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": start})
+        if end is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__lte": end})
+        return queryset.values_list(*self.columns)
+
+    def fields(self):
+        """(header name, model field) per exported column, for typed formats such as Parquet."""
+        opts = self.queryset().model._meta
+        return [(name, opts.get_field(column)) for name, column in zip(self.header, self.columns)]
+
+
+EXPORTS = {
+    'sales': ExportSpec(
+        # Ordered by the (store, date) unique index, so the scan needs no sort
+        lambda: Sales.objects.order_by('store_id', 'date'),
+        ['store_id', 'date', 'day_of_week', 'sales', 'customers', 'open', 'promo', 'state_holiday', 'school_holiday'],
+        ['Store', 'Date', 'DayOfWeek', 'Sales', 'Customers', 'Open', 'Promo', 'StateHoliday', 'SchoolHoliday'],
+    ),
+    'forecasts': ExportSpec(
+        latest_forecasts,
+        ['store_id', 'date', 'forecasted_sales', 'generated_at', 'run_id'],
+        ['Store', 'Date', 'Forecasted Sales', 'Generated At', 'Run'],
+    ),
+    'inventory': ExportSpec(
+        lambda: DummyCategoryInventory.objects.order_by('store_id', 'category_name'),
+        ['store_id', 'category_name', 'quantity', 'reorder_point', 'last_updated'],
+        ['Store', 'Category', 'Quantity', 'Reorder Point', 'Last Updated'],
+        date_field='last_updated__date',
+    ),
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(pieces):
+    # Joins small pieces into larger writes; one yield per CSV line is slow to send
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_BUFFER_BYTES:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def csv_stream(header, rows):
+    """CSV bytes for an iterable of row tuples, produced incrementally."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header).encode()
+    for row in rows:
+        yield writer.writerow(row).encode()
+
+
+def gzip_stream(pieces):
+    """Gzip-compresses a byte stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        compressed = compressor.compress(piece)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that keeps only what was written since the last drain()."""
+
+    def __init__(self):
+        self._pieces = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._pieces.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._pieces)
+        self._pieces = []
+        return data
+
+
+def _arrow_type(pa, field):
+    # Foreign keys hold their target's values
+    if field.is_relation:
+        return _arrow_type(pa, field.target_field)
+    kind = field.get_internal_type()
+    if kind == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if kind == 'DateTimeField':
+        return pa.timestamp('us', tz=settings.TIME_ZONE if settings.USE_TZ else None)
+    if kind == 'DateField':
+        return pa.date32()
+    if kind == 'BooleanField':
+        return pa.bool_()
+    if kind == 'FloatField':
+        return pa.float64()
+    if kind.endswith(('IntegerField', 'AutoField')):
+        return pa.int64()
+    return pa.string()
+
+
+def parquet_stream(fields, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Parquet bytes for an iterable of row tuples, one row group per chunk_size rows. fields is
+    [(column name, model field)] (see ExportSpec.fields); the file schema comes from the fields
+    up front, so every row group has the same types whatever values it happens to hold.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([(name, _arrow_type(pa, field)) for name, field in fields])
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    chunk = []
+
+    def write_chunk():
+        writer.write_table(pa.Table.from_pydict(dict(zip(schema.names, map(list, zip(*chunk)))), schema=schema))
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            write_chunk()
+            chunk = []
+            yield sink.drain()
+
+    if chunk:
+        write_chunk()
+    # With no rows at all this is still a valid (empty) file with the typed columns
+    writer.close()
+    yield sink.drain()
+
+
+def export_stream(dataset, export_format='csv', gzip=False, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Bytes of a dataset export, produced lazily in bounded memory: rows come from the
+    database chunk_size at a time and are encoded as they arrive.
+    gzip applies to CSV; Parquet is compressed internally.
+    """
+    spec = EXPORTS[dataset]
+    rows = spec.rows(**filters).iterator(chunk_size=chunk_size)
+    if export_format == 'parquet':
+        return parquet_stream(spec.fields(), rows, chunk_size)
+    stream = _buffered(csv_stream(spec.header, rows))
+    return gzip_stream(stream) if gzip else stream
@@ -0,0 +1,203 @@
+# inventory_dashboard/figure_cache.py
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max, Sum
+from .models import DailyStoreTypeSales, Sales
+
+DEFAULT_SETTINGS = {
+    'BACKEND': 'locmem',  # 'locmem', 'file' or 'django'
+    'MAX_ENTRIES': 64,
+    'LOCATION': None,  # directory for 'file', cache alias for 'django'
+    'TIMEOUT': None,  # seconds, only used by the 'django' backend
+}
+
+
+def sales_data_version():
+    """
+    Token that changes whenever Sales (and therefore the rollups) change.
+    Every write path refreshes DailyStoreTypeSales, so its row/count totals and
+    latest refresh time move with each insert, edit or load.
+    """
+    rollup = DailyStoreTypeSales.objects.aggregate(
+        rows=Count('id'), sales_rows=Sum('row_count'), refreshed_at=Max('refreshed_at')
+    )
+    max_sales_id = Sales.objects.aggregate(max_id=Max('id'))['max_id']
+    refreshed_at = rollup['refreshed_at'].timestamp() if rollup['refreshed_at'] else 0
+    return f"{max_sales_id or 0}-{rollup['sales_rows'] or 0}-{rollup['rows']}-{refreshed_at:.6f}"
+
+
+class LocMemFigureBackend:
+    """Per-process LRU dictionary."""
+
+    def __init__(self, max_entries, **kwargs):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def count(self):
+        return len(self._entries)
+
+
+class FileFigureBackend:
+    """One file per fragment, shared between processes; the least recently used files are evicted."""
+
+    def __init__(self, max_entries, location=None, **kwargs):
+        self.max_entries = max_entries
+        self.location = location or os.path.join(settings.MEDIA_ROOT, 'figure_cache')
+        os.makedirs(self.location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, hashlib.sha1(key.encode()).hexdigest() + '.html')
+
+    def _files(self):
+        return [entry for entry in os.scandir(self.location) if entry.name.endswith('.html')]
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # Mark as recently used
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        files = self._files()
+        if len(files) > self.max_entries:
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:len(files) - self.max_entries]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        for entry in self._files():
+            os.remove(entry.path)
+
+    def count(self):
+        return len(self._files())
+
+
+class DjangoFigureBackend:
+    """Delegates to a configured Django cache (eviction follows that cache's own OPTIONS)."""
+
+    def __init__(self, max_entries, location=None, timeout=None, **kwargs):
+        self.cache = caches[location or 'default']
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(f"figure:{key}")
+
+    def set(self, key, value):
+        self.cache.set(f"figure:{key}", value, self.timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+    def count(self):
+        return None  # Not tracked by Django caches
+
+
+BACKENDS = {
+    'locmem': LocMemFigureBackend,
+    'file': FileFigureBackend,
+    'django': DjangoFigureBackend,
+}
+
+
+class FigureCache:
+    """
+    Rendered figure fragments keyed on (figure name, data version), with hit/miss counters.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, name, version, render):
+        key = f"{name}:{version}"
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = render()
+            self.backend.set(key, value)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': self.backend.count(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def clear(self):
+        self.backend.clear()
+
+
+_figure_cache = None
+_figure_cache_lock = threading.Lock()
+
+
+def get_figure_cache():
+    """Process-wide FigureCache built from settings.DASHBOARD_FIGURE_CACHE."""
+    global _figure_cache
+    with _figure_cache_lock:
+        if _figure_cache is None:
+            options = {**DEFAULT_SETTINGS, **getattr(settings, 'DASHBOARD_FIGURE_CACHE', {})}
+            backend_class = BACKENDS[options['BACKEND']]
+            _figure_cache = FigureCache(backend_class(
+                max_entries=options['MAX_ENTRIES'],
+                location=options['LOCATION'],
+                timeout=options['TIMEOUT'],
+            ))
+    return _figure_cache
+
+
+# Dashboard series are DataFrames, not text, so they stay in this process whatever the backend;
+# one entry per data version is enough
+_series_cache = FigureCache(LocMemFigureBackend(max_entries=2))
+
+
+def get_series_cache():
+    """Process-wide FigureCache for the intermediate dashboard series every chart is built from."""
+    return _series_cache
@@ -0,0 +1,82 @@
+# inventory_dashboard/forecast_plots.py
+
+import contextlib
+import glob
+import os
+import pandas as pd
+from django.conf import settings
+
+PLOTS_DIR = 'forecast_plots'
+
+
+def plot_forecast(test, forecast, best_rmse, future_forecast=None, store_id=None, path=None, engine='arima'):
+    """
+    Renders the holdout and future forecast to a PNG at path (default: MEDIA_ROOT/forecast_plots).
+    Uses matplotlib's object API rather than pyplot, so there is no global figure state and
+    matplotlib is only imported when a plot is actually drawn.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(test.index, test, label='Actual Sales', color='blue')
+    ax.plot(test.index, forecast, label='Predicted Sales', color='red')
+
+    if future_forecast is not None:
+        ax.plot(future_forecast.index, future_forecast['Forecasted Sales'], label=f'{len(future_forecast)}-Day Forecast',
+                color='green', linestyle='--')
+
+    ax.set_title(f'Store {store_id} - {engine} Sales Forecast (RMSE: {best_rmse:.2f})')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Sales')
+    ax.legend()
+
+    if path is None:
+        save_dir = os.path.join(settings.MEDIA_ROOT, PLOTS_DIR)
+        os.makedirs(save_dir, exist_ok=True)
+        path = os.path.join(save_dir, f'store_{store_id}_forecast.png')
+
+    # Save the plot
+    fig.savefig(path, format='png')
+    return path
+
+
+def forecast_plot_name(run):
+    # Keyed by run, so a new forecast for the store never serves a stale image
+    return f'store_{run.store_id}_run_{run.pk}.png'
+
+
+def forecast_plot_path(run):
+    return os.path.join(settings.MEDIA_ROOT, PLOTS_DIR, forecast_plot_name(run))
+
+
+def render_forecast_plot(run):
+    """
+    Path of the PNG for a completed ForecastRun, drawn from its stored holdout and forecast
+    rows on first use and cached on disk. Images of the store's older runs are removed.
+    """
+    path = forecast_plot_path(run)
+    if os.path.exists(path):
+        return path
+
+    holdout = run.holdout
+    if not holdout:
+        raise ValueError(f"Forecast run {run.pk} has no stored holdout to plot")
+
+    dates = pd.DatetimeIndex(holdout['dates'])
+    test = pd.Series(holdout['actual'], index=dates)
+    rows = run.forecasts.order_by('date').values_list('date', 'forecasted_sales')
+    future = pd.DataFrame(list(rows), columns=['Date', 'Forecasted Sales'])
+    future = future.set_index(pd.DatetimeIndex(future['Date']))[['Forecasted Sales']] if len(future) else None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    plot_forecast(test, holdout['predicted'], run.rmse, future, store_id=run.store_id, path=tmp_path,
+                  engine=run.engine)
+    os.replace(tmp_path, path)
+
+    for stale in glob.glob(os.path.join(os.path.dirname(path), f'store_{run.store_id}_run_*.png')):
+        if stale != path:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(stale)
+    return path
@@ -0,0 +1,129 @@
+# inventory_dashboard/forecast_queue.py
+
+import os
+import socket
+import numpy as np
+from datetime import timedelta
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import ForecastRun
+
+Status = ForecastRun.Status
+
+
+def worker_name():
+    """Identifies a forecasting process across hosts, e.g. 'box-2:4711'."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def latest_runs(engine=None):
+    """The most recent ForecastRun of every store, or of every store with engine."""
+    newest = ForecastRun.objects.filter(store_id=OuterRef('store_id'))
+    runs = ForecastRun.objects.all()
+    if engine is not None:
+        newest = newest.filter(engine=engine)
+        runs = runs.filter(engine=engine)
+    return runs.filter(pk=Subquery(newest.order_by('-created_at', '-pk').values('pk')[:1]))
+
+
+def enqueue_forecasts(store_ids, engine, rerun=False):
+    """
+    Queues a pending engine job for every store that has no queued or running one and, unless
+    rerun, whose latest run with that engine did not complete. Safe to call from several hosts
+    at once: the one-active-job-per-store-and-engine constraint drops duplicates.
+    """
+    store_ids = set(store_ids)
+    if not rerun:
+        done = latest_runs(engine).filter(status=Status.COMPLETED, store_id__in=store_ids)
+        store_ids -= set(done.values_list('store_id', flat=True))
+
+    ForecastRun.objects.bulk_create(
+        [ForecastRun(store_id=store_id, engine=engine) for store_id in sorted(store_ids)],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def claimable_runs(store_ids, engine, lease=None):
+    """
+    Pending engine jobs among store_ids. With lease (seconds), running jobs started longer
+    ago than that count too, so stores held by a crashed host are picked up again.
+    """
+    claimable = Q(status=Status.PENDING)
+    if lease:
+        claimable |= Q(status=Status.RUNNING, started_at__lt=timezone.now() - timedelta(seconds=lease))
+    return ForecastRun.objects.filter(claimable, store_id__in=store_ids, engine=engine)
+
+
+def claim_forecast(store_ids, engine, worker, lease=None):
+    """
+    Atomically takes the next claimable job among store_ids (see claimable_runs) and marks
+    it running for worker. Returns the job, or None when the queue is drained.
+    """
+    while True:
+        candidate = claimable_runs(store_ids, engine, lease).order_by('store_id') \
+                                                            .values_list('pk', 'status', 'started_at') \
+                                                            .first()
+        if candidate is None:
+            return None
+
+        # Compare-and-set: only one worker's UPDATE still matches the row it saw
+        pk, status, started_at = candidate
+        claimed = ForecastRun.objects.filter(pk=pk, status=status, started_at=started_at).update(
+            status=Status.RUNNING, worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ForecastRun.objects.get(pk=pk)
+
+
+def claim_forecasts(store_ids, engine, worker, lease=None):
+    """
+    Takes every claimable job among store_ids in one UPDATE, for engines that forecast all
+    stores at once. Jobs another worker claims concurrently are simply not returned.
+    """
+    stamp = timezone.now()
+    claimable_runs(store_ids, engine, lease).update(
+        status=Status.RUNNING, worker=worker, started_at=stamp, attempts=F('attempts') + 1,
+    )
+    return list(ForecastRun.objects.filter(status=Status.RUNNING, worker=worker, started_at=stamp,
+                                           store_id__in=store_ids, engine=engine))
+
+
+def release_forecast(job):
+    """
+    Hands a claimed job back to the queue as pending, e.g. when its worker was torn down through
+    no fault of the job. A job another worker has since claimed is left alone.
+    """
+    return ForecastRun.objects.filter(pk=job.pk, status=Status.RUNNING, started_at=job.started_at) \
+                              .update(status=Status.PENDING, worker='', started_at=None)
+
+
+def latest_completed_run(store_id):
+    """The store's most recently finished successful ForecastRun, or None."""
+    return ForecastRun.objects.filter(store_id=store_id, status=Status.COMPLETED) \
+                              .order_by('-finished_at', '-pk') \
+                              .first()
+
+
+def holdout_series(result):
+    """JSON-friendly holdout of a completed forecast_store result (None when there is none)."""
+    test = result.get('test')
+    if test is None:
+        return None
+    return {
+        'dates': [day.isoformat() for day in test.index.date],
+        'actual': test.to_numpy(dtype=float).tolist(),
+        'predicted': np.asarray(result['forecast'], dtype=float).tolist(),
+    }
+
+
+def finish_forecast(job, result, status=None):
+    """Records a forecast_store result (status overridable, e.g. when saving it failed) on its job."""
+    job.status = status or result['status']
+    job.rmse = result.get('rmse')
+    job.order = result.get('model_state', {}).get('order')
+    job.duration = result.get('duration')
+    job.holdout = holdout_series(result)
+    job.error = result.get('error') or ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'rmse', 'order', 'duration', 'holdout', 'error', 'finished_at'])
@@ -0,0 +1,97 @@
+# inventory_dashboard/forecasts.py
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.utils import timezone
+from .models import Forecast
+
+
+def forecast_rows(store_id, forecast_df, run=None, generated_at=None):
+    """Unsaved Forecast instances for a forecast frame, built from its columns as arrays (no per-row pandas access)."""
+    dates = forecast_df.index.date
+    values = forecast_df['Forecasted Sales'].to_numpy(dtype=float).tolist()
+    return [
+        Forecast(store_id=store_id, date=day, forecasted_sales=value, run=run, generated_at=generated_at)
+        for day, value in zip(dates, values)
+    ]
+
+
+def save_forecast(store_id, forecast_df, run=None, generated_at=None):
+    """
+    Writes a forecast frame (indexed by date, 'Forecasted Sales' column) as a new version of the
+    store's forecast. Re-saving the same run overwrites its rows instead of adding duplicates.
+    Returns the version's generated_at.
+    """
+    generated_at = generated_at or timezone.now()
+    Forecast.objects.bulk_create(
+        forecast_rows(store_id, forecast_df, run, generated_at),
+        update_conflicts=run is not None,
+        unique_fields=['store_id', 'date', 'run'] if run is not None else None,
+        update_fields=['forecasted_sales', 'generated_at'] if run is not None else None,
+    )
+    return generated_at
+
+
+def _newest_version(store_id):
+    return Forecast.objects.filter(store_id=store_id).order_by('-generated_at').values('generated_at')[:1]
+
+
+def latest_forecast(store_id):
+    """The newest version of one store's forecast, by date: one statement over the (store_id, generated_at) index."""
+    return Forecast.objects.filter(store_id=store_id, generated_at=Subquery(_newest_version(store_id))).order_by('date')
+
+
+def latest_forecasts():
+    """The newest forecast version of every store, by store and date."""
+    return Forecast.objects.filter(generated_at=Subquery(_newest_version(OuterRef('store_id')))) \
+                           .order_by('store_id', 'date')
+
+
+def forecast_versions(store_id):
+    """Versions of a store's forecast, newest first: dicts of generated_at, run_id, rows and date range."""
+    return list(
+        Forecast.objects.filter(store_id=store_id)
+                        .values('generated_at', 'run_id')
+                        .annotate(rows=Count('id'), first=Min('date'), last=Max('date'))
+                        .order_by('-generated_at')
+    )
+
+
+def compare_forecast_versions(store_id, versions=2):
+    """
+    The store's newest `versions` forecasts side by side: one row per date, one column per
+    generated_at (newest first), plus the change between the two newest where they overlap.
+    """
+    newest = [version['generated_at'] for version in forecast_versions(store_id)[:versions]]
+    rows = Forecast.objects.filter(store_id=store_id, generated_at__in=newest) \
+                           .values_list('date', 'generated_at', 'forecasted_sales')
+    frame = pd.DataFrame(list(rows), columns=['date', 'generated_at', 'forecasted_sales'])
+    table = frame.pivot(index='date', columns='generated_at', values='forecasted_sales')
+    table = table[[version for version in newest if version in table.columns]]
+    if len(table.columns) >= 2:
+        table['change'] = table.iloc[:, 0] - table.iloc[:, 1]
+    return table
+
+
+def prune_forecast_versions(keep=3, store_ids=None):
+    """
+    Deletes all but the `keep` newest forecast versions of every store (or of store_ids).
+    Returns the number of rows deleted.
+    """
+    versions = Forecast.objects.values_list('store_id', 'generated_at').distinct().order_by('store_id', '-generated_at')
+    if store_ids is not None:
+        versions = versions.filter(store_id__in=store_ids)
+
+    # Oldest version to keep per store; anything older goes
+    cutoffs, seen = {}, {}
+    for store_id, generated_at in versions:
+        seen[store_id] = seen.get(store_id, 0) + 1
+        if seen[store_id] == keep:
+            cutoffs[store_id] = generated_at
+
+    deleted = 0
+    with transaction.atomic():
+        for store_id, cutoff in cutoffs.items():
+            deleted += Forecast.objects.filter(store_id=store_id, generated_at__lt=cutoff).delete()[0]
+    return deleted
@@ -1,6 +1,7 @@
 from django.contrib.auth.forms import AuthenticationForm
 from django import forms
 from .models import DummyCategoryInventory, Inventory, Sales
+from .reorder import below_reorder_point
 
 
 class LoginForm(AuthenticationForm):
@@ -26,4 +27,39 @@ class InventoryForm(forms.ModelForm):
 class DummyCategoryInventoryForm(forms.ModelForm):
     class Meta:
         model = DummyCategoryInventory
-        fields = ['store', 'category_name', 'quantity']
\ No newline at end of file
+        fields = ['store', 'category_name', 'quantity']
+
+class InventoryFilterForm(forms.Form):
+    """Filters and sort order of the inventory dashboard, read from the query string."""
+    SORTS = {
+        'store': ('store_id', 'category_name'),
+        'category': ('category_name', 'store_id'),
+        'quantity': ('quantity', 'id'),
+        '-quantity': ('-quantity', 'id'),
+        '-updated': ('-last_updated', 'id'),
+    }
+
+    store = forms.IntegerField(required=False, min_value=1)
+    category = forms.CharField(required=False, max_length=50)
+    min_quantity = forms.IntegerField(required=False)
+    max_quantity = forms.IntegerField(required=False)
+    sort = forms.ChoiceField(required=False, choices=[(sort, sort) for sort in SORTS])
+    low_stock = forms.BooleanField(required=False)
+
+    def apply(self, queryset):
+        """queryset narrowed by the valid filters and ordered by sort; invalid values are ignored."""
+        self.is_valid()
+        data = {name: value for name, value in self.cleaned_data.items() if value not in (None, '')}
+        if 'store' in data:
+            queryset = queryset.filter(store_id=data['store'])
+        if 'category' in data:
+            queryset = queryset.filter(category_name=data['category'])
+        if 'min_quantity' in data:
+            queryset = queryset.filter(quantity__gte=data['min_quantity'])
+        if 'max_quantity' in data:
+            queryset = queryset.filter(quantity__lte=data['max_quantity'])
+        if data.get('low_stock'):
+            # Most short first unless another sort is chosen
+            queryset = below_reorder_point(queryset)
+            return queryset.order_by(*self.SORTS[data['sort']]) if 'sort' in data else queryset
+        return queryset.order_by(*self.SORTS[data.get('sort', 'store')])
@@ -0,0 +1,208 @@
+# inventory_dashboard/ingest.py
+
+import hashlib
+import io
+import os
+import sys
+import pandas as pd
+from django.conf import settings
+from django.db import connection, transaction
+from .models import Sales
+
+STDIN = '-'
+
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024  # Hashed from each end of a file to tell replaced files apart
+
+STATE_HOLIDAYS = ['0', 'a', 'b', 'c']
+
+# Sales table columns in the order rows are handed to the database
+SALES_COLUMNS = ['store_id', 'day_of_week', 'date', 'sales', 'customers',
+                 'open', 'promo', 'state_holiday', 'school_holiday']
+
+# Explicit dtypes so pandas doesn't have to sniff (and warn about) the mixed StateHoliday column
+SALES_CSV_DTYPES = {'StateHoliday': 'string'}
+
+
+def default_source(filename):
+    """Path of a Rossmann file inside settings.ROSSMANN_DATA_DIR."""
+    return os.path.join(settings.ROSSMANN_DATA_DIR, filename)
+
+
+def source_fingerprint(source, sample_bytes=FINGERPRINT_SAMPLE_BYTES):
+    """
+    Identity of a file source as IngestCheckpoint fields: its size, mtime and a SHA-256 of its
+    first and last sample_bytes. Any change means the file is not the one a checkpoint counted.
+    """
+    stat = os.stat(source)
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        if stat.st_size > sample_bytes:
+            f.seek(max(stat.st_size - sample_bytes, sample_bytes))
+            digest.update(f.read(sample_bytes))
+    return {'file_size': stat.st_size, 'file_mtime': stat.st_mtime, 'content_hash': digest.hexdigest()}
+
+
+def is_parquet(source):
+    return source != STDIN and source.lower().endswith('.parquet')
+
+
+def _read_parquet_chunks(source, chunksize, usecols, parse_dates, skip_rows):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading .parquet files requires pyarrow (pip install pyarrow)")
+
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=usecols):
+        if skip_rows >= batch.num_rows:
+            skip_rows -= batch.num_rows
+            continue
+        chunk = batch.slice(skip_rows).to_pandas()
+        skip_rows = 0
+        for column in parse_dates or []:
+            chunk[column] = pd.to_datetime(chunk[column])
+        yield chunk
+
+
+def table_columns(source):
+    """Column names of a file source, read from its header only; None for stdin, which can't be peeked at."""
+    if source == STDIN:
+        return None
+    if is_parquet(source):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).schema_arrow.names
+    return list(pd.read_csv(source, nrows=0, compression='infer').columns)
+
+
+def read_table_chunks(source, chunksize=10_000, usecols=None, parse_dates=None, dtype=None, skip_rows=0):
+    """
+    Streams a table in bounded-memory DataFrame chunks.
+
+    source is a file path or '-' for CSV on stdin. Compressed CSV (.gz, .bz2, .xz, .zip, .zst)
+    is decompressed on the fly; .parquet is read batch by batch with pyarrow (no CSV parsing).
+    skip_rows skips that many data rows, e.g. to resume an interrupted load.
+    """
+    if is_parquet(source):
+        yield from _read_parquet_chunks(source, chunksize, usecols, parse_dates, skip_rows)
+        return
+
+    handle = sys.stdin.buffer if source == STDIN else source
+    yield from pd.read_csv(handle, chunksize=chunksize, usecols=usecols, parse_dates=parse_dates,
+                           dtype=dtype, skiprows=range(1, skip_rows + 1) if skip_rows else None,
+                           compression='infer' if source != STDIN else None)
+
+
+def read_table(source, usecols=None, parse_dates=None, dtype=None):
+    """Reads a whole (small) table through read_table_chunks, e.g. store.csv."""
+    chunks = list(read_table_chunks(source, chunksize=100_000, usecols=usecols, parse_dates=parse_dates, dtype=dtype))
+    if not chunks:
+        return pd.DataFrame(columns=usecols)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def normalize_sales_chunk(chunk, store_ids):
+    """
+    Column-wise cleaning of a raw train.csv chunk into a frame with SALES_COLUMNS.
+    Rows for unknown stores are dropped with a single isin() mask.
+    """
+    chunk = chunk.fillna({
+        "Sales": 0, "Customers": 0, "Open": 1, "Promo": 0,
+        "StateHoliday": "0", "SchoolHoliday": 0
+    })
+    chunk = chunk[chunk["Store"].isin(store_ids)]
+
+    state_holiday = chunk["StateHoliday"].astype(str)
+    return pd.DataFrame({
+        'store_id': chunk["Store"].astype(int),
+        'day_of_week': chunk["DayOfWeek"].astype(int),
+        'date': pd.to_datetime(chunk["Date"]).dt.date,
+        'sales': chunk["Sales"].astype(int),
+        'customers': chunk["Customers"].astype(int),
+        'open': chunk["Open"].astype(int).astype(bool),
+        'promo': chunk["Promo"].astype(int).astype(bool),
+        'state_holiday': state_holiday.where(state_holiday.isin(STATE_HOLIDAYS), '0'),
+        'school_holiday': chunk["SchoolHoliday"].astype(int).astype(bool),
+    }, columns=SALES_COLUMNS)
+
+
+# Natural key of Sales (unique_together) and the columns an upsert overwrites
+SALES_KEY = ['store_id', 'date']
+SALES_UPDATE_COLUMNS = [column for column in SALES_COLUMNS if column not in SALES_KEY]
+
+
+def _copy_from_csv(cursor, table, columns, frame):
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+        raw_cursor.copy_expert(sql, buffer)
+    else:  # psycopg 3
+        with raw_cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+def _on_conflict_clause(quote):
+    updates = ', '.join(f"{quote(column)} = excluded.{quote(column)}" for column in SALES_UPDATE_COLUMNS)
+    return f"ON CONFLICT ({', '.join(quote(column) for column in SALES_KEY)}) DO UPDATE SET {updates}"
+
+
+def _bulk_upsert_models(frame):
+    Sales.objects.bulk_create(
+        [Sales(**row._asdict()) for row in frame.itertuples(index=False)],
+        update_conflicts=True,
+        unique_fields=['store', 'date'],
+        update_fields=SALES_UPDATE_COLUMNS,
+    )
+
+
+def insert_sales_frame(frame, upsert=True):
+    """
+    Writes a normalized sales frame without building model instances:
+    COPY on PostgreSQL, one executemany of plain tuples elsewhere.
+    With upsert=True, rows whose (store, date) already exist are overwritten,
+    so reloading the same file is idempotent.
+    Returns the number of rows written.
+    """
+    if frame.empty:
+        return 0
+
+    # A file may repeat a store/day; only the last occurrence can be applied in one statement
+    if upsert:
+        frame = frame.drop_duplicates(subset=SALES_KEY, keep='last')
+
+    quote = connection.ops.quote_name
+    table = quote(Sales._meta.db_table)
+    columns = [quote(column) for column in SALES_COLUMNS]
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        if not upsert:
+            Sales.objects.bulk_create([Sales(**row._asdict()) for row in frame.itertuples(index=False)])
+        else:
+            _bulk_upsert_models(frame)
+        return len(frame)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql' and not upsert:
+            _copy_from_csv(cursor, table, columns, frame)
+        elif connection.vendor == 'postgresql':
+            # COPY cannot resolve conflicts itself: stage the batch, then merge it in one statement
+            staging = quote('sales_ingest_staging')
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} ON COMMIT DROP AS "
+                           f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+            _copy_from_csv(cursor, staging, columns, frame)
+            cursor.execute(f"INSERT INTO {table} ({', '.join(columns)}) "
+                           f"SELECT {', '.join(columns)} FROM {staging} {_on_conflict_clause(quote)}")
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            if upsert:
+                sql = f"{sql} {_on_conflict_clause(quote)}"
+            # tolist() hands the driver native Python ints/bools instead of NumPy scalars
+            rows = zip(*(frame[column].tolist() for column in SALES_COLUMNS))
+            cursor.executemany(sql, list(rows))
+    return len(frame)
@@ -0,0 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+import django
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from inventory_dashboard.arima_forecast import FORECAST_HORIZON_DAYS
+from inventory_dashboard.backtest import backtest_store, parse_config, summarize_backtest
+from inventory_dashboard.store_cache import StorePartitionCache
+from inventory_dashboard.synthetic import synthetic_train_frame
+
+
+def _init_worker(settings_module):
+    # Spawned workers (Windows/macOS) start without Django configured
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Rolling-origin backtest of forecast configurations across stores: RMSE, MAPE and fit time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', action='append', dest='configs',
+                            help="Configuration to compare: 'auto' (order search per fold) or an order like '1,1,1'. "
+                                 "Repeat to compare several (default: auto)")
+        parser.add_argument('--folds', type=int, default=3, help='Rolling origins per store')
+        parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON_DAYS, help='Days scored after each origin')
+        parser.add_argument('--train-file', help='train.csv (or .parquet) to backtest on; default is synthetic data')
+        parser.add_argument('--stores', type=int, default=20,
+                            help='Number of stores: the first N of --train-file, or N synthetic stores')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic dataset')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--timeout', type=float, help='Seconds allowed per fit before it is recorded as timed out')
+        parser.add_argument('--output', help='Also write the per-store, per-fold results to this CSV file')
+
+    def handle(self, *args, **options):
+        configs = options['configs'] or ['auto']
+        try:
+            for name in configs:
+                parse_config(name)
+        except ValueError as e:
+            raise CommandError(e)
+
+        if options['train_file']:
+            cache = StorePartitionCache(options['train_file'])
+            cache.ensure()
+            store_ids = cache.store_ids()[:options['stores']]
+            load_store = cache.load_store
+        else:
+            # Offline: a Rossmann-shaped dataset generated in memory
+            frame = synthetic_train_frame(range(1, options['stores'] + 1), seed=options['seed'])
+            frame['Date'] = pd.to_datetime(frame['Date'])
+            partitions = dict(tuple(frame.groupby('Store')))
+            store_ids = sorted(partitions)
+            load_store = partitions.__getitem__
+
+        workers = max(1, min(options['workers'], len(store_ids)))
+        self.stdout.write(f"Backtesting {len(store_ids)} store(s) x {options['folds']} fold(s) x "
+                          f"{len(configs)} configuration(s) with {workers} worker(s)...")
+        started = time.perf_counter()
+
+        results = []
+        for store_results in self._run(store_ids, load_store, workers, configs, options['folds'],
+                                   options['horizon'], options['timeout']):
+            results.extend(store_results)
+        elapsed = time.perf_counter() - started
+
+        if options['output']:
+            pd.DataFrame(results).to_csv(options['output'], index=False)
+            self.stdout.write(f"Per-store results written to {options['output']}")
+
+        self.stdout.write(summarize_backtest(results).round(2).to_string())
+        self.stdout.write(self.style.SUCCESS(f"Backtest finished in {elapsed:.1f}s"))
+
+    def _run(self, store_ids, load_store, workers, configs, folds, horizon, timeout):
+        if workers == 1:
+            for store_id in store_ids:
+                yield backtest_store(store_id, load_store(store_id), configs, folds, horizon, timeout)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(os.environ['DJANGO_SETTINGS_MODULE'],)) as executor:
+            futures = [
+                executor.submit(backtest_store, store_id, load_store(store_id), configs, folds, horizon, timeout)
+                for store_id in store_ids
+            ]
+            for future in as_completed(futures):
+                yield future.result()
@@ -0,0 +1,61 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg, Sum
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+from django.test.utils import CaptureQueriesContext
+from inventory_dashboard.aggregations import build_sales_cube, dashboard_series, load_sales_cube, sales_distribution
+from inventory_dashboard.models import Sales
+
+
+def legacy_dashboard_queries():
+    """The eight independent full-table aggregates sales_dashboard used to run."""
+    return [
+        list(Sales.objects.values('date').annotate(total_sales=Sum('sales')).order_by('date')),
+        list(Sales.objects.values('promo').annotate(total_sales=Sum('sales')).order_by('promo')),
+        list(Sales.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+             .values('year', 'month').annotate(total_sales=Sum('sales')).order_by('year', 'month')),
+        list(Sales.objects.values('store__store_type').annotate(avg_sales=Avg('sales')).order_by('store__store_type')),
+        list(Sales.objects.values_list('sales', flat=True)),
+        list(Sales.objects.annotate(year=ExtractYear('date')).values('year')
+             .annotate(total_sales=Sum('sales')).order_by('year')),
+        list(Sales.objects.annotate(month=ExtractMonth('date')).values('month')
+             .annotate(avg_sales=Avg('sales')).order_by('month')),
+        list(Sales.objects.annotate(day=ExtractDay('date'), month=ExtractMonth('date')).values('day', 'month')
+             .annotate(total_sales=Sum('sales')).order_by('month', 'day')),
+    ]
+
+
+def engine_dashboard_queries():
+    # The distribution chart still needs the raw values
+    return dashboard_series(build_sales_cube()), list(Sales.objects.values_list('sales', flat=True))
+
+
+def rollup_dashboard_queries():
+    return dashboard_series(load_sales_cube()), sales_distribution()
+
+
+class Command(BaseCommand):
+    help = "Benchmarks query count and wall time of the sales dashboard aggregations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per variant (best time is reported)')
+
+    def handle(self, *args, **options):
+        repeat = max(1, options['repeat'])
+        rows = Sales.objects.count()
+        self.stdout.write(f"Sales rows: {rows}")
+
+        for label, func in (('before (8 queries)', legacy_dashboard_queries),
+                            ('after (cube + dist)', engine_dashboard_queries),
+                            ('rollup + SQL dist', rollup_dashboard_queries)):
+            timings = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    func()
+                    timings.append(time.perf_counter() - started)
+
+            self.stdout.write(
+                f"{label:<22} queries: {len(queries.captured_queries):>3}   best: {min(timings) * 1000:9.1f} ms"
+            )
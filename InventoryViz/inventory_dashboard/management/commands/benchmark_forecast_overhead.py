@@ -0,0 +1,87 @@
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from inventory_dashboard.arima_forecast import (
+    EXOG_FEATURES,
+    FORECAST_HORIZON_DAYS,
+    STATE_HOLIDAY_CODES,
+    forecast_next_days,
+    preprocess_store_data,
+    split_store_data,
+)
+from inventory_dashboard.forecasts import forecast_rows
+from inventory_dashboard.models import Forecast
+from inventory_dashboard.synthetic import synthetic_train_frame
+
+
+class ConstantModel:
+    """Stands in for a fitted ARIMA so only the code around model fitting is timed."""
+
+    def forecast(self, steps, exog=None):
+        return pd.Series(np.full(steps, 8.5))
+
+
+def legacy_preprocess(store_data):
+    store_data.set_index('Date', inplace=True)
+    store_data = store_data[store_data['Open'] == 1]
+    store_data.index = pd.to_datetime(store_data.index)
+    store_data = store_data.asfreq('D')
+    store_data['Sales'] = store_data['Sales'].ffill()
+    store_data[['Promo', 'StateHoliday', 'SchoolHoliday']] = store_data[['Promo', 'StateHoliday', 'SchoolHoliday']].ffill()
+    store_data = store_data[['Sales', 'Promo', 'StateHoliday', 'SchoolHoliday']]
+    return store_data.replace([np.inf, -np.inf], np.nan).dropna()
+
+
+def legacy_overhead(store_id, store_df, horizon):
+    """The original preprocessing, split, per-row exog replication and iterrows() Forecast construction."""
+    store_data = legacy_preprocess(store_df.copy())
+    train_size = int(len(store_data) * 0.8)
+    train_exog = store_data[EXOG_FEATURES][:train_size].copy()
+    test_exog = store_data[EXOG_FEATURES][train_size:].copy()
+    train_exog["StateHoliday"] = train_exog["StateHoliday"].map(STATE_HOLIDAY_CODES).fillna(0).astype(float)
+    test_exog["StateHoliday"] = test_exog["StateHoliday"].map(STATE_HOLIDAY_CODES).fillna(0).astype(float)
+
+    last_date = store_data.index[-1]
+    forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=horizon)
+    last_known = train_exog.iloc[-1]
+    exog_forecast = pd.DataFrame([last_known] * len(forecast_dates), index=forecast_dates)
+    forecast = np.expm1(ConstantModel().forecast(steps=horizon, exog=exog_forecast))
+    forecast_df = pd.DataFrame({'Forecasted Sales': forecast.values}, index=forecast_dates)
+
+    return [
+        Forecast(store_id=store_id, date=row.name.date(), forecasted_sales=row['Forecasted Sales'])
+        for _, row in forecast_df.iterrows()
+    ]
+
+
+def vectorized_overhead(store_id, store_df, horizon):
+    store_data = preprocess_store_data(store_df)
+    train, test, train_exog, test_exog = split_store_data(store_data)
+    forecast_df = forecast_next_days(ConstantModel(), store_data, train_exog, horizon)
+    return forecast_rows(store_id, forecast_df)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks per-store forecasting overhead (preprocessing, exog and Forecast rows), excluding model fitting"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stores', type=int, default=200, help='Number of synthetic stores')
+        parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON_DAYS)
+
+    def handle(self, *args, **options):
+        # Pandas chained-assignment warnings from the legacy path would otherwise flood the output
+        warnings.simplefilter('ignore')
+        frame = synthetic_train_frame(range(1, options['stores'] + 1))
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        partitions = dict(tuple(frame.groupby('Store')))
+
+        for label, overhead in (('legacy', legacy_overhead), ('vectorized', vectorized_overhead)):
+            started = time.perf_counter()
+            rows = sum(len(overhead(store_id, store_df, options['horizon'])) for store_id, store_df in partitions.items())
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<12} {len(partitions)} stores, {rows} rows in {elapsed:6.2f}s  "
+                f"({elapsed / len(partitions) * 1000:.2f} ms/store)"
+            )
@@ -0,0 +1,70 @@
+import io
+import time
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventory_dashboard.ingest import SALES_CSV_DTYPES, insert_sales_frame, normalize_sales_chunk
+from inventory_dashboard.models import Sales, Store
+from inventory_dashboard.synthetic import synthetic_train_frame
+
+
+def legacy_load(csv_text, store_ids, chunk_size):
+    """The original iterrows() + model instance + bulk_create path of load_sales_data."""
+    total = 0
+    for chunk in pd.read_csv(io.StringIO(csv_text), low_memory=False, chunksize=chunk_size, parse_dates=["Date"]):
+        chunk.fillna({
+            "Sales": 0, "Customers": 0, "Open": 1, "Promo": 0,
+            "StateHoliday": "NA", "SchoolHoliday": 0
+        }, inplace=True)
+        sales_batch = []
+        for _, row in chunk.iterrows():
+            if row["Store"] not in store_ids:
+                continue
+            sales_batch.append(Sales(
+                store_id=row["Store"],
+                day_of_week=int(row["DayOfWeek"]),
+                date=row["Date"].date(),
+                sales=int(row["Sales"]),
+                customers=int(row["Customers"]),
+                open=int(row["Open"]),
+                promo=int(row["Promo"]),
+                state_holiday=row["StateHoliday"] if row["StateHoliday"] in ["a", "b", "c", "0"] else "NA",
+                school_holiday=int(row["SchoolHoliday"]),
+            ))
+        Sales.objects.bulk_create(sales_batch)
+        total += len(sales_batch)
+    return total
+
+
+def vectorized_load(csv_text, store_ids, chunk_size):
+    total = 0
+    for chunk in pd.read_csv(io.StringIO(csv_text), chunksize=chunk_size, dtype=SALES_CSV_DTYPES):
+        total += insert_sales_frame(normalize_sales_chunk(chunk, store_ids))
+    return total
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the row-by-row and vectorized sales loaders on synthetic data (changes are rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Approximate number of synthetic rows')
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        store_ids = list(Store.objects.values_list('store_id', flat=True))
+        if not store_ids:
+            self.stdout.write(self.style.ERROR("No stores in the database; run load_store_data first."))
+            return
+
+        days = max(1, options['rows'] // len(store_ids))
+        csv_text = synthetic_train_frame(store_ids, start='2100-01-01', days=days).to_csv(index=False)
+        store_set = set(store_ids)
+
+        for label, loader in (('iterrows + bulk_create', legacy_load), ('vectorized', vectorized_load)):
+            with transaction.atomic():
+                started = time.perf_counter()
+                rows = loader(csv_text, store_set if loader is legacy_load else store_ids, options['chunk_size'])
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{label:<24} {rows} rows in {elapsed:6.2f}s  ({rows / elapsed:,.0f} rows/sec)")
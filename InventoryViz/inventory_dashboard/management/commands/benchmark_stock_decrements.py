@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.db.models import Max, Sum
+from inventory_dashboard.models import DummyCategoryInventory, Store
+from inventory_dashboard.stock import StockError, apply_sale
+
+CATEGORIES = ['Groceries', 'Electronics', 'Clothing']
+
+
+def legacy_sale(lines):
+    """The original read-modify-write of process_sale, one line at a time."""
+    for store_id, category, quantity in lines:
+        item = DummyCategoryInventory.objects.get(store_id=store_id, category_name=category)
+        item.quantity -= quantity
+        item.save()
+
+
+class Command(BaseCommand):
+    help = ("Concurrent load test of stock decrements: read-modify-write against conditional UPDATEs "
+            "(runs on scratch stores that are removed afterwards)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--sales', type=int, default=300, help='Sales per client')
+        parser.add_argument('--lines', type=int, default=3, help='Most lines per sale (1..N, random)')
+        parser.add_argument('--stores', type=int, default=2,
+                            help='Scratch stores sold from; fewer stores means more contention on the same rows')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        first = (Store.objects.aggregate(last=Max('store_id'))['last'] or 0) + 1_000_000
+        store_ids = list(range(first, first + options['stores']))
+        Store.objects.bulk_create([Store(store_id=store_id, store_type='a', assortment='a') for store_id in store_ids])
+        try:
+            for label, sale in (('read-modify-write', legacy_sale), ('conditional UPDATE', apply_sale)):
+                self._run(label, sale, store_ids, options)
+        finally:
+            Store.objects.filter(store_id__in=store_ids).delete()
+
+    def _run(self, label, sale, store_ids, options):
+        initial = 10 ** 9  # Never runs out, so every accepted unit must show up in the final total
+        stock = DummyCategoryInventory.objects.filter(store_id__in=store_ids)
+        stock.delete()
+        DummyCategoryInventory.objects.bulk_create([
+            DummyCategoryInventory(store_id=store_id, category_name=category, quantity=initial)
+            for store_id in store_ids for category in CATEGORIES
+        ])
+
+        sold = [0] * options['threads']
+        errors = [0] * options['threads']
+
+        def client(index):
+            rng = random.Random(options['seed'] + index)
+            try:
+                for _ in range(options['sales']):
+                    lines = [(rng.choice(store_ids), rng.choice(CATEGORIES), rng.randint(1, 5))
+                             for _ in range(rng.randint(1, options['lines']))]
+                    try:
+                        sale(lines)
+                        sold[index] += sum(quantity for _, _, quantity in lines)
+                    except (OperationalError, StockError):
+                        # e.g. SQLite "database is locked" when the busy timeout runs out
+                        errors[index] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(index,)) for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        sales = options['threads'] * options['sales'] - sum(errors)
+        recorded = initial * len(store_ids) * len(CATEGORIES) - stock.aggregate(left=Sum('quantity'))['left']
+        self.stdout.write(
+            f"{label:<20} {sales} sales in {elapsed:6.2f}s ({sales / elapsed:,.0f} sales/sec), "
+            f"{sum(errors)} errors, {sum(sold) - recorded} units lost to overwritten updates"
+        )
+        stock.delete()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory_dashboard.reorder import DAYS_OF_COVER, below_reorder_point, recompute_reorder_points
+from inventory_dashboard.models import DummyCategoryInventory
+
+
+class Command(BaseCommand):
+    help = "Recomputes per-store, per-category reorder points from the newest forecasts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-of-cover', type=float, default=DAYS_OF_COVER,
+                            help='Days of forecast demand the stock should cover before reordering')
+        parser.add_argument('--store', type=int, action='append', dest='stores',
+                            help='Only this store (repeatable; default: every store with a forecast)')
+
+    def handle(self, *args, **options):
+        if options['days_of_cover'] <= 0:
+            raise CommandError("--days-of-cover must be positive")
+
+        updated = recompute_reorder_points(options['days_of_cover'], options['stores'])
+        if not updated:
+            self.stdout.write(self.style.WARNING("No forecasts to compute reorder points from; run forecast_sales first."))
+            return
+
+        below = below_reorder_point(DummyCategoryInventory.objects.all()).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated} reorder point(s) ({options['days_of_cover']:g} days of cover); "
+            f"{below} categor{'y is' if below == 1 else 'ies are'} below their reorder point."
+        ))
@@ -0,0 +1,38 @@
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from inventory_dashboard.ingest import read_table_chunks
+
+
+class Command(BaseCommand):
+    help = "Streams a Rossmann CSV (optionally compressed, or '-' for stdin) into a Parquet file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Input CSV path (.csv, .csv.gz, .csv.zst) or '-' for stdin")
+        parser.add_argument('output', help='Output .parquet path')
+        parser.add_argument('--chunk-size', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise CommandError("Writing Parquet requires pyarrow (pip install pyarrow)")
+
+        writer = None
+        rows = 0
+        try:
+            for chunk in read_table_chunks(options['source'], chunksize=options['chunk_size'],
+                                           dtype={'StateHoliday': 'string', 'PromoInterval': 'string'}):
+                if 'Date' in chunk.columns:
+                    chunk['Date'] = pd.to_datetime(chunk['Date'])
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(options['output'], table.schema)
+                writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rows to {options['output']}"))
+
@@ -0,0 +1,58 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, Max, Min
+from django.utils import timezone
+from inventory_dashboard.forecast_queue import latest_runs
+from inventory_dashboard.models import ForecastRun
+
+Status = ForecastRun.Status
+
+
+class Command(BaseCommand):
+    help = "Shows forecast queue progress: job counts per status, running workers, throughput and recent failures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failures', type=int, default=10, help='Number of recent failed/timed out runs to list')
+        parser.add_argument('--window', type=int, default=60, help='Minutes of finished runs used for the throughput estimate')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+
+        # Status of every store's latest run, so re-queued stores count once
+        counts = dict(latest_runs().values_list('status').annotate(n=Count('id')).order_by())
+        total = sum(counts.values())
+        if not total:
+            self.stdout.write(self.style.WARNING("No forecast runs recorded yet."))
+            return
+
+        self.stdout.write(f"Stores: {total}")
+        for status in Status:
+            self.stdout.write(f"  {status.label:<10} {counts.get(status, 0):>6}")
+
+        running = ForecastRun.objects.filter(status=Status.RUNNING).order_by('started_at')
+        workers = running.values_list('worker').annotate(n=Count('id')).order_by('worker')
+        for worker, n in workers:
+            self.stdout.write(f"  worker {worker}: {n} running")
+        oldest = running.first()
+        if oldest is not None:
+            self.stdout.write(f"  oldest running: Store {oldest.store_id} since {now - oldest.started_at}")
+
+        finished = ForecastRun.objects.filter(finished_at__gte=now - timedelta(minutes=options['window']))
+        recent = finished.aggregate(n=Count('id'), duration=Avg('duration'),
+                                    first=Min('started_at'), last=Max('finished_at'))
+        remaining = counts.get(Status.PENDING, 0) + counts.get(Status.RUNNING, 0)
+        if recent['n'] and recent['first']:
+            # Measured over the span the recent runs were actually busy, not the whole window
+            minutes = max((recent['last'] - recent['first']).total_seconds() / 60, 1 / 60)
+            rate = recent['n'] / minutes
+            self.stdout.write(
+                f"Throughput: {rate:.1f} stores/minute over the last {options['window']} min "
+                f"(avg {recent['duration'] or 0:.1f}s per store), ETA {remaining / rate:.0f} min"
+            )
+
+        failures = ForecastRun.objects.filter(status__in=[Status.FAILED, Status.TIMEOUT], finished_at__isnull=False) \
+                                      .order_by('-finished_at')[:options['failures']]
+        for run in failures:
+            self.stdout.write(self.style.ERROR(
+                f"  Store {run.store_id} {run.status} at {run.finished_at:%Y-%m-%d %H:%M} on {run.worker}: {run.error}"
+            ))
@@ -1,109 +1,340 @@
-import csv
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+import multiprocessing
 import os
-from django.core.management.base import BaseCommand
+import time
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
 import pandas as pd
-from inventory_dashboard.models import Forecast
+from inventory_dashboard.models import ArimaModelState
+from inventory_dashboard.forecast_plots import render_forecast_plot
+from inventory_dashboard.forecast_queue import (
+    claim_forecast,
+    claim_forecasts,
+    claimable_runs,
+    enqueue_forecasts,
+    finish_forecast,
+    release_forecast,
+    worker_name,
+)
+from inventory_dashboard.forecasts import save_forecast
+from inventory_dashboard.reorder import recompute_reorder_points
+from inventory_dashboard.ingest import STDIN, default_source
+from inventory_dashboard.store_cache import StorePartitionCache
 from inventory_dashboard.arima_forecast import (
+    FORECAST_HORIZON_DAYS,
+    FORECASTERS,
+    RMSE_DEGRADATION_TOLERANCE,
+    get_forecaster,
     load_and_preprocess_data,
-    evaluate_arima_model,
-    plot_forecast,
-    forecast_next_30_days,
-    preprocess_store_data,
-    save_forecast_to_csv,
 )
 
+
+_started_jobs = None  # In pool workers: queue telling the parent which jobs have reached a worker
+
+
+def _init_worker(settings_module, started_jobs):
+    # Spawned workers (Windows/macOS) start without Django configured
+    global _started_jobs
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+    _started_jobs = started_jobs
+
+
+def _forecast_in_worker(engine, job_pk, store_id, store_df, **options):
+    # Reported before fitting, so jobs still waiting for a worker when the pool breaks aren't suspects
+    _started_jobs.put(job_pk)
+    return engine.forecast_store(store_id, store_df, **options)
+
+
+def _failed_result(job, error):
+    return {'store_id': job.store_id, 'status': 'failed', 'rmse': None, 'error': error}
+
+
 class Command(BaseCommand):
     help = 'Runs ARIMA model for sales forecasting'
 
     def add_arguments(self, parser):
+        parser.add_argument('--engine', choices=sorted(FORECASTERS), default='arima',
+                            help="Forecasting engine: 'arima' fits each store, 'baseline' and 'seasonal-naive' "
+                                 "forecast every store at once in a single vectorized pass")
         parser.add_argument('--start', type=int, default=1, help='Start store index (inclusive)')
         parser.add_argument('--end', type=int, help='End store index (inclusive)')
         parser.add_argument('--store', type=int, help='Run forecast for a single store')
+        parser.add_argument('--all', action='store_true', help='Run forecasts for every store in --start..--end')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes for batch runs (default: CPU count)')
+        parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON_DAYS, help='Days to forecast past the data')
+        parser.add_argument('--plots', action='store_true',
+                            help='Render forecast plots now instead of on first view in the forecast viewer')
+        parser.add_argument('--timeout', type=float, help='Seconds allowed per store before it is marked timed out')
+        parser.add_argument('--rerun', action='store_true', help='Queue stores again even if their latest run completed')
+        parser.add_argument('--lease', type=float, default=6 * 3600,
+                            help='Seconds after which a running job is presumed dead and can be claimed again')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Reuse each store\'s stored ARIMA order and parameters instead of searching again')
+        parser.add_argument('--search-every', type=int, default=7, metavar='DAYS',
+                            help='With --refresh, re-run the order search for stores last searched this many days ago')
+        parser.add_argument('--rmse-tolerance', type=float, default=RMSE_DEGRADATION_TOLERANCE,
+                            help='With --refresh, re-run the search when holdout RMSE is this fraction worse than at selection')
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Read and merge the source files directly instead of the per-store cache')
+        parser.add_argument('--train-file', default=default_source('train.csv'),
+                            help="train.csv path (.csv, .csv.gz, .csv.zst, .parquet, or '-' for stdin)")
+        parser.add_argument('--store-file',
+                            help='store.csv path (.csv, .csv.gz, .csv.zst or .parquet), merged in with --no-cache only')
 
     def handle(self, *args, **options):
-        data_path = 'C:/Users/laxmi/Downloads/rossman_sales'
         store_id = options.get('store')
 
-        if store_id is None:
-            self.stdout.write(self.style.ERROR("Please provide a --store id."))
+        if store_id is None and not options['all'] and options['end'] is None:
+            self.stdout.write(self.style.ERROR("Please provide a --store id, or --all / --end for a batch run."))
             return
 
-        checkpoint_file = 'forecast_checkpoint.csv'
+        uncached = options['no_cache'] or options['train_file'] == STDIN
+        if options['store_file'] and not uncached:
+            raise CommandError("--store-file is only read with --no-cache; the per-store cache holds train data only")
+
+        if uncached:
+            # Load data once for the whole run and partition it by store
+            self.stdout.write(self.style.SUCCESS("Loading sales data..."))
+            merged_data = load_and_preprocess_data(options['train_file'],
+                                                   options['store_file'] or default_source('store.csv'))
+            partitions = dict(tuple(merged_data.groupby('Store')))
+            available = sorted(partitions)
+            empty = pd.DataFrame()
+            load_store = lambda store: partitions.get(store, empty)
+            load_all = lambda: merged_data
+        else:
+            # Per-store slices of the preprocessed cache; built once per version of train.csv
+            cache = StorePartitionCache(options['train_file'])
+            if cache.ensure():
+                self.stdout.write(self.style.SUCCESS(f"Built per-store data cache at {cache.path}"))
+            available = cache.store_ids()
+            load_store = cache.load_store
+            load_all = cache.load_all
+
+        if store_id is not None:
+            store_ids = [store_id]
+        else:
+            end = options['end'] if options['end'] is not None else max(available, default=0)
+            store_ids = [s for s in available if options['start'] <= s <= end]
+
+        # Other hosts may be draining the same queue; jobs they hold are left to them
+        enqueue_forecasts(store_ids, options['engine'], rerun=options['rerun'])
 
-        # Initialize checkpoint file if it doesn't exist
-        if not os.path.exists(checkpoint_file):
-            with open(checkpoint_file, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Store', 'Status', 'RMSE', 'Timestamp'])
+        if not claimable_runs(store_ids, options['engine'], options['lease']).exists():
+            if store_id is not None:
+                self.stdout.write(self.style.WARNING(
+                    f"Store {store_id} already completed or is running elsewhere. Skipping (use --rerun to forecast again)."
+                ))
+            else:
+                self.stdout.write(self.style.WARNING("No stores left to forecast."))
+            return
 
-        # Load checkpoint
-        checkpoints = pd.read_csv(checkpoint_file)
+        engine = get_forecaster(options['engine'])
+        started = time.perf_counter()
+        counts = {'completed': 0, 'failed': 0, 'timeout': 0}
+        completed = []
+        searches = 0
 
-        # Check if this store is already completed
-        if store_id in checkpoints['Store'].values:
-            status = checkpoints[checkpoints['Store'] == store_id]['Status'].values[0]
+        def save(job, result):
+            status = self._save_result(job, result, options['plots'])
+            counts[status] += 1
             if status == 'completed':
-                self.stdout.write(self.style.WARNING(f"Store {store_id} already completed. Skipping..."))
-                return
+                completed.append(job.store_id)
+
+        if engine.batched:
+            self.stdout.write(f"Forecasting {claimable_runs(store_ids, options['engine'], options['lease']).count()} store(s) "
+                              f"with the {options['engine']} engine...")
+            results = self._run_batched(engine, store_ids, load_all, options['lease'], options['horizon'])
+            # Thousands of small writes are far cheaper in one transaction
+            with transaction.atomic():
+                for job, result in results:
+                    save(job, result)
+        else:
+            priors = self._load_priors(store_ids, options['search_every']) if options['refresh'] else {}
+            workers = max(1, min(options['workers'], len(store_ids)))
+            self.stdout.write(f"Forecasting {claimable_runs(store_ids, options['engine'], options['lease']).count()} store(s) "
+                              f"with {workers} worker(s), "
+                              f"{len(priors)} warm-started from a stored order...")
+
+            fit_options = {'timeout': options['timeout'], 'rmse_tolerance': options['rmse_tolerance'],
+                           'horizon': options['horizon']}
+            results = self._run(engine, store_ids, load_store, workers, priors, options['lease'], fit_options)
+            for job, result in results:
+                save(job, result)
+                searches += bool(result.get('model_state', {}).get('searched'))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {counts['completed']} completed, {counts['failed']} failed, {counts['timeout']} timed out "
+            f"({searches} order search(es)) in {elapsed:.1f}s ({sum(counts.values()) / elapsed * 60:.1f} stores/minute)"
+        ))
 
-        # Load data
-        self.stdout.write(self.style.SUCCESS(f"Loading data for Store {store_id}..."))
-        merged_data = load_and_preprocess_data(data_path)
-        store_df = merged_data[merged_data['Store'] == store_id].copy()
+        if completed:
+            # Low-stock alerts follow the new demand (see compute_reorder_points)
+            updated = recompute_reorder_points(store_ids=completed)
+            self.stdout.write(f"Updated {updated} reorder point(s) from the new forecasts.")
 
-        if store_df.empty:
-            self._update_checkpoint(checkpoint_file, store_id, 'failed', None)
-            self.stdout.write(self.style.WARNING(f"No data for Store {store_id}."))
+    def _load_priors(self, store_ids, search_every):
+        # Stores whose order search is due get no prior, so they are searched from scratch
+        due = timezone.now() - timedelta(days=search_every)
+        states = ArimaModelState.objects.filter(store_id__in=store_ids, searched_at__gt=due)
+        return {state.store_id: state.as_prior() for state in states}
+
+    def _run_batched(self, engine, store_ids, load_all, lease, horizon):
+        """
+        Claims every claimable job at once and yields (job, result) from one pass of a batched engine.
+        Jobs the engine yields no result for (it raised, or left their store out) are failed, not
+        left running until their lease expires.
+        """
+        jobs = {job.store_id: job for job in claim_forecasts(store_ids, engine.name, worker_name(), lease)}
+        if not jobs:
             return
+        error = "No forecast returned for this store"
+        try:
+            for result in engine.forecast_stores(load_all(), sorted(jobs), horizon):
+                yield jobs.pop(result['store_id']), result
+        except Exception as e:
+            error = f"Batched forecast failed: {e}"
+        for job in jobs.values():
+            yield job, _failed_result(job, error)
+
+    def _run(self, engine, store_ids, load_store, workers, priors, lease, fit_options):
+        """Claims jobs from the queue one at a time and yields (job, result) as stores finish."""
+        worker = worker_name()
+        claim = lambda: claim_forecast(store_ids, engine.name, worker, lease)
 
-        store_data = preprocess_store_data(store_df)
-        if store_data.empty or store_data['Sales'].isnull().all():
-            self._update_checkpoint(checkpoint_file, store_id, 'failed', None)
-            self.stdout.write(self.style.WARNING(f"Insufficient data for Store {store_id}."))
+        if workers == 1:
+            while (job := claim()) is not None:
+                yield job, engine.forecast_store(job.store_id, load_store(job.store_id),
+                                                 prior=priors.get(job.store_id), **fit_options)
             return
 
-        train_size = int(len(store_data) * 0.8)
-        train, test = store_data['Sales'][:train_size], store_data['Sales'][train_size:]
-        exog_features = ["Promo", "StateHoliday", "SchoolHoliday"]
-        train_exog = store_data[exog_features][:train_size].copy()
-        test_exog = store_data[exog_features][train_size:].copy()
+        def submit(executor, job):
+            return executor.submit(_forecast_in_worker, engine, job.pk, job.store_id, load_store(job.store_id),
+                                   prior=priors.get(job.store_id), **fit_options)
+
+        # A worker process that dies (segfault, OOM kill) breaks the whole pool: the stores in
+        # flight are sorted out (see _run_pool) and a new pool carries on with the queue
+        while (yield from self._run_pool(claim, submit, workers)):
+            self.stdout.write(self.style.WARNING("A worker process died; restarting the worker pool."))
+
+    def _run_pool(self, claim, submit, workers):
+        """
+        Runs claimed jobs on one process pool, yielding (job, result) as stores finish.
+        Returns True if the pool broke and the remaining jobs should go to a new one.
+        """
+        started_jobs = multiprocessing.SimpleQueue()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(os.environ['DJANGO_SETTINGS_MODULE'], started_jobs)) as executor:
+            started = set()
+            # Only as many jobs as there are free workers are claimed, leaving the rest to other hosts
+            in_flight = {}
+            while True:
+                while len(in_flight) < workers and (job := claim()) is not None:
+                    if not in_flight:
+                        # Forked workers must not share the parent's database connections
+                        connections.close_all()
+                    in_flight[submit(executor, job)] = job
+                if not in_flight:
+                    return False
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                self._read_started_jobs(started_jobs, started)
+                if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                    break
+                for future in done:
+                    job = in_flight.pop(future)
+                    yield job, self._future_result(job, future)
+
+        # The pool does not say which worker died, so every store that had reached a worker is
+        # a suspect: each is run again alone, and only one that kills a worker by itself fails.
+        # Jobs still waiting for a worker go back to the queue untouched.
+        self._read_started_jobs(started_jobs, started)
+        suspects = []
+        for future, job in in_flight.items():
+            if not isinstance(future.exception(), BrokenProcessPool):
+                # Finished before the pool broke
+                yield job, self._future_result(job, future)
+            elif job.pk in started:
+                suspects.append(job)
+            else:
+                release_forecast(job)
+        for job in suspects:
+            yield job, self._run_alone(submit, job)
+        return True
 
-        mapping = {"0": 0, "a": 1, "b": 2, "c": 3}
-        train_exog["StateHoliday"] = train_exog["StateHoliday"].map(mapping).fillna(0).astype(float)
-        test_exog["StateHoliday"] = test_exog["StateHoliday"].map(mapping).fillna(0).astype(float)
+    def _run_alone(self, submit, job):
+        """Runs one job on a pool of its own, so a crash can only be this store's."""
+        connections.close_all()
+        initargs = (os.environ['DJANGO_SETTINGS_MODULE'], multiprocessing.SimpleQueue())
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=initargs) as executor:
+            future = submit(executor, job)
+            wait([future])
+        if isinstance(future.exception(), BrokenProcessPool):
+            return _failed_result(job, "Worker process died while forecasting this store")
+        return self._future_result(job, future)
 
+    def _future_result(self, job, future):
         try:
-            model_fit, forecast, best_rmse = evaluate_arima_model(train, test, train_exog, test_exog)
-            forecast_30_days_df = forecast_next_30_days(model_fit, store_data, train_exog)
-            forecast_30_days_df['Store'] = store_id
-
-            forecast_objs = [
-                Forecast(store_id=store_id, date=row.name.date(), forecasted_sales=row['Forecasted Sales'])
-                for _, row in forecast_30_days_df.iterrows()
-            ]
-            Forecast.objects.bulk_create(forecast_objs, ignore_conflicts=True)
-
-            plot_forecast(test, forecast, best_rmse, forecast_30_days_df, store_id=store_id)
-            save_forecast_to_csv(forecast_30_days_df, store_id)
-            self._update_checkpoint(checkpoint_file, store_id, 'completed', best_rmse)
-
-            self.stdout.write(self.style.SUCCESS(f"Store {store_id}: Forecast complete (RMSE: {best_rmse:.2f})"))
-            
+            return future.result()
         except Exception as e:
-            self._update_checkpoint(checkpoint_file, store_id, 'failed', None)
-            self.stdout.write(self.style.ERROR(f"Store {store_id}: Forecasting failed. Reason: {e}"))
+            return _failed_result(job, str(e))
+
+    def _read_started_jobs(self, started_jobs, started):
+        # Drained as the pool runs, so the pipe never fills up and blocks the workers
+        while not started_jobs.empty():
+            started.add(started_jobs.get())
+
+    def _save_result(self, job, result, plots=False):
+        """Persists one store's outcome and returns the status recorded on its job."""
+        store_id = result['store_id']
+
+        if result['status'] != 'completed':
+            finish_forecast(job, result)
+            self.stdout.write(self.style.WARNING(f"Store {store_id}: {result['status']}. {result['error']}"))
+            return result['status']
 
+        try:
+            future_forecast = result['future_forecast']
+            best_rmse = result['rmse']
+
+            # A new version per run; readers take the newest, older ones stay until pruned
+            with transaction.atomic():
+                save_forecast(store_id, future_forecast, run=job)
+                # Only ARIMA results carry a fitted model to warm-start the next run from
+                if 'model_state' in result:
+                    self._save_model_state(store_id, result['model_state'])
+                finish_forecast(job, result)
+            if plots:
+                render_forecast_plot(job)
 
-    def _update_checkpoint(self, filepath, store_id, status, rmse):
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        row = [store_id, status, rmse if rmse else '', timestamp]
+            self.stdout.write(self.style.SUCCESS(
+                f"Store {store_id}: Forecast complete (RMSE: {best_rmse:.2f}, {result['duration']:.1f}s)"
+            ))
+            return 'completed'
 
-        if not os.path.exists(filepath):
-            with open(filepath, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Store', 'Status', 'RMSE', 'Timestamp'])
+        except Exception as e:
+            finish_forecast(job, {**result, 'error': str(e)}, status='failed')
+            self.stdout.write(self.style.ERROR(f"Store {store_id}: Forecasting failed. Reason: {e}"))
+            return 'failed'
 
-        with open(filepath, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
+    def _save_model_state(self, store_id, state):
+        values = {
+            'order': state['order'],
+            'params': state['params'],
+            'param_names': state['param_names'],
+            'rmse': state['rmse'],
+        }
+        # A reused order keeps the RMSE baseline and search time from when it was selected
+        baseline = {'search_rmse': state['rmse'], 'searched_at': timezone.now()}
+        ArimaModelState.objects.update_or_create(
+            store_id=store_id,
+            defaults={**values, **baseline} if state['searched'] else values,
+            create_defaults={**values, **baseline},
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory_dashboard.forecasts import compare_forecast_versions, forecast_versions, prune_forecast_versions
+
+
+class Command(BaseCommand):
+    help = "Lists, compares or prunes the stored versions of store forecasts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help='Store whose versions to list or compare')
+        parser.add_argument('--compare', type=int, nargs='?', const=2, metavar='N',
+                            help='Show the N newest versions of --store side by side (default 2)')
+        parser.add_argument('--prune', type=int, metavar='KEEP',
+                            help='Delete all but the KEEP newest versions (of --store, or of every store)')
+
+    def handle(self, *args, **options):
+        store_id = options['store']
+
+        if options['prune'] is not None:
+            if options['prune'] < 1:
+                raise CommandError("--prune must keep at least one version")
+            deleted = prune_forecast_versions(options['prune'], [store_id] if store_id is not None else None)
+            self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} forecast rows, keeping {options['prune']} version(s) per store."))
+            return
+
+        if store_id is None:
+            raise CommandError("Pass --store to list or compare versions, or --prune")
+
+        if options['compare']:
+            table = compare_forecast_versions(store_id, options['compare'])
+            if table.empty:
+                self.stdout.write(self.style.WARNING(f"No forecasts for Store {store_id}."))
+                return
+            self.stdout.write(table.round(2).to_string())
+            return
+
+        versions = forecast_versions(store_id)
+        if not versions:
+            self.stdout.write(self.style.WARNING(f"No forecasts for Store {store_id}."))
+        for version in versions:
+            self.stdout.write(
+                f"{version['generated_at']:%Y-%m-%d %H:%M:%S}  run {version['run_id'] or '-'}  "
+                f"{version['rows']} days ({version['first']} to {version['last']})"
+            )
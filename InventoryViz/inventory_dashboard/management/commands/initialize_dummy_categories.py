@@ -1,32 +1,54 @@
 # inventory_dashboard/management/commands/initialize_dummy_categories.py
 
+import numpy as np
+import pandas as pd
 from django.core.management.base import BaseCommand
-from inventory_dashboard.models import Store, Inventory, DummyCategoryInventory
-from inventory_dashboard.utils import get_dummy_category_split
+from inventory_dashboard.models import Inventory, Store
+from inventory_dashboard.stock import set_stock_levels
+from inventory_dashboard.utils import CATEGORY_SPLIT, category_splits
 
-class Command(BaseCommand):
-    help = "Splits inventory into dummy categories dynamically based on store properties"
-
-    def handle(self, *args, **kwargs):
-        stores = Store.objects.all()
-
-        for store in stores:
-            try:
-                inventory = Inventory.objects.get(store=store)
-                total_quantity = inventory.quantity
+STORE_COLUMNS = ['store_id', 'store_type', 'assortment', 'competition_distance']
 
-                split = get_dummy_category_split(store)
 
-                for category, fraction in split.items():
-                    category_quantity = int(total_quantity * fraction)
-
-                    DummyCategoryInventory.objects.update_or_create(
-                        store=store,
-                        category_name=category,
-                        defaults={"quantity": category_quantity}
-                    )
-
-                self.stdout.write(self.style.SUCCESS(f"Dummy categories created for Store {store.store_id}."))
+class Command(BaseCommand):
+    help = "Splits inventory into dummy categories dynamically based on store properties"
 
-            except Inventory.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"No inventory found for Store {store.store_id}. Skipping."))
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show what would change without writing anything')
+
+    def handle(self, *args, **options):
+        # A store's total is its Inventory row without a category (see load_inventory_from_sales)
+        totals = pd.Series(dict(
+            Inventory.objects.filter(category_name__isnull=True).order_by('id').values_list('store_id', 'quantity')
+        ), dtype='int64')
+        stores = pd.DataFrame(list(Store.objects.order_by('store_id').values_list(*STORE_COLUMNS)), columns=STORE_COLUMNS)
+        stores = stores.set_index('store_id')
+
+        skipped = stores.index.difference(totals.index)
+        stores = stores.drop(skipped)
+
+        # Truncated like int(total * share), per store and category
+        quantities = np.trunc(category_splits(stores).mul(totals.reindex(stores.index), axis=0)).astype('int64')
+        levels = {key: int(quantity) for key, quantity in quantities.stack().items()}
+        changes = set_stock_levels(levels, reference='initialize_dummy_categories', dry_run=options['dry_run'])
+
+        self._summarize(len(stores), levels, changes, options['dry_run'])
+        if len(skipped):
+            shown = ', '.join(map(str, skipped[:20])) + (', ...' if len(skipped) > 20 else '')
+            self.stdout.write(self.style.WARNING(f"No inventory found for {len(skipped)} store(s), skipped: {shown}"))
+
+    def _summarize(self, store_count, levels, changes, dry_run):
+        self.stdout.write(f"{store_count} store(s), {len(levels)} category row(s):")
+        for category in CATEGORY_SPLIT:
+            created = sum(1 for (_, name), (previous, _) in changes.items() if name == category and previous is None)
+            updated = sum(1 for (_, name), (previous, _) in changes.items() if name == category and previous is not None)
+            units = sum(quantity for (_, name), quantity in levels.items() if name == category)
+            self.stdout.write(f"  {category:<12} {created:>6} new  {updated:>6} changed  {units:>14,} units")
+
+        unchanged = len(levels) - len(changes)
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"Dry run: would write {len(changes)} row(s), {unchanged} already up to date. Nothing was written."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(changes)} row(s), {unchanged} already up to date."))
@@ -1,26 +1,38 @@
 from django.core.management.base import BaseCommand
 import pandas as pd
+from inventory_dashboard.ingest import default_source, read_table_chunks, table_columns
 from inventory_dashboard.models import Store, Inventory  # Import the Store and Inventory models
 
+REQUIRED_COLUMNS = ["Store", "Sales"]
+
+
 class Command(BaseCommand):
     help = "Loads initial inventory data for each store based on past sales"
 
-    def handle(self, *args, **kwargs):
-        sales_file = r"C:/Users/laxmi/Downloads/rossman_sales/train.csv"
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=default_source('train.csv'),
+                            help="train.csv path (.csv, .csv.gz, .csv.zst, .parquet, or '-' for stdin)")
 
-        try:
-            sales_df = pd.read_csv(sales_file, low_memory=False)
+    def handle(self, *args, **options):
+        sales_file = options['file']
 
-            required_columns = {"Store", "Sales", "Date"}
-            if not required_columns.issubset(sales_df.columns):
-                self.stdout.write(self.style.ERROR("Missing required columns in sales data."))
+        try:
+            columns = table_columns(sales_file)
+            missing = [column for column in REQUIRED_COLUMNS if columns is not None and column not in columns]
+            if missing:
+                self.stdout.write(self.style.ERROR(f"Missing required columns ({', '.join(missing)}) in sales data."))
                 return
 
-            # Clean and process the data
-            sales_df["Date"] = pd.to_datetime(sales_df["Date"])
-            sales_df = sales_df[sales_df["Sales"] > 0]  # Filter out days with no sales
+            # Stream only the needed columns and keep running per-store sums/counts
+            sales_sum = pd.Series(dtype=float)
+            sales_days = pd.Series(dtype=float)
+            for chunk in read_table_chunks(sales_file, chunksize=100_000, usecols=REQUIRED_COLUMNS):
+                chunk = chunk[chunk["Sales"] > 0]  # Filter out days with no sales
+                grouped = chunk.groupby("Store")["Sales"]
+                sales_sum = sales_sum.add(grouped.sum(), fill_value=0)
+                sales_days = sales_days.add(grouped.count(), fill_value=0)
 
-            avg_sales_per_store = sales_df.groupby("Store")["Sales"].mean().round().astype(int)
+            avg_sales_per_store = (sales_sum / sales_days).round().astype(int)
             estimated_inventory = avg_sales_per_store * 30  # 30 days of avg sales
 
             stores = Store.objects.all()
@@ -49,12 +61,12 @@ def estimate_stock_from_store_data(store):
     """
     base_stock = 500  # default
 
-    if store.CompetitionDistance and store.CompetitionDistance < 500:
+    if store.competition_distance and store.competition_distance < 500:
         base_stock += 200
 
-    if store.Assortment == "a":
+    if store.assortment == "a":
         base_stock += 300
-    elif store.Assortment == "c":
+    elif store.assortment == "c":
         base_stock -= 100
 
     return base_stock
@@ -1,60 +1,106 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from inventory_dashboard.models import Sales, Store
+import os
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.db.models import Max
+from inventory_dashboard.models import IngestCheckpoint, Sales, Store
+from inventory_dashboard.ingest import (
+    SALES_CSV_DTYPES,
+    STDIN,
+    default_source,
+    insert_sales_frame,
+    normalize_sales_chunk,
+    read_table_chunks,
+    source_fingerprint,
+)
+from inventory_dashboard.rollups import refresh_sales_rollups
 
 class Command(BaseCommand):
-    help = "Efficiently load sales data from a large CSV file using batch inserts"
+    help = "Idempotently load sales data from a CSV file with vectorized batch upserts, resuming interrupted loads"
 
-    def handle(self, *args, **kwargs):
-        file_path = r"C:\Users\laxmi\Downloads\rossman_sales\train.csv"  # Update if needed
-        chunk_size = 10_000  # Process data in chunks to optimize memory usage
-        
-        # Load store IDs into a dictionary for fast lookup
-        store_ids = set(Store.objects.values_list("store_id", flat=True))
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=default_source('train.csv'),
+                            help="Full train.csv or a delta file with only new days (.csv, .csv.gz, .csv.zst, .parquet, or '-' for stdin)")
+        parser.add_argument('--chunk-size', type=int, default=10_000)
+        parser.add_argument('--since', help="Only load days after this date (YYYY-MM-DD), or 'latest' for days after the newest loaded sale")
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and read the file from the top')
+        parser.add_argument('--insert-only', action='store_true', help='Plain inserts for an empty table (fails on existing store/days)')
 
-        # Read CSV in chunks
-        chunk_iter = pd.read_csv(file_path, low_memory=False, chunksize=chunk_size, parse_dates=["Date"])
+    def handle(self, *args, **options):
+        source = options['file']
+        chunk_size = options['chunk_size']  # Process data in chunks to optimize memory usage
+        since = self._parse_since(options['since'])
+
+        # Load store IDs once; rows are filtered per chunk with isin()
+        store_ids = list(Store.objects.values_list("store_id", flat=True))
+
+        # stdin can't be re-read, so it is never checkpointed
+        checkpoint = None
+        rows_done = 0
+        if source != STDIN:
+            source = os.path.abspath(source)
+            fingerprint = source_fingerprint(source)
+            checkpoint, _ = IngestCheckpoint.objects.get_or_create(source=source)
+            rows_done = checkpoint.rows_done
+
+            unchanged = all(getattr(checkpoint, field) == value for field, value in fingerprint.items())
+            if options['restart'] or not unchanged:
+                # Explicit restart, or a different file at this path (edited, replaced or appended to):
+                # the counted rows no longer describe it, and upserts make re-reading it safe
+                rows_done = 0
+            elif checkpoint.completed:
+                self.stdout.write(self.style.WARNING(f"{source} was already loaded completely. Use --restart to reload."))
+                return
+
+            if rows_done:
+                self.stdout.write(f"Resuming {source} after {rows_done} rows...")
+
+        # Stream the file in chunks, skipping the data rows committed by a previous run
+        chunk_iter = read_table_chunks(source, chunksize=chunk_size, dtype=SALES_CSV_DTYPES, skip_rows=rows_done)
 
         total_inserted = 0
-        sales_batch = []  # Store batch data before bulk insert
-        
+        started = time.perf_counter()
+
         for chunk in chunk_iter:
-            chunk.fillna({
-                "Sales": 0, "Customers": 0, "Open": 1, "Promo": 0, 
-                "StateHoliday": "NA", "SchoolHoliday": 0
-            }, inplace=True)
-            
-            for _, row in chunk.iterrows():
-                if row["Store"] not in store_ids:  
-                    continue  # Skip if store does not exist
-
-                sales_batch.append(
-                    Sales(
-                        store_id=row["Store"],
-                        day_of_week=int(row["DayOfWeek"]),
-                        date=row["Date"].date(),  # Convert datetime to date
-                        sales=int(row["Sales"]),
-                        customers=int(row["Customers"]),
-                        open=int(row["Open"]),  # Store as 0 or 1
-                        promo=int(row["Promo"]),  # Store as 0 or 1
-                        state_holiday=row["StateHoliday"] if row["StateHoliday"] in ["a", "b", "c", "0"] else "NA",
-                        school_holiday=int(row["SchoolHoliday"])  # Store as 0 or 1
-                    )
-                )
-
-                # Bulk insert in batches
-                if len(sales_batch) >= chunk_size:
-                    with transaction.atomic():  # Use atomic transaction for efficiency
-                        Sales.objects.bulk_create(sales_batch)
-                    total_inserted += len(sales_batch)
-                    self.stdout.write(f"Inserted {total_inserted} records...")
-                    sales_batch = []  # Clear batch for next iteration
-
-        # Insert any remaining data
-        if sales_batch:
+            sales_frame = normalize_sales_chunk(chunk, store_ids)
+            if since is not None:
+                sales_frame = sales_frame[sales_frame['date'] > since]
+            rows_done += len(chunk)
+
+            # Data, rollups and checkpoint commit together, so a crash never double-counts a batch
             with transaction.atomic():
-                Sales.objects.bulk_create(sales_batch)
-            total_inserted += len(sales_batch)
+                inserted = insert_sales_frame(sales_frame, upsert=not options['insert_only'])
+                refresh_sales_rollups(zip(sales_frame['store_id'].tolist(), sales_frame['date'].tolist()))
+                if checkpoint is not None:
+                    self._save_checkpoint(checkpoint, rows_done, fingerprint, completed=False)
+
+            total_inserted += inserted
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Upserted {total_inserted} records ({rows_done} rows read)... ({total_inserted / elapsed:,.0f} rows/sec)")
+
+        if checkpoint is not None:
+            self._save_checkpoint(checkpoint, rows_done, fingerprint, completed=True)
+
+        elapsed = time.perf_counter() - started
+        rate = total_inserted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully loaded {total_inserted} sales records in {elapsed:.1f}s ({rate:,.0f} rows/sec)!"
+        ))
+
+    def _parse_since(self, value):
+        if value is None:
+            return None
+        if value == 'latest':
+            return Sales.objects.aggregate(latest=Max('date'))['latest']
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError("--since must be YYYY-MM-DD or 'latest'")
 
-        self.stdout.write(self.style.SUCCESS(f"Successfully loaded {total_inserted} sales records!"))
+    def _save_checkpoint(self, checkpoint, rows_done, fingerprint, completed):
+        checkpoint.rows_done = rows_done
+        for field, value in fingerprint.items():
+            setattr(checkpoint, field, value)
+        checkpoint.completed = completed
+        checkpoint.save(update_fields=['rows_done', *fingerprint, 'completed', 'updated_at'])
@@ -1,48 +1,77 @@
-import pandas as pd
 from django.core.management.base import BaseCommand
-from inventory_dashboard.models import Store  # Import your Store model
+from django.db import transaction
+from inventory_dashboard.ingest import default_source, read_table
+from inventory_dashboard.models import Sales, Store  # Import your Store model
+from inventory_dashboard.rollups import rebuild_sales_rollups
+
+STORE_FIELDS = [
+    'store_type', 'assortment', 'competition_distance', 'competition_open_since_month',
+    'competition_open_since_year', 'promo2', 'promo2_since_week', 'promo2_since_year', 'promo_interval',
+]
 
 class Command(BaseCommand):
-    help = 'Update existing store data in the database'
+    help = 'Create or update store data in bulk from store.csv'
 
-    def handle(self, *args, **kwargs):
-        file_path = r"C:\Users\laxmi\Downloads\rossman_sales\store.csv"  # Update with actual path
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=default_source('store.csv'),
+                            help="store.csv path (.csv, .csv.gz, .csv.zst, .parquet, or '-' for stdin)")
 
-        # Load the CSV file
-        df = pd.read_csv(file_path)
+    def handle(self, *args, **options):
+        # Load the store table
+        df = read_table(options['file'])
 
         # Fill missing values
         df.fillna({
             "CompetitionDistance": 0, "CompetitionOpenSinceMonth": 0, 
             "CompetitionOpenSinceYear": 0, "Promo2": 0, "Promo2SinceWeek": 0, 
-            "Promo2SinceYear": 0, "PromoInterval": "NA"
+            "Promo2SinceYear": 0, "PromoInterval": "NA",
+            "StoreType": "NA", "Assortment": "NA"
         }, inplace=True)
 
-        df["StoreType"].fillna("NA", inplace=True)
-        df["Assortment"].fillna("NA", inplace=True)
-
         df["Promo2"] = df["Promo2"].apply(lambda x: int(x) if x in [0, 1] else 0)
 
+        # Desired field values per store, typed like the model fields so they compare cleanly
+        incoming = {
+            int(row.Store): {
+                'store_type': row.StoreType,
+                'assortment': row.Assortment,
+                'competition_distance': int(row.CompetitionDistance),
+                'competition_open_since_month': int(row.CompetitionOpenSinceMonth),
+                'competition_open_since_year': int(row.CompetitionOpenSinceYear),
+                'promo2': bool(row.Promo2),
+                'promo2_since_week': int(row.Promo2SinceWeek),
+                'promo2_since_year': int(row.Promo2SinceYear),
+                'promo_interval': row.PromoInterval,
+            }
+            for row in df.itertuples(index=False)
+        }
+
+        # Diff against every existing store fetched in one query
+        existing = Store.objects.in_bulk(list(incoming))
+        to_create, to_update, retyped = [], [], []
+        for store_id, values in incoming.items():
+            store = existing.get(store_id)
+            if store is None:
+                to_create.append(Store(store_id=store_id, **values))
+                continue
+            changed = [field for field, value in values.items() if getattr(store, field) != value]
+            if changed:
+                if 'store_type' in changed:
+                    retyped.append(store_id)
+                for field in changed:
+                    setattr(store, field, values[field])
+                to_update.append(store)
+
+        with transaction.atomic():
+            Store.objects.bulk_create(to_create, batch_size=500)
+            Store.objects.bulk_update(to_update, fields=STORE_FIELDS, batch_size=500)
+
+            # The dashboard cube is keyed by store type, so re-typed stores with sales invalidate it
+            if retyped and Sales.objects.filter(store_id__in=retyped).exists():
+                rebuild_sales_rollups()
+                self.stdout.write(f"Store type changed for {len(retyped)} store(s); sales rollups rebuilt.")
 
-        # Iterate through each row and update only existing stores
-        for _, row in df.iterrows():
-            try:
-                Store.objects.update_or_create(
-                    store_id=row["Store"],
-                    defaults={
-                        'store_type': row["StoreType"],
-                        'assortment': row["Assortment"],
-                        'competition_distance': int(row["CompetitionDistance"]),
-                        'competition_open_since_month': int(row["CompetitionOpenSinceMonth"]),
-                        'competition_open_since_year': int(row["CompetitionOpenSinceYear"]),
-                        'promo2': int(row["Promo2"]),
-                        'promo2_since_week': int(row["Promo2SinceWeek"]),
-                        'promo2_since_year': int(row["Promo2SinceYear"]),
-                        'promo_interval': row["PromoInterval"]
-                    }
-                )
-                
-                self.stdout.write(self.style.SUCCESS(f"Updated store {row['Store']}"))
-
-            except Store.DoesNotExist:
-                self.stdout.write(self.style.WARNING(f"Store {row['Store']} not found. Skipping."))
+        unchanged = len(incoming) - len(to_create) - len(to_update)
+        self.stdout.write(self.style.SUCCESS(
+            f"Stores: {len(to_create)} created, {len(to_update)} updated, {unchanged} unchanged."
+        ))
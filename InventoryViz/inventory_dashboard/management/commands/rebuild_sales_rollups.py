@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory_dashboard.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily store-type sales rollup from the Sales table"
+
+    def handle(self, *args, **kwargs):
+        rows = rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups: {rows} daily store-type rows."))
@@ -0,0 +1,46 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from inventory_dashboard.stock import SNAPSHOT_LAG_SECONDS, stock_drift, stock_levels, take_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = "Snapshots category stock from the movement ledger (run periodically), or shows levels at a point in time"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=float, default=SNAPSHOT_LAG_SECONDS,
+                            help='Seconds of the newest movements left out of the snapshot, so slow commits are not skipped')
+        parser.add_argument('--check', action='store_true',
+                            help='Also list categories whose stored quantity disagrees with the ledger')
+        parser.add_argument('--store', type=int, help='Print the stock levels of this store instead of snapshotting')
+        parser.add_argument('--at', help="With --store, the levels at this time ('YYYY-MM-DD HH:MM[:SS]') instead of now")
+
+    def handle(self, *args, **options):
+        if options['store'] is not None:
+            self._print_levels(options['store'], options['at'])
+            return
+
+        taken = take_stock_snapshots(lag=options['lag'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {taken} stock snapshot(s)."))
+
+        if options['check']:
+            drift = stock_drift()
+            for store_id, category, quantity, level in drift:
+                self.stdout.write(self.style.WARNING(
+                    f"Store {store_id} {category}: quantity {quantity}, ledger {level if level is not None else '-'}"
+                ))
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("Stored quantities match the ledger."))
+
+    def _print_levels(self, store_id, at):
+        if at is not None:
+            try:
+                at = timezone.make_aware(datetime.fromisoformat(at))
+            except ValueError:
+                raise CommandError("--at must look like 'YYYY-MM-DD HH:MM[:SS]'")
+
+        levels = stock_levels([store_id], at)
+        if not levels:
+            self.stdout.write(self.style.WARNING(f"No ledger entries for Store {store_id}."))
+        for (_, category), quantity in sorted(levels.items()):
+            self.stdout.write(f"{category:<20} {quantity}")
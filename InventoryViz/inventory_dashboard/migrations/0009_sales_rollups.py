@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0008_inventory_category_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStoreTypeSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('store_type', models.CharField(max_length=1)),
+                ('promo', models.BooleanField()),
+                ('total_sales', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('row_count', models.IntegerField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MonthlyStoreSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total_sales', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('customers', models.IntegerField()),
+                ('row_count', models.IntegerField()),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['date'], name='inventory_d_date_ccc5a1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailystoretypesales',
+            unique_together={('date', 'store_type', 'promo')},
+        ),
+        migrations.AddField(
+            model_name='monthlystoresales',
+            name='store',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_dashboard.store'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlystoresales',
+            unique_together={('store', 'month')},
+        ),
+    ]
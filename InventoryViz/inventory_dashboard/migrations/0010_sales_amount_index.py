@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0009_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sales',
+            name='sales',
+            field=models.DecimalField(db_index=True, decimal_places=2, max_digits=10),
+        ),
+    ]
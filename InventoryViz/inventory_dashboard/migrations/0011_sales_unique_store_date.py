@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:45
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, Min, OuterRef
+
+
+def remove_duplicate_sales(apps, schema_editor):
+    # Earlier loads could insert the same store/day more than once; keep the first row of each.
+    # One set-based DELETE, restricted to the duplicated store/days
+    Sales = apps.get_model('inventory_dashboard', 'Sales')
+    keep_ids = Sales.objects.values('store_id', 'date') \
+                            .annotate(rows=Count('id'), keep_id=Min('id')) \
+                            .filter(rows__gt=1) \
+                            .values('keep_id')
+    duplicate = Sales.objects.filter(store_id=OuterRef('store_id'), date=OuterRef('date')).exclude(id=OuterRef('id'))
+    Sales.objects.filter(Exists(duplicate)).exclude(id__in=keep_ids).delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0010_sales_amount_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True)),
+                ('rows_done', models.BigIntegerField(default=0)),
+                ('file_size', models.BigIntegerField(blank=True, null=True)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(remove_duplicate_sales, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='sales',
+            unique_together={('store', 'date')},
+        ),
+    ]
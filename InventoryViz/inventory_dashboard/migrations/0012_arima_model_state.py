@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0011_sales_unique_store_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArimaModelState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('store_id', models.IntegerField(unique=True)),
+                ('order', models.JSONField()),
+                ('params', models.JSONField()),
+                ('param_names', models.JSONField()),
+                ('rmse', models.FloatField()),
+                ('search_rmse', models.FloatField()),
+                ('searched_at', models.DateTimeField()),
+                ('fitted_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0013_forecast_run'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='forecast',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='forecast',
+            name='generated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='forecast',
+            name='run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='forecasts', to='inventory_dashboard.forecastrun'),
+        ),
+        migrations.AddIndex(
+            model_name='forecast',
+            index=models.Index(fields=['store_id', '-generated_at', 'date'], name='inventory_d_store_i_27cdb2_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='forecast',
+            constraint=models.UniqueConstraint(fields=('store_id', 'date', 'run'), name='forecast_one_row_per_run_and_date'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0014_forecast_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastrun',
+            name='holdout',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0015_forecast_run_holdout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_name', models.CharField(max_length=50)),
+                ('kind', models.CharField(choices=[('sale', 'Sale'), ('receipt', 'Receipt'), ('adjustment', 'Adjustment')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_dashboard.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'category_name', 'id'], name='inventory_d_store_i_ddf0e2_idx'), models.Index(fields=['created_at'], name='inventory_d_created_9a1e3b_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category_name', models.CharField(max_length=50)),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField(default=0)),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory_dashboard.store')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'category_name', '-last_movement_id'], name='inventory_d_store_i_ec53a9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_categories(apps, schema_editor):
+    # Re-running initialize_dummy_categories could add a category to a store twice; keep the
+    # most recently updated row of each (the one edits and sales last touched)
+    DummyCategoryInventory = apps.get_model('inventory_dashboard', 'DummyCategoryInventory')
+    duplicates = DummyCategoryInventory.objects.values('store_id', 'category_name') \
+                                               .annotate(rows=Count('id')) \
+                                               .filter(rows__gt=1)
+    for group in duplicates.iterator():
+        rows = DummyCategoryInventory.objects.filter(store_id=group['store_id'], category_name=group['category_name'])
+        keep_id = rows.order_by('-last_updated', '-id').values_list('id', flat=True).first()
+        rows.exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0016_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dummycategoryinventory',
+            index=models.Index(fields=['quantity'], name='inventory_d_quantit_11d316_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_categories, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dummycategoryinventory',
+            constraint=models.UniqueConstraint(fields=('store', 'category_name'), name='dummy_inventory_one_row_per_category'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0017_dummy_inventory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dummycategoryinventory',
+            name='daily_demand',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dummycategoryinventory',
+            name='reorder_point',
+            field=models.IntegerField(default=15000),
+        ),
+        migrations.AddField(
+            model_name='dummycategoryinventory',
+            name='reorder_point_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dummycategoryinventory',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('quantity'), '-', models.F('reorder_point')), name='dummy_inventory_shortfall_idx'),
+        ),
+    ]
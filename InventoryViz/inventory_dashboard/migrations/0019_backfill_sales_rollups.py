@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:31
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    # 0009 created the rollup empty; fill it from the Sales rows loaded before it existed.
+    # Same aggregate as rollups.rebuild_sales_rollups, kept here so later changes there don't alter this step
+    Sales = apps.get_model('inventory_dashboard', 'Sales')
+    DailyStoreTypeSales = apps.get_model('inventory_dashboard', 'DailyStoreTypeSales')
+    if not Sales.objects.exists() or DailyStoreTypeSales.objects.exists():
+        return
+
+    rows = Sales.objects.values_list('date', 'store__store_type', 'promo') \
+                        .annotate(total_sales=Sum('sales'), row_count=Count('id')) \
+                        .order_by()
+    DailyStoreTypeSales.objects.bulk_create(
+        [DailyStoreTypeSales(date=date, store_type=store_type, promo=promo,
+                             total_sales=total_sales, row_count=row_count)
+         for date, store_type, promo, total_sales, row_count in rows],
+        batch_size=10_000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0018_reorder_points'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='MonthlyStoreSales',
+        ),
+    ]
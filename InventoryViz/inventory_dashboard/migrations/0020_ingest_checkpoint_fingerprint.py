@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0019_backfill_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestcheckpoint',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='ingestcheckpoint',
+            name='file_mtime',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
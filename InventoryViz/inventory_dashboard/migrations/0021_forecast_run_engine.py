@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_dashboard', '0020_ingest_checkpoint_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='forecastrun',
+            name='forecast_run_one_active_per_store',
+        ),
+        migrations.AddField(
+            model_name='forecastrun',
+            name='engine',
+            field=models.CharField(default='arima', max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='forecastrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('store_id', 'engine'), name='forecast_run_one_active_per_store_engine'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 class StoreManager(AbstractUser):
     is_manager = models.BooleanField(default=True)  # Identify store managers
@@ -28,16 +29,55 @@ class Sales(models.Model):
     store = models.ForeignKey(Store, on_delete=models.CASCADE)
     day_of_week = models.IntegerField()
     date = models.DateField()
-    sales = models.DecimalField(max_digits=10, decimal_places=2)
+    sales = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
     customers = models.IntegerField()
     open = models.BooleanField()
     promo = models.BooleanField()
     state_holiday = models.CharField(max_length=1)  # '0', 'a', 'b', 'c'
     school_holiday = models.BooleanField()
 
-    def __str__(self):
+    class Meta:
+        # One row per store and day; loaders upsert on this key
         unique_together = ('store', 'date')
+        indexes = [models.Index(fields=['date'])]
+
+    def __str__(self):
         return f"Sales for Store {self.store.store_id} on {self.date}"
+
+
+class IngestCheckpoint(models.Model):
+    """
+    Progress of a file load, committed together with each batch so an interrupted load can resume
+    """
+    source = models.CharField(max_length=500, unique=True)
+    rows_done = models.BigIntegerField(default=0)  # Data rows consumed from the file (header excluded)
+    # Fingerprint of the file the rows were counted in (ingest.source_fingerprint)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    file_mtime = models.FloatField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.rows_done} rows{' (completed)' if self.completed else ''}"
+
+
+class DailyStoreTypeSales(models.Model):
+    """
+    Rollup of Sales per day, store type and promo flag - the cube behind the sales dashboard
+    """
+    date = models.DateField()
+    store_type = models.CharField(max_length=1)
+    promo = models.BooleanField()
+    total_sales = models.DecimalField(max_digits=14, decimal_places=2)
+    row_count = models.IntegerField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'store_type', 'promo')
+
+    def __str__(self):
+        return f"{self.date} type {self.store_type} promo={self.promo}: {self.total_sales}"
     
 
 class Inventory(models.Model):
@@ -51,16 +91,88 @@ class Inventory(models.Model):
 
 
 class Forecast(models.Model):
+    """
+    One version of a store's forecast for a date. Every row written by a run shares its
+    generated_at, so the newest generated_at per store is the current forecast (see forecasts.py)
+    """
     store_id = models.IntegerField()
     date = models.DateField()
     forecasted_sales = models.FloatField()
+    run = models.ForeignKey('ForecastRun', null=True, blank=True, on_delete=models.SET_NULL, related_name='forecasts')
+    generated_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        # Prevent duplicates for the same store and date
-        unique_together = ('store_id', 'date')  
+        constraints = [
+            # A run writes each store/date once; re-saving the same run upserts
+            models.UniqueConstraint(fields=['store_id', 'date', 'run'], name='forecast_one_row_per_run_and_date'),
+        ]
+        indexes = [models.Index(fields=['store_id', '-generated_at', 'date'])]
 
     def __str__(self):
         return f"Store {self.store_id} - {self.date} : {self.forecasted_sales}"
+
+
+class ForecastRun(models.Model):
+    """
+    One forecast job for a store and engine. forecast_sales enqueues pending jobs and workers
+    on any host claim them one at a time (see forecast_queue), so concurrent runs never
+    forecast the same store twice with the same engine.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        COMPLETED = 'completed'
+        FAILED = 'failed'
+        TIMEOUT = 'timeout'
+
+    ACTIVE = [Status.PENDING, Status.RUNNING]
+
+    store_id = models.IntegerField()
+    engine = models.CharField(max_length=20, default='arima')  # Name in arima_forecast.FORECASTERS
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    rmse = models.FloatField(null=True, blank=True)
+    order = models.JSONField(null=True, blank=True)  # [p, d, q] of the fitted model
+    duration = models.FloatField(null=True, blank=True)  # Seconds spent fitting and forecasting
+    # Holdout dates with actual and predicted sales, kept so plots can be rendered on demand
+    holdout = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)  # host:pid that claimed the job
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one queued or running job per store and engine, so enqueueing is idempotent
+            models.UniqueConstraint(fields=['store_id', 'engine'], condition=models.Q(status__in=['pending', 'running']),
+                                    name='forecast_run_one_active_per_store_engine'),
+        ]
+        indexes = [models.Index(fields=['status', 'store_id']), models.Index(fields=['store_id', '-created_at'])]
+
+    def __str__(self):
+        return f"Store {self.store_id} {self.engine} forecast run {self.pk}: {self.status}"
+
+
+class ArimaModelState(models.Model):
+    """
+    Selected ARIMA order and fitted parameters per store, reused by forecast_sales --refresh
+    """
+    store_id = models.IntegerField(unique=True)
+    order = models.JSONField()  # [p, d, q]
+    params = models.JSONField()  # Fitted parameter values, in param_names order
+    param_names = models.JSONField()
+    rmse = models.FloatField()  # Holdout RMSE of the latest fit
+    search_rmse = models.FloatField()  # Holdout RMSE when the order was last searched
+    searched_at = models.DateTimeField()
+    fitted_at = models.DateTimeField(auto_now=True)
+
+    def as_prior(self):
+        """The warm-start state forecast_store expects."""
+        return {'order': self.order, 'params': self.params, 'rmse': self.search_rmse}
+
+    def __str__(self):
+        return f"Store {self.store_id} - ARIMA{tuple(self.order)} (RMSE: {self.rmse:.2f})"
     
 
 class DummyCategoryInventory(models.Model):
@@ -71,6 +183,64 @@ class DummyCategoryInventory(models.Model):
     category_name = models.CharField(max_length=50)
     quantity = models.IntegerField(default=0)
     last_updated = models.DateTimeField(auto_now=True)
+    # Low stock below this; forecast-driven (see reorder.py), the old global threshold until then
+    reorder_point = models.IntegerField(default=15000)
+    daily_demand = models.FloatField(null=True, blank=True)  # Forecast units per day behind reorder_point
+    reorder_point_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One stock row per store and category; stock.apply_sale decrements it in place
+            models.UniqueConstraint(fields=['store', 'category_name'], name='dummy_inventory_one_row_per_category'),
+        ]
+        indexes = [
+            # Quantity filters are range scans on quantity
+            models.Index(fields=['quantity']),
+            # Low-stock alerts (quantity below reorder point) are a range scan on the shortfall
+            models.Index(models.F('quantity') - models.F('reorder_point'), name='dummy_inventory_shortfall_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_name} - Store {self.store.store_id}"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only ledger of stock changes per store and category; quantity is the signed change.
+    A category's level is its newest StockSnapshot plus the movements after it (see stock.py)
+    """
+    class Kind(models.TextChoices):
+        SALE = 'sale'
+        RECEIPT = 'receipt'
+        ADJUSTMENT = 'adjustment'
+
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    category_name = models.CharField(max_length=50)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    quantity = models.IntegerField()
+    reference = models.CharField(max_length=100, blank=True)  # e.g. a receipt or order number
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['store', 'category_name', 'id']), models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} {self.category_name} - Store {self.store_id}"
+
+
+class StockSnapshot(models.Model):
+    """
+    Stock level of a store's category after every movement up to last_movement_id, so levels
+    are computed from the newest snapshot and only the movements recorded since
+    """
+    store = models.ForeignKey(Store, on_delete=models.CASCADE)
+    category_name = models.CharField(max_length=50)
+    quantity = models.IntegerField()
+    last_movement_id = models.BigIntegerField(default=0)
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['store', 'category_name', '-last_movement_id'])]
 
     def __str__(self):
-        return f"{self.category_name} - Store {self.store.store_id}"
\ No newline at end of file
+        return f"{self.category_name} - Store {self.store_id}: {self.quantity} at {self.taken_at}"
@@ -0,0 +1,72 @@
+# inventory_dashboard/reorder.py
+
+import math
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .forecasts import latest_forecasts
+from .models import DummyCategoryInventory, Store
+from .utils import category_splits
+
+DAYS_OF_COVER = 7  # Stock should last this many days of forecast demand before it is reordered
+
+
+def below_reorder_point(queryset):
+    """Stock rows under their reorder point, most short first; a range scan on the shortfall index."""
+    return queryset.alias(shortfall=F('quantity') - F('reorder_point')) \
+                   .filter(shortfall__lt=0) \
+                   .order_by('shortfall', 'id')
+
+
+def store_daily_demand(days, store_ids=None):
+    """
+    Mean forecast sales per day over the first `days` days of each store's newest forecast,
+    as a Series indexed by store_id (stores without a forecast are left out).
+    """
+    forecasts = latest_forecasts()
+    if store_ids is not None:
+        forecasts = forecasts.filter(store_id__in=store_ids)
+    frame = pd.DataFrame(list(forecasts.values_list('store_id', 'forecasted_sales')),
+                         columns=['store_id', 'forecasted_sales'])
+    if frame.empty:
+        return pd.Series(dtype=float)
+    # Rows arrive ordered by store and date, so head() keeps each store's nearest days
+    return frame.groupby('store_id').head(math.ceil(days)).groupby('store_id')['forecasted_sales'].mean()
+
+
+def recompute_reorder_points(days_of_cover=DAYS_OF_COVER, store_ids=None):
+    """
+    Sets each category's reorder point to days_of_cover days of its forecast demand: the store's
+    daily forecast times the category's share (utils.category_splits). Stores without a
+    forecast keep their current reorder points. Returns the number of stock rows updated.
+    """
+    demand = store_daily_demand(days_of_cover, store_ids)
+    if demand.empty:
+        return 0
+
+    stores = Store.objects.filter(store_id__in=demand.index.tolist()) \
+                          .values_list('store_id', 'store_type', 'assortment', 'competition_distance')
+    stores = pd.DataFrame(list(stores), columns=['store_id', 'store_type', 'assortment', 'competition_distance'])
+    # Daily demand per store and category in one frame
+    category_demand = category_splits(stores.set_index('store_id')).mul(demand, axis=0).stack().to_dict()
+
+    now = timezone.now()
+    rows = []
+    stocked = DummyCategoryInventory.objects.filter(store_id__in=stores['store_id'].tolist()) \
+                                            .values_list('pk', 'store_id', 'category_name')
+    for pk, store_id, category in stocked:
+        if (store_id, category) not in category_demand:
+            continue
+        daily_demand = float(category_demand[store_id, category])
+        rows.append(DummyCategoryInventory(
+            pk=pk, store_id=store_id, category_name=category, daily_demand=daily_demand,
+            reorder_point=math.ceil(daily_demand * days_of_cover), reorder_point_at=now,
+        ))
+
+    # UPDATE ... WHERE id IN (...) on the reorder columns only: quantities written meanwhile are
+    # left alone, and rows deleted since they were read stay deleted
+    with transaction.atomic():
+        return DummyCategoryInventory.objects.bulk_update(
+            rows, ['reorder_point', 'daily_demand', 'reorder_point_at'], batch_size=500,
+        )
@@ -0,0 +1,54 @@
+# inventory_dashboard/rollups.py
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from .models import DailyStoreTypeSales, Sales
+
+DATES_PER_BATCH = 31  # Keeps IN (...) lists well below backend parameter limits
+
+
+def _date_batches(dates):
+    dates = sorted(dates)
+    for i in range(0, len(dates), DATES_PER_BATCH):
+        yield dates[i:i + DATES_PER_BATCH]
+
+
+def _store_type_rollup_rows(sales):
+    rows = sales.values_list('date', 'store__store_type', 'promo') \
+                .annotate(total_sales=Sum('sales'), row_count=Count('id')) \
+                .order_by()
+    return [
+        DailyStoreTypeSales(date=date, store_type=store_type, promo=promo,
+                            total_sales=total_sales, row_count=row_count)
+        for date, store_type, promo, total_sales, row_count in rows
+    ]
+
+
+def refresh_sales_rollups(store_dates):
+    """
+    Recomputes the rollup rows touched by the given (store_id, date) pairs.
+    Only the affected days are re-aggregated, so the cost follows the size of the write.
+    """
+    dates = {day for _, day in store_dates}
+    if not dates:
+        return
+
+    with transaction.atomic():
+        for batch in _date_batches(dates):
+            DailyStoreTypeSales.objects.filter(date__in=batch).delete()
+            DailyStoreTypeSales.objects.bulk_create(
+                _store_type_rollup_rows(Sales.objects.filter(date__in=batch))
+            )
+
+
+def rebuild_sales_rollups(batch_size=10_000):
+    """
+    Drops and rebuilds the rollup table from the full Sales table; returns the number of
+    (day, store type, promo) rows written.
+    """
+    with transaction.atomic():
+        DailyStoreTypeSales.objects.all().delete()
+        rows = DailyStoreTypeSales.objects.bulk_create(
+            _store_type_rollup_rows(Sales.objects.all()), batch_size=batch_size
+        )
+    return len(rows)
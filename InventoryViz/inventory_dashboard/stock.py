@@ -0,0 +1,268 @@
+# inventory_dashboard/stock.py
+
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import DummyCategoryInventory, StockMovement, StockSnapshot
+
+Kind = StockMovement.Kind
+
+# Newest movements left out of a snapshot: a transaction still open at the cutoff can commit
+# a movement with a lower id than ones already snapshotted, and it would then never be counted
+SNAPSHOT_LAG_SECONDS = 60
+
+
+class StockError(Exception):
+    """A sale line that cannot be applied; nothing of its batch was written."""
+
+    def __init__(self, message, store_id, category):
+        super().__init__(message)
+        self.store_id = store_id
+        self.category = category
+
+
+class UnknownStockItem(StockError):
+    pass
+
+
+class InsufficientStock(StockError):
+    pass
+
+
+def parse_sale_lines(payload):
+    """
+    Sale lines as (store_id, category, quantity) from a request body: one line
+    {"store", "category", "quantity"} or {"lines": [...]} of them. Raises ValueError when malformed.
+    """
+    lines = payload.get('lines', [payload]) if isinstance(payload, dict) else None
+    if not isinstance(lines, list) or not lines:
+        raise ValueError("Expected a sale line or a non-empty 'lines' list")
+
+    parsed = []
+    for line in lines:
+        try:
+            store_id, category, quantity = int(line['store']), line['category'], line['quantity']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Each line needs a numeric 'store', a 'category' and a 'quantity'")
+        if not isinstance(category, str) or not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise ValueError("'category' must be a string and 'quantity' an integer")
+        if quantity <= 0:
+            raise ValueError("Quantities must be positive")
+        parsed.append((store_id, category, quantity))
+    return parsed
+
+
+def _append_movements(changes, kind, reference, now):
+    StockMovement.objects.bulk_create([
+        StockMovement(store_id=store_id, category_name=category, kind=kind, quantity=change,
+                      reference=reference, created_at=now)
+        for (store_id, category), change in changes.items()
+    ])
+
+
+def apply_sale(lines, reference=''):
+    """
+    Takes sale lines of (store_id, category, quantity) out of category stock in one transaction.
+    Each (store, category) gets a single UPDATE ... SET quantity = quantity - n WHERE quantity >= n,
+    so concurrent sales neither lose updates nor oversell, and a sale movement is appended to the
+    ledger. If any line cannot be met the whole batch is rolled back (UnknownStockItem /
+    InsufficientStock). Returns the remaining quantity per (store_id, category).
+    """
+    demand = defaultdict(int)
+    for store_id, category, quantity in lines:
+        demand[store_id, category] += quantity
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Rows are locked in a fixed order, so two overlapping batches cannot deadlock
+        for (store_id, category), quantity in sorted(demand.items()):
+            stock = DummyCategoryInventory.objects.filter(store_id=store_id, category_name=category)
+            # update() skips auto_now, so last_updated is set explicitly
+            if stock.filter(quantity__gte=quantity).update(quantity=F('quantity') - quantity, last_updated=now):
+                continue
+            available = stock.values_list('quantity', flat=True).first()
+            if available is None:
+                raise UnknownStockItem(f"No '{category}' stock for Store {store_id}", store_id, category)
+            raise InsufficientStock(
+                f"Store {store_id} has {available} '{category}' in stock, {quantity} requested", store_id, category,
+            )
+        _append_movements({key: -quantity for key, quantity in demand.items()}, Kind.SALE, reference, now)
+
+        remaining = DummyCategoryInventory.objects.filter(
+            store_id__in={store_id for store_id, _ in demand},
+            category_name__in={category for _, category in demand},
+        ).values_list('store_id', 'category_name', 'quantity')
+        return {(store_id, category): quantity for store_id, category, quantity in remaining
+                if (store_id, category) in demand}
+
+
+def record_movements(changes, kind, reference=''):
+    """
+    Receipts and adjustments: applies signed changes {(store_id, category): quantity} to category
+    stock with atomic increments (no read-modify-write) and appends them to the ledger, all in one
+    transaction. Raises UnknownStockItem for a category the store does not stock.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for (store_id, category), change in sorted(changes.items()):
+            stock = DummyCategoryInventory.objects.filter(store_id=store_id, category_name=category)
+            if not stock.update(quantity=F('quantity') + change, last_updated=now):
+                raise UnknownStockItem(f"No '{category}' stock for Store {store_id}", store_id, category)
+        _append_movements(changes, kind, reference, now)
+
+
+def set_stock_levels(levels, reference='', dry_run=False):
+    """
+    Sets category stock to {(store_id, category): quantity} with one bulk upsert (missing rows are
+    created) and books each difference as an adjustment, all in one transaction. Returns
+    {(store_id, category): (previous quantity or None, quantity)} for the rows that change;
+    with dry_run nothing is written.
+    """
+    with transaction.atomic():
+        current = dict(
+            ((store_id, category), quantity) for store_id, category, quantity in
+            DummyCategoryInventory.objects.filter(store_id__in={store_id for store_id, _ in levels})
+                                          .values_list('store_id', 'category_name', 'quantity')
+        )
+        changes = {key: (current.get(key), quantity) for key, quantity in levels.items() if current.get(key) != quantity}
+        if dry_run or not changes:
+            return changes
+
+        DummyCategoryInventory.objects.bulk_create(
+            [DummyCategoryInventory(store_id=store_id, category_name=category, quantity=quantity)
+             for (store_id, category), (_, quantity) in changes.items()],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['store', 'category_name'],
+            update_fields=['quantity', 'last_updated'],
+        )
+        _append_movements({key: quantity - (previous or 0) for key, (previous, quantity) in changes.items()
+                           if quantity != (previous or 0)}, Kind.ADJUSTMENT, reference, timezone.now())
+    return changes
+
+
+def save_stock_form(form):
+    """
+    Saves a DummyCategoryInventoryForm and books what it changed as adjustments, so edits by
+    hand show up in the ledger like any other stock change.
+    """
+    with transaction.atomic():
+        before = DummyCategoryInventory.objects.filter(pk=form.instance.pk) \
+                                               .values_list('store_id', 'category_name', 'quantity').first()
+        item = form.save()
+        changes = defaultdict(int)
+        if before is not None:
+            changes[before[:2]] -= before[2]
+        changes[item.store_id, item.category_name] += item.quantity
+        _append_movements({key: change for key, change in changes.items() if change},
+                          Kind.ADJUSTMENT, 'edit', timezone.now())
+    return item
+
+
+def delete_stock_item(item):
+    """Deletes a category's stock row, writing its remaining quantity off in the ledger."""
+    with transaction.atomic():
+        if item.quantity:
+            _append_movements({(item.store_id, item.category_name): -item.quantity},
+                              Kind.ADJUSTMENT, 'delete', timezone.now())
+        item.delete()
+
+
+def _newest_snapshot(at=None):
+    # Correlated on the outer row's (store, category); served by the snapshot index
+    newest = StockSnapshot.objects.filter(store_id=OuterRef('store_id'), category_name=OuterRef('category_name'))
+    if at is not None:
+        newest = newest.filter(taken_at__lte=at)
+    return newest.order_by('-last_movement_id')
+
+
+def _ledger(store_ids=None, at=None, upto_id=None):
+    """
+    Per (store_id, category): [newest snapshot quantity, sum of the movements after it, id of the
+    newest of those movements or None]. Two indexed queries whatever the length of the history.
+    """
+    newest = _newest_snapshot(at)
+    snapshots = StockSnapshot.objects.filter(pk=Subquery(newest.values('pk')[:1]))
+    movements = StockMovement.objects.filter(id__gt=Coalesce(Subquery(newest.values('last_movement_id')[:1]), 0))
+    if at is not None:
+        movements = movements.filter(created_at__lte=at)
+    if upto_id is not None:
+        movements = movements.filter(id__lte=upto_id)
+    if store_ids is not None:
+        snapshots = snapshots.filter(store_id__in=store_ids)
+        movements = movements.filter(store_id__in=store_ids)
+
+    ledger = {
+        (store_id, category): [quantity, 0, None]
+        for store_id, category, quantity in snapshots.values_list('store_id', 'category_name', 'quantity')
+    }
+    deltas = movements.values_list('store_id', 'category_name') \
+                      .annotate(change=Sum('quantity'), last=Max('id')) \
+                      .order_by()
+    for store_id, category, change, last in deltas:
+        entry = ledger.setdefault((store_id, category), [0, 0, None])
+        entry[1], entry[2] = change, last
+    return ledger
+
+
+def stock_levels(store_ids=None, at=None):
+    """
+    Stock per (store_id, category) from the ledger: the newest snapshot plus the movements since.
+    With at (a datetime), the level at that moment instead of now (history starts at each
+    category's opening snapshot, see take_stock_snapshots).
+    """
+    return {key: base + change for key, (base, change, _) in _ledger(store_ids, at).items()}
+
+
+def take_stock_snapshots(cutoff=None, lag=SNAPSHOT_LAG_SECONDS):
+    """
+    Compacts the ledger: a new snapshot for every (store, category) with movements since its last
+    one, covering movements up to cutoff (default: lag seconds ago). Categories not yet in the
+    ledger get an opening snapshot of their current quantity. Returns the number of snapshots written.
+
+    Callers must not snapshot up to now: a movement committed after its snapshot was taken but
+    with an id below the snapshot's watermark would be skipped by every later ledger read.
+    """
+    now = timezone.now()
+    cutoff = cutoff or now - timedelta(seconds=lag)
+    with transaction.atomic():
+        watermark = StockMovement.objects.filter(created_at__lte=cutoff).aggregate(last=Max('id'))['last'] or 0
+
+        # Current quantities already include every movement recorded so far
+        snapped = set(StockSnapshot.objects.values_list('store_id', 'category_name').distinct())
+        recorded = dict(
+            ((store_id, category), last) for store_id, category, last in
+            StockMovement.objects.values_list('store_id', 'category_name').annotate(last=Max('id')).order_by()
+        )
+        opening = [
+            StockSnapshot(store_id=store_id, category_name=category, quantity=quantity,
+                          last_movement_id=recorded.get((store_id, category), 0), taken_at=now)
+            for store_id, category, quantity in
+            DummyCategoryInventory.objects.values_list('store_id', 'category_name', 'quantity')
+            if (store_id, category) not in snapped
+        ]
+        opened = {(snapshot.store_id, snapshot.category_name) for snapshot in opening}
+
+        compacted = [
+            StockSnapshot(store_id=store_id, category_name=category, quantity=base + change,
+                          last_movement_id=last, taken_at=cutoff)
+            for (store_id, category), (base, change, last) in _ledger(upto_id=watermark).items()
+            if last is not None and (store_id, category) not in opened
+        ]
+        StockSnapshot.objects.bulk_create(opening + compacted, batch_size=1000)
+    return len(opening) + len(compacted)
+
+
+def stock_drift():
+    """(store_id, category, quantity, ledger level) for every category whose quantity disagrees with the ledger."""
+    levels = stock_levels()
+    return [
+        (store_id, category, quantity, levels.get((store_id, category)))
+        for store_id, category, quantity in
+        DummyCategoryInventory.objects.order_by('store_id', 'category_name')
+                                      .values_list('store_id', 'category_name', 'quantity')
+        if levels.get((store_id, category)) != quantity
+    ]
@@ -0,0 +1,139 @@
+# inventory_dashboard/store_cache.py
+
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .ingest import STDIN, read_table_chunks
+
+CACHE_FORMAT = 1
+
+# Columns the forecasting pipeline needs, with the on-disk dtype of each
+CACHED_COLUMNS = {
+    'Date': 'datetime64[ns]',
+    'Sales': 'float64',
+    'Open': 'int8',
+    'Promo': 'int8',
+    'StateHoliday': '<U1',
+    'SchoolHoliday': 'int8',
+}
+
+
+def _fingerprint(source):
+    stat = os.stat(source)
+    return {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class StorePartitionCache:
+    """
+    train.csv preprocessed once into per-column .npy files sorted by store, plus an
+    offsets index, so a single store's rows are a memory-mapped slice.
+
+    The cache directory is named after the source file's path, size and mtime, so
+    editing or replacing the file invalidates it automatically.
+    """
+
+    def __init__(self, train_source, cache_dir=None):
+        if train_source == STDIN:
+            raise ValueError("stdin cannot be cached; pass a file path")
+        self.train_source = train_source
+        self.cache_dir = cache_dir or settings.FORECAST_DATA_CACHE_DIR
+        self.fingerprint = {'format': CACHE_FORMAT, 'train': _fingerprint(train_source)}
+        key = hashlib.sha1(json.dumps(self.fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+        self.path = os.path.join(self.cache_dir, key)
+        self._index = None
+
+    def is_fresh(self):
+        return os.path.exists(os.path.join(self.path, 'manifest.json'))
+
+    def ensure(self):
+        """Builds the cache if the source changed since it was last built. Returns True if it was rebuilt."""
+        if self.is_fresh():
+            return False
+        self.build()
+        return True
+
+    def build(self, chunksize=200_000):
+        usecols = ['Store'] + list(CACHED_COLUMNS)
+        frame = pd.concat(
+            read_table_chunks(self.train_source, chunksize=chunksize, usecols=usecols,
+                              parse_dates=['Date'], dtype={'StateHoliday': 'string'}),
+            ignore_index=True,
+        )
+        frame = frame.fillna({'Sales': 0, 'Open': 1, 'Promo': 0, 'StateHoliday': '0', 'SchoolHoliday': 0})
+        frame = frame.sort_values(['Store', 'Date'], kind='stable')
+
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        for column, dtype in CACHED_COLUMNS.items():
+            values = frame[column].astype(str) if column == 'StateHoliday' else frame[column]
+            np.save(os.path.join(tmp_path, f"{column}.npy"), values.to_numpy().astype(dtype))
+
+        # Row range of every store in the sorted column files
+        store_values = frame['Store'].to_numpy()
+        store_ids, starts = np.unique(store_values, return_index=True)
+        ends = np.append(starts[1:], len(store_values))
+        np.save(os.path.join(tmp_path, 'index.npy'), np.column_stack([store_ids, starts, ends]).astype('int64'))
+
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+            json.dump({**self.fingerprint, 'rows': len(frame), 'stores': len(store_ids)}, f)
+
+        if os.path.isdir(self.path) and not self.is_fresh():
+            # Debris without a manifest is never a published build
+            shutil.rmtree(self.path, ignore_errors=True)
+        try:
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Another process published the same key first; its build is as good as ours
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not self.is_fresh():
+                raise
+        self._prune_stale()
+        self._index = None
+
+    def _prune_stale(self):
+        # Drop caches built from older versions of the same source file
+        current = os.path.basename(self.path)
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir() or entry.name == current or '.tmp-' in entry.name:
+                continue
+            try:
+                with open(os.path.join(entry.path, 'manifest.json')) as f:
+                    source_path = json.load(f)['train']['path']
+            except (OSError, ValueError, KeyError):
+                continue
+            if source_path == self.fingerprint['train']['path']:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _load_index(self):
+        if self._index is None:
+            index = np.load(os.path.join(self.path, 'index.npy'))
+            self._index = {int(store_id): (int(start), int(end)) for store_id, start, end in index}
+        return self._index
+
+    def store_ids(self):
+        return sorted(self._load_index())
+
+    def load_all(self):
+        """Every cached row as one DataFrame shaped like the merged train data, sorted by store and date."""
+        index = np.load(os.path.join(self.path, 'index.npy'))
+        frame = pd.DataFrame({
+            column: np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode='r')
+            for column in CACHED_COLUMNS
+        })
+        frame['Store'] = np.repeat(index[:, 0], index[:, 2] - index[:, 1])
+        return frame
+
+    def load_store(self, store_id):
+        """Rows of one store as a DataFrame shaped like the merged train data (empty if unknown)."""
+        start, end = self._load_index().get(int(store_id), (0, 0))
+        columns = {
+            column: np.load(os.path.join(self.path, f"{column}.npy"), mmap_mode='r')[start:end]
+            for column in CACHED_COLUMNS
+        }
+        frame = pd.DataFrame({column: np.array(values) for column, values in columns.items()})
+        frame['Store'] = int(store_id)
+        return frame
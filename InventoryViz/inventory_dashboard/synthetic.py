@@ -0,0 +1,37 @@
+# inventory_dashboard/synthetic.py
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_train_frame(store_ids, start='2013-01-01', days=942, seed=0):
+    """
+    Rossmann train.csv-shaped data (one row per store and day) for benchmarks and offline runs.
+    Sales follow a per-store level with weekly seasonality, promo uplift and noise; stores close on Sundays.
+    """
+    rng = np.random.default_rng(seed)
+    store_ids = np.asarray(store_ids, dtype=int)
+    dates = pd.date_range(start, periods=days, freq='D')
+
+    store = np.repeat(store_ids, days)
+    date = np.tile(dates.values, len(store_ids))
+    day_of_week = np.tile(dates.dayofweek.values + 1, len(store_ids))
+
+    level = np.repeat(rng.uniform(3000, 12000, len(store_ids)), days)
+    weekly = 1 + 0.15 * np.sin(2 * np.pi * day_of_week / 7)
+    promo = rng.random(len(store)) < 0.4
+    open_ = day_of_week != 7
+    sales = np.where(open_, level * weekly * np.where(promo, 1.2, 1.0) * rng.normal(1, 0.1, len(store)), 0)
+    sales = np.clip(sales, 0, None).round().astype(int)
+
+    return pd.DataFrame({
+        'Store': store,
+        'DayOfWeek': day_of_week,
+        'Date': pd.to_datetime(date).strftime('%Y-%m-%d'),
+        'Sales': sales,
+        'Customers': (sales / rng.uniform(7, 10, len(store))).astype(int),
+        'Open': open_.astype(int),
+        'Promo': (promo & open_).astype(int),
+        'StateHoliday': rng.choice(['0', '0', '0', '0', '0', '0', '0', '0', 'a', 'b'], len(store)),
+        'SchoolHoliday': (rng.random(len(store)) < 0.18).astype(int),
+    })
@@ -1,3 +1,1159 @@
-from django.test import TestCase
+import gzip
+import importlib
+import io
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from . import arima_forecast, backtest, forecast_queue, reorder
+from .aggregations import build_sales_cube, load_sales_cube, sales_distribution
+from .arima_forecast import (
+    Forecaster,
+    encode_exog,
+    forecast_store,
+    get_forecaster,
+    prepare_future_exog,
+    sales_matrix,
+    seasonal_smoothing_forecast,
+)
+from .backtest import backtest_store, forecast_errors, parse_config, summarize_backtest
+from .exports import export_stream
+from .figure_cache import (
+    FigureCache,
+    FileFigureBackend,
+    LocMemFigureBackend,
+    get_figure_cache,
+    get_series_cache,
+    sales_data_version,
+)
+from .forecast_plots import forecast_plot_path, render_forecast_plot
+from .forecast_queue import claim_forecast, claim_forecasts, enqueue_forecasts
+from .forecasts import forecast_rows, forecast_versions, latest_forecast, latest_forecasts, save_forecast
+from .ingest import insert_sales_frame, normalize_sales_chunk, read_table_chunks
+from .management.commands.forecast_sales import Command as ForecastSalesCommand
+from .models import (
+    ArimaModelState,
+    DailyStoreTypeSales,
+    DummyCategoryInventory,
+    Forecast,
+    ForecastRun,
+    IngestCheckpoint,
+    Inventory,
+    Sales,
+    StockMovement,
+    StockSnapshot,
+    Store,
+)
+from .rollups import rebuild_sales_rollups, refresh_sales_rollups
+from .stock import (
+    InsufficientStock,
+    UnknownStockItem,
+    apply_sale,
+    record_movements,
+    set_stock_levels,
+    stock_drift,
+    stock_levels,
+    take_stock_snapshots,
+)
+from .store_cache import StorePartitionCache
+from .synthetic import synthetic_train_frame
+from .utils import category_splits, get_dummy_category_split
+from .views import INVENTORY_ROWS_PER_PAGE
 
-# Create your tests here.
+Status = ForecastRun.Status
+
+TRAIN_CSV_HEADER = 'Store,DayOfWeek,Date,Sales,Customers,Open,Promo,StateHoliday,SchoolHoliday\n'
+
+
+def _sale(store, day, amount, promo=False):
+    return Sales.objects.create(store=store, date=day, day_of_week=day.isoweekday(), sales=amount, customers=10,
+                                open=True, promo=promo, state_holiday='0', school_holiday=False)
+
+
+def _train_rows(store_ids, days, start=date(2015, 1, 1), base=100):
+    """train.csv lines for every store and day, with sales that identify the row."""
+    return ''.join(
+        f"{store_id},{(start + timedelta(days=day)).isoweekday()},{start + timedelta(days=day)},"
+        f"{base + store_id * 10 + day},5,1,0,0,0\n"
+        for day in range(days) for store_id in store_ids
+    )
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.stores = [Store.objects.create(store_id=1, store_type='a', assortment='a'),
+                       Store.objects.create(store_id=2, store_type='a', assortment='c'),
+                       Store.objects.create(store_id=3, store_type='b', assortment='a')]
+
+    def add_sales(self):
+        return [_sale(store, date(2015, 1, day), Decimal(100 * store.store_id + day), promo=day % 2 == 0)
+                for store in self.stores for day in range(1, 5)]
+
+    def assertRollupMatchesSales(self):
+        columns = ['date', 'promo', 'store_type']
+        rollup = load_sales_cube().sort_values(columns).reset_index(drop=True)
+        scan = build_sales_cube().sort_values(columns).reset_index(drop=True)
+        pd.testing.assert_frame_equal(rollup, scan)
+
+    def test_refresh_matches_raw_aggregate(self):
+        sales = self.add_sales()
+        refresh_sales_rollups((sale.store_id, sale.date) for sale in sales)
+        self.assertRollupMatchesSales()
+
+        # An edit moving a sale to another day refreshes both days
+        sale = sales[0]
+        previous_key = (sale.store_id, sale.date)
+        sale.date, sale.sales = date(2015, 1, 9), Decimal('55.55')
+        sale.save()
+        refresh_sales_rollups([previous_key, (sale.store_id, sale.date)])
+        self.assertRollupMatchesSales()
+
+    def test_rebuild_and_migration_backfill_match_raw_aggregate(self):
+        self.add_sales()
+        self.assertEqual(rebuild_sales_rollups(), 8)  # 4 days x (type a, type b)
+        self.assertRollupMatchesSales()
+
+        DailyStoreTypeSales.objects.all().delete()
+        migration = importlib.import_module('inventory_dashboard.migrations.0019_backfill_sales_rollups')
+        migration.backfill_sales_rollups(apps, None)
+        self.assertRollupMatchesSales()
+
+    def test_cube_falls_back_to_sales_while_rollup_is_empty(self):
+        _sale(self.stores[0], date(2015, 1, 1), Decimal('10.00'))
+        self.assertFalse(DailyStoreTypeSales.objects.exists())
+        self.assertEqual(load_sales_cube()['total_sales'].sum(), 10.0)
+
+    def test_failed_refresh_rolls_back_the_sale(self):
+        form = {'store': 1, 'date': '2015-01-01', 'sales': '10.00', 'customers': 1, 'open': True,
+                'state_holiday': '0'}
+        with mock.patch('inventory_dashboard.views.refresh_sales_rollups', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/auth/add-sales/', form)
+        self.assertFalse(Sales.objects.exists())
+
+        self.client.post('/auth/add-sales/', form)
+        self.assertEqual(Sales.objects.count(), 1)
+        self.assertRollupMatchesSales()
+
+
+class SalesDistributionTests(TestCase):
+    def test_matches_numpy_reference(self):
+        stores = [Store.objects.create(store_id=store_id, store_type='a', assortment='a') for store_id in (1, 2, 3)]
+        rng = np.random.default_rng(7)
+        amounts = np.round(np.concatenate([rng.normal(5000, 800, 200), [20000.0, 21000.0, 5.0]]), 2)
+        for i, amount in enumerate(amounts):
+            _sale(stores[i % 3], date(2013, 1, 1) + timedelta(days=i // 3), Decimal(f"{amount:.2f}"))
+
+        with self.assertNumQueries(6):
+            stats = sales_distribution(bins=30)
+
+        counts, edges = np.histogram(amounts, bins=30)
+        self.assertEqual(stats['counts'], counts.tolist())
+        np.testing.assert_allclose(stats['edges'], edges)
+        q1, median, q3 = np.quantile(amounts, [0.25, 0.5, 0.75])
+        self.assertAlmostEqual(stats['q1'], q1)
+        self.assertAlmostEqual(stats['median'], median)
+        self.assertAlmostEqual(stats['q3'], q3)
+
+        iqr = q3 - q1
+        inside = amounts[(amounts >= q1 - 1.5 * iqr) & (amounts <= q3 + 1.5 * iqr)]
+        self.assertEqual((stats['lowerfence'], stats['upperfence']), (inside.min(), inside.max()))
+        self.assertEqual(stats['outlier_count'], len(amounts) - len(inside))
+        self.assertEqual(sorted(stats['outliers']), sorted(set(amounts) - set(inside)))
+
+    def test_no_sales(self):
+        self.assertIsNone(sales_distribution())
+
+
+class FigureCacheTests(TestCase):
+    def test_renders_once_per_version(self):
+        cache = FigureCache(LocMemFigureBackend(max_entries=2))
+        render = mock.Mock(side_effect=['v1 figure', 'v2 figure'])
+
+        self.assertEqual(cache.get_or_render('trend', 'v1', render), 'v1 figure')
+        self.assertEqual(cache.get_or_render('trend', 'v1', render), 'v1 figure')
+        self.assertEqual(cache.get_or_render('trend', 'v2', render), 'v2 figure')
+        self.assertEqual(render.call_count, 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(cache.stats()['hit_rate'], round(1 / 3, 4))
+
+    def test_file_backend_evicts_least_recently_used(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        backend = FileFigureBackend(max_entries=2, location=location)
+        backend.set('a', 'A')
+        backend.set('b', 'B')
+        # Pushes the access times apart, so 'b' is the oldest once 'a' is read
+        os.utime(backend._path('b'), (0, 0))
+        self.assertEqual(backend.get('a'), 'A')
+        backend.set('c', 'C')
+
+        self.assertEqual(backend.count(), 2)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual((backend.get('a'), backend.get('c')), ('A', 'C'))
+
+    def test_version_changes_with_every_sales_write(self):
+        store = Store.objects.create(store_id=1, store_type='a', assortment='a')
+        versions = [sales_data_version()]
+
+        sale = _sale(store, date(2015, 1, 1), Decimal('10.00'))
+        refresh_sales_rollups([(1, sale.date)])
+        versions.append(sales_data_version())
+
+        # An edit keeps the row count but changes the rollup totals
+        Sales.objects.filter(pk=sale.pk).update(sales=Decimal('12.00'))
+        refresh_sales_rollups([(1, sale.date)])
+        versions.append(sales_data_version())
+
+        self.assertEqual(len(set(versions)), 3)
+        self.assertEqual(sales_data_version(), versions[-1])
+
+
+class SalesChartDataTests(TestCase):
+    def setUp(self):
+        get_figure_cache().clear()
+        get_series_cache().clear()
+        self.addCleanup(get_figure_cache().clear)
+        self.addCleanup(get_series_cache().clear)
+        stores = [Store.objects.create(store_id=1, store_type='a', assortment='a'),
+                  Store.objects.create(store_id=2, store_type='b', assortment='a')]
+        sales = [_sale(store, date(2015, 1, day), Decimal(10 * day + store.store_id), promo=day % 2 == 0)
+                 for store in stores for day in range(1, 11)]
+        refresh_sales_rollups((sale.store_id, sale.date) for sale in sales)
+
+    def test_chart_payloads(self):
+        trend = self.client.get('/auth/sales-dashboard/chart/sales_trend/')
+        self.assertEqual(trend['Content-Type'], 'application/json')
+        trend = trend.json()
+        self.assertEqual(trend['date'][:2], ['2015-01-01', '2015-01-02'])
+        self.assertEqual(trend['total_sales'][:2], [23.0, 43.0])
+        # No 7-day average before the seventh day
+        self.assertEqual(trend['moving_avg'][5:7], [None, round(sum(20 * day + 3 for day in range(1, 8)) / 7, 2)])
+
+        store_type = self.client.get('/auth/sales-dashboard/chart/store_type/').json()
+        self.assertEqual(store_type, {'store_type': ['a', 'b'], 'avg_sales': [56.0, 57.0]})
+
+        distribution = self.client.get('/auth/sales-dashboard/chart/distribution/').json()
+        self.assertEqual((distribution['n'], sum(distribution['counts'])), (20, 20))
+
+        self.assertEqual(self.client.get('/auth/sales-dashboard/chart/bogus/').status_code, 404)
+
+    def test_matching_etag_is_answered_with_304(self):
+        response = self.client.get('/auth/sales-dashboard/chart/promo/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/auth/sales-dashboard/chart/promo/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # New data, new version: the old tag no longer matches
+        sale = _sale(Store.objects.get(store_id=1), date(2015, 2, 1), Decimal('5.00'))
+        refresh_sales_rollups([(1, sale.date)])
+        response = self.client.get('/auth/sales-dashboard/chart/promo/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_distribution_does_not_build_the_series(self):
+        with mock.patch('inventory_dashboard.views.dashboard_series') as dashboard_series:
+            self.client.get('/auth/sales-dashboard/chart/distribution/')
+        dashboard_series.assert_not_called()
+
+        misses = get_series_cache().misses
+        self.client.get('/auth/sales-dashboard/chart/promo/')
+        self.client.get('/auth/sales-dashboard/chart/yearly/')
+        self.assertEqual(get_series_cache().misses, misses + 1)
+
+
+class SalesIngestTests(TestCase):
+    def setUp(self):
+        for store_id in (1, 2):
+            Store.objects.create(store_id=store_id, store_type='a', assortment='a')
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'train.csv')
+
+    def write_train(self, rows):
+        with open(self.path, 'w') as f:
+            f.write(TRAIN_CSV_HEADER + rows)
+
+    def load(self, *args, path=None):
+        out = io.StringIO()
+        call_command('load_sales_data', '--file', path or self.path, '--chunk-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_normalize_cleans_columns_and_drops_unknown_stores(self):
+        raw = pd.DataFrame({
+            'Store': [1, 2, 99], 'DayOfWeek': [4, 4, 4], 'Date': ['2015-01-01'] * 3,
+            'Sales': [120.0, np.nan, 5.0], 'Customers': [7, np.nan, 1], 'Open': [1, np.nan, 1],
+            'Promo': [1, 0, 0], 'StateHoliday': pd.array(['a', 'x', None], dtype='string'),
+            'SchoolHoliday': [0, 1, 0],
+        })
+        frame = normalize_sales_chunk(raw, [1, 2])
+
+        self.assertEqual(list(frame.columns), ['store_id', 'day_of_week', 'date', 'sales', 'customers',
+                                               'open', 'promo', 'state_holiday', 'school_holiday'])
+        self.assertEqual([tuple(row) for row in frame.itertuples(index=False)], [
+            (1, 4, date(2015, 1, 1), 120, 7, True, True, 'a', False),
+            (2, 4, date(2015, 1, 1), 0, 0, True, False, '0', True),
+        ])
+
+    def test_plain_insert_writes_every_row(self):
+        self.write_train(_train_rows([1, 2, 3], 2))
+        frame = normalize_sales_chunk(pd.read_csv(self.path, dtype={'StateHoliday': 'string'}), [1, 2])
+        self.assertEqual(insert_sales_frame(frame, upsert=False), 4)
+        self.assertEqual(sorted(Sales.objects.values_list('store_id', 'date', 'sales', 'open')), [
+            (1, date(2015, 1, 1), 110, True), (1, date(2015, 1, 2), 111, True),
+            (2, date(2015, 1, 1), 120, True), (2, date(2015, 1, 2), 121, True),
+        ])
+
+    def test_command_loads_in_chunks_and_refreshes_rollups(self):
+        self.write_train(_train_rows([1, 2], 3))
+        self.load()
+        self.assertEqual(Sales.objects.count(), 6)
+        self.assertEqual(DailyStoreTypeSales.objects.get(date=date(2015, 1, 3)).total_sales, 112 + 122)
+
+    def test_upsert_is_idempotent(self):
+        self.write_train(_train_rows([1, 2], 3))
+        frame = normalize_sales_chunk(pd.read_csv(self.path, dtype={'StateHoliday': 'string'}), [1, 2])
+        insert_sales_frame(frame)
+        insert_sales_frame(frame)
+        self.assertEqual(Sales.objects.count(), 6)
+
+        # A corrected day overwrites its row instead of adding one
+        frame.loc[0, 'sales'] = 999
+        insert_sales_frame(frame)
+        self.assertEqual(Sales.objects.count(), 6)
+        self.assertEqual(Sales.objects.get(store_id=1, date=date(2015, 1, 1)).sales, 999)
+
+    def test_checkpoint_resumes_after_counted_rows(self):
+        self.write_train(_train_rows([1, 2], 3))
+        self.load()
+        checkpoint = IngestCheckpoint.objects.get(source=self.path)
+        self.assertTrue(checkpoint.completed)
+        self.assertEqual(checkpoint.rows_done, 6)
+        self.assertIn('already loaded completely', self.load())
+
+        # An interrupted load of the same file: only rows after the checkpoint are read again
+        Sales.objects.all().delete()
+        IngestCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_done=4, completed=False)
+        self.assertIn('Resuming', self.load())
+        self.assertEqual(list(Sales.objects.order_by('date', 'store_id').values_list('date', 'store_id')),
+                         [(date(2015, 1, 3), 1), (date(2015, 1, 3), 2)])
+
+    def test_replaced_file_is_read_from_the_top(self):
+        self.write_train(_train_rows([1, 2], 3))
+        self.load()
+        IngestCheckpoint.objects.filter(source=self.path).update(completed=False)
+
+        # Same path and size, different content
+        self.write_train(_train_rows([1, 2], 3, base=200))
+        self.load()
+        self.assertEqual(Sales.objects.get(store_id=1, date=date(2015, 1, 1)).sales, 210)
+        self.assertEqual(IngestCheckpoint.objects.get(source=self.path).rows_done, 6)
+
+
+class IngestSourceTests(TestCase):
+    def setUp(self):
+        for store_id in (1, 2):
+            Store.objects.create(store_id=store_id, store_type='a', assortment='a')
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.csv = TRAIN_CSV_HEADER + _train_rows([1, 2], 3)
+
+    def write(self, name, data, mode='w'):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, mode) as f:
+            f.write(data)
+        return path
+
+    def write_parquet(self):
+        path = os.path.join(self.tmp_dir, 'train.parquet')
+        pd.read_csv(io.StringIO(self.csv), dtype={'StateHoliday': 'string'}).to_parquet(path, row_group_size=4)
+        return path
+
+    def load(self, source):
+        call_command('load_sales_data', '--file', source, '--chunk-size', '2', stdout=io.StringIO())
+        return sorted(Sales.objects.values_list('store_id', 'date', 'sales'))
+
+    def expected_sales(self):
+        return [(store_id, date(2015, 1, 1) + timedelta(days=day), 100 + store_id * 10 + day)
+                for store_id in (1, 2) for day in range(3)]
+
+    def test_gzipped_csv(self):
+        self.assertEqual(self.load(self.write('train.csv.gz', gzip.compress(self.csv.encode()), 'wb')),
+                         self.expected_sales())
+
+    def test_parquet(self):
+        self.assertEqual(self.load(self.write_parquet()), self.expected_sales())
+
+    def test_stdin_is_loaded_without_a_checkpoint(self):
+        stdin = io.TextIOWrapper(io.BytesIO(self.csv.encode()))
+        with mock.patch('sys.stdin', stdin):
+            self.assertEqual(self.load('-'), self.expected_sales())
+        self.assertFalse(IngestCheckpoint.objects.exists())
+
+    def test_skip_rows_crosses_parquet_row_groups(self):
+        chunks = list(read_table_chunks(self.write_parquet(), chunksize=4, skip_rows=5))
+        self.assertEqual([len(chunk) for chunk in chunks], [1])
+        self.assertEqual(chunks[0]['Sales'].tolist(), [122])
+
+    def test_inventory_load_reports_missing_columns(self):
+        path = self.write('train.csv', 'Store,Customers\n1,5\n')
+        out = io.StringIO()
+        call_command('load_inventory_from_sales', '--file', path, stdout=out)
+        self.assertIn('Missing required columns (Sales)', out.getvalue())
+        self.assertFalse(Inventory.objects.exists())
+
+        gzipped = self.write('train.csv.gz', gzip.compress(self.csv.encode()), 'wb')
+        call_command('load_inventory_from_sales', '--file', gzipped, stdout=io.StringIO())
+        # 30 days of each store's average sales
+        self.assertEqual(dict(Inventory.objects.values_list('store_id', 'quantity')), {1: 111 * 30, 2: 121 * 30})
+
+
+class StoreLoadTests(TestCase):
+    HEADER = 'Store,StoreType,Assortment,CompetitionDistance,CompetitionOpenSinceMonth,' \
+             'CompetitionOpenSinceYear,Promo2,Promo2SinceWeek,Promo2SinceYear,PromoInterval\n'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def load(self, rows):
+        path = os.path.join(self.tmp_dir, 'store.csv')
+        with open(path, 'w') as f:
+            f.write(self.HEADER + rows)
+        out = io.StringIO()
+        call_command('load_store_data', '--file', path, stdout=out)
+        return out.getvalue()
+
+    def test_creates_updates_and_skips_unchanged_stores(self):
+        rows = '1,a,a,1270,9,2008,0,,,\n2,c,c,,,,1,13,2010,"Jan,Apr"\n'
+        self.assertIn('2 created, 0 updated, 0 unchanged', self.load(rows))
+        store = Store.objects.get(store_id=2)
+        self.assertEqual((store.competition_distance, store.promo2, store.promo_interval), (0, True, 'Jan,Apr'))
+
+        self.assertIn('0 created, 0 updated, 2 unchanged', self.load(rows))
+        self.assertIn('1 created, 1 updated, 1 unchanged',
+                      self.load('1,a,a,1270,9,2008,0,,,\n2,c,c,300,,,1,13,2010,"Jan,Apr"\n3,b,a,50,,,0,,,\n'))
+        self.assertEqual(Store.objects.get(store_id=2).competition_distance, 300)
+
+    def test_store_type_change_rebuilds_rollups(self):
+        self.load('1,a,a,100,,,0,,,\n')
+        sale = _sale(Store.objects.get(store_id=1), date(2015, 1, 1), Decimal('10.00'))
+        refresh_sales_rollups([(1, sale.date)])
+
+        self.assertIn('sales rollups rebuilt', self.load('1,b,a,100,,,0,,,\n'))
+        self.assertEqual(list(DailyStoreTypeSales.objects.values_list('store_type', flat=True)), ['b'])
+
+
+class StorePartitionCacheTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        self.train = os.path.join(self.tmp_dir, 'train.csv')
+        # Rows arrive by day, stores interleaved, as in train.csv
+        self.write_train(_train_rows([3, 1, 2], 4))
+
+    def write_train(self, rows):
+        with open(self.train, 'w') as f:
+            f.write(TRAIN_CSV_HEADER + rows)
+
+    def test_store_slice_matches_the_source_rows(self):
+        cache = StorePartitionCache(self.train, cache_dir=self.cache_dir)
+        self.assertTrue(cache.ensure())
+        self.assertFalse(cache.ensure())
+        self.assertEqual(cache.store_ids(), [1, 2, 3])
+
+        store = cache.load_store(2)
+        self.assertEqual(store['Date'].tolist(), list(pd.date_range('2015-01-01', periods=4)))
+        self.assertEqual(store['Sales'].tolist(), [120.0, 121.0, 122.0, 123.0])
+        self.assertEqual(set(store['Store']), {2})
+        self.assertTrue(cache.load_store(99).empty)
+        self.assertEqual(len(cache.load_all()), 12)
+
+    def test_changed_source_gets_a_new_cache_and_prunes_the_old(self):
+        cache = StorePartitionCache(self.train, cache_dir=self.cache_dir)
+        cache.ensure()
+
+        self.write_train(_train_rows([1], 2, base=500))
+        os.utime(self.train, ns=(0, os.stat(self.train).st_mtime_ns + 10**9))
+        rebuilt = StorePartitionCache(self.train, cache_dir=self.cache_dir)
+        self.assertNotEqual(rebuilt.path, cache.path)
+        self.assertTrue(rebuilt.ensure())
+        self.assertEqual(rebuilt.load_store(1)['Sales'].tolist(), [510.0, 511.0])
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(rebuilt.path)])
+
+    def test_losing_a_build_race_keeps_the_published_cache(self):
+        winner = StorePartitionCache(self.train, cache_dir=self.cache_dir)
+        loser = StorePartitionCache(self.train, cache_dir=self.cache_dir)
+        self.assertFalse(loser.is_fresh())
+        winner.build()
+        published = os.stat(os.path.join(winner.path, 'manifest.json')).st_ino
+        loser.build()  # Had checked is_fresh() before the winner published
+
+        # The winner's files were never deleted under its readers, and the loser's copy is gone
+        self.assertEqual(os.stat(os.path.join(winner.path, 'manifest.json')).st_ino, published)
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(winner.path)])
+        self.assertEqual(loser.load_store(3)['Sales'].tolist(), [130.0, 131.0, 132.0, 133.0])
+
+    def test_store_file_needs_no_cache(self):
+        with self.assertRaisesMessage(CommandError, '--store-file is only read with --no-cache'):
+            call_command('forecast_sales', '--all', '--train-file', self.train, '--store-file', self.train,
+                         stdout=io.StringIO())
+
+
+def _store_frame(store_id=1, days=150, seed=0):
+    frame = synthetic_train_frame([store_id], days=days, seed=seed)
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    return frame
+
+
+class ArimaWarmStartTests(TestCase):
+    def setUp(self):
+        self.frame = _store_frame()
+        search = mock.patch.object(arima_forecast, 'search_arima_order', return_value=(1, 0, 1))
+        self.search = search.start()
+        self.addCleanup(search.stop)
+
+    def fit(self, prior=None):
+        result = forecast_store(1, self.frame, prior=prior, horizon=7)
+        self.assertEqual(result['status'], 'completed', result['error'])
+        return result['model_state']
+
+    def test_stored_order_is_refit_without_a_search(self):
+        searched = self.fit()
+        self.assertEqual((searched['order'], searched['searched']), ([1, 0, 1], True))
+        self.search.reset_mock()
+
+        reused = self.fit(prior={'order': searched['order'], 'params': searched['params'], 'rmse': searched['rmse']})
+        self.search.assert_not_called()
+        self.assertEqual((reused['order'], reused['searched']), ([1, 0, 1], False))
+        self.assertAlmostEqual(reused['rmse'], searched['rmse'], places=2)
+
+    def test_degraded_fit_searches_again(self):
+        self.fit(prior={'order': [1, 0, 0], 'params': [0.0, 0.5, 1.0, 0.0, 0.0, 0.1], 'rmse': 1e-6})
+        self.search.assert_called_once()
+
+    def test_priors_skip_stores_due_for_a_search(self):
+        state = {'order': [1, 0, 1], 'params': [0.1], 'param_names': ['ar.L1'], 'rmse': 5.0}
+        for store_id, days_ago in [(1, 1), (2, 30)]:
+            ArimaModelState.objects.create(store_id=store_id, search_rmse=4.0,
+                                           searched_at=timezone.now() - timedelta(days=days_ago), **state)
+        command = ForecastSalesCommand(stdout=io.StringIO())
+        self.assertEqual(command._load_priors([1, 2, 3], search_every=7),
+                         {1: {'order': [1, 0, 1], 'params': [0.1], 'rmse': 4.0}})
+
+        # A reused order keeps the RMSE it was selected with as the baseline
+        command._save_model_state(1, {**state, 'rmse': 4.5, 'searched': False})
+        self.assertEqual(ArimaModelState.objects.get(store_id=1).search_rmse, 4.0)
+        command._save_model_state(1, {**state, 'rmse': 3.0, 'searched': True})
+        self.assertEqual(ArimaModelState.objects.get(store_id=1).search_rmse, 3.0)
+
+
+class _StaleCandidate:
+    """Stands in for claimable_runs() when another worker claims the row between our read and UPDATE."""
+
+    def __init__(self, candidate):
+        self.candidate = candidate
+
+    def order_by(self, *fields):
+        return self
+
+    def values_list(self, *fields):
+        return self
+
+    def first(self):
+        return self.candidate
+
+
+class ForecastQueueTests(TestCase):
+    def test_claims_each_job_once(self):
+        enqueue_forecasts([1, 2], 'arima')
+        enqueue_forecasts([1, 2], 'arima')  # Idempotent while the jobs are active
+        self.assertEqual(ForecastRun.objects.count(), 2)
+
+        first, second = claim_forecast([1, 2], 'arima', 'w1'), claim_forecast([1, 2], 'arima', 'w2')
+        self.assertEqual((first.store_id, first.worker, first.attempts), (1, 'w1', 1))
+        self.assertEqual((second.store_id, second.worker), (2, 'w2'))
+        self.assertIsNone(claim_forecast([1, 2], 'arima', 'w3'))
+
+    def test_losing_worker_moves_on_to_the_next_job(self):
+        enqueue_forecasts([1, 2], 'arima')
+        job = ForecastRun.objects.get(store_id=1)
+        stale = _StaleCandidate((job.pk, job.status, job.started_at))
+        real_claimable_runs = forecast_queue.claimable_runs
+
+        def racing_claimable_runs(*args):
+            if stale.candidate is None:
+                return real_claimable_runs(*args)
+            # Another worker wins store 1 after we read it
+            ForecastRun.objects.filter(pk=job.pk).update(status=Status.RUNNING, worker='other',
+                                                         started_at=timezone.now())
+            candidate, stale.candidate = stale.candidate, None
+            return _StaleCandidate(candidate)
+
+        with mock.patch.object(forecast_queue, 'claimable_runs', racing_claimable_runs):
+            claimed = claim_forecast([1, 2], 'arima', 'me')
+        self.assertEqual(claimed.store_id, 2)
+        self.assertEqual(ForecastRun.objects.get(store_id=1).worker, 'other')
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue_forecasts([1, 2], 'arima')
+        claim_forecasts([1, 2], 'arima', 'crashed-host')
+        self.assertIsNone(claim_forecast([1, 2], 'arima', 'me', lease=3600))
+
+        ForecastRun.objects.filter(store_id=1).update(started_at=timezone.now() - timedelta(hours=2))
+        job = claim_forecast([1, 2], 'arima', 'me', lease=3600)
+        self.assertEqual((job.store_id, job.worker, job.attempts), (1, 'me', 2))
+
+    def test_release_skips_jobs_claimed_since(self):
+        enqueue_forecasts([1, 2], 'arima')
+        first, second = claim_forecasts([1, 2], 'arima', 'me')
+        forecast_queue.release_forecast(first)
+        self.assertEqual(ForecastRun.objects.get(pk=first.pk).status, Status.PENDING)
+
+        # The lease ran out and another worker holds the job now
+        ForecastRun.objects.filter(pk=second.pk).update(worker='other', started_at=timezone.now())
+        forecast_queue.release_forecast(second)
+        self.assertEqual(ForecastRun.objects.get(pk=second.pk).worker, 'other')
+
+    def test_completed_runs_are_skipped_per_engine(self):
+        enqueue_forecasts([1], 'baseline')
+        ForecastRun.objects.update(status=Status.COMPLETED)
+        enqueue_forecasts([1], 'baseline')
+        enqueue_forecasts([1], 'arima')
+        self.assertEqual(sorted(ForecastRun.objects.values_list('engine', 'status')),
+                         [('arima', Status.PENDING), ('baseline', Status.COMPLETED)])
+
+
+class ForecastVersionTests(TestCase):
+    def frame(self, values):
+        return pd.DataFrame({'Forecasted Sales': values},
+                            index=pd.date_range('2015-08-01', periods=len(values), freq='D'))
+
+    def test_latest_forecast_is_the_newest_version(self):
+        first = timezone.now() - timedelta(days=1)
+        save_forecast(1, self.frame([1.0, 2.0]), generated_at=first)
+        save_forecast(1, self.frame([3.0, 4.0]))
+        save_forecast(2, self.frame([9.0]))
+
+        self.assertEqual(list(latest_forecast(1).values_list('forecasted_sales', flat=True)), [3.0, 4.0])
+        self.assertEqual(len(forecast_versions(1)), 2)
+        self.assertEqual(list(latest_forecasts().values_list('store_id', 'forecasted_sales')),
+                         [(1, 3.0), (1, 4.0), (2, 9.0)])
+
+    def test_resaving_a_run_overwrites_its_version(self):
+        run = ForecastRun.objects.create(store_id=1)
+        save_forecast(1, self.frame([1.0, 2.0]), run=run)
+        save_forecast(1, self.frame([5.0, 6.0]), run=run)
+
+        self.assertEqual(Forecast.objects.filter(store_id=1).count(), 2)
+        self.assertEqual(list(latest_forecast(1).values_list('forecasted_sales', flat=True)), [5.0, 6.0])
+
+
+class ForecastHorizonTests(TestCase):
+    def test_forecast_covers_the_horizon_after_the_data(self):
+        frame = _store_frame(days=120)
+        with mock.patch.object(arima_forecast, 'search_arima_order', return_value=(1, 0, 0)):
+            result = forecast_store(1, frame, horizon=10)
+
+        future = result['future_forecast']
+        self.assertEqual(list(future.index), list(pd.date_range(frame['Date'].max() + timedelta(days=1), periods=10)))
+        self.assertTrue((future['Store'] == 1).all())
+        self.assertEqual(len(forecast_rows(1, future)), 10)
+
+    def test_future_exog_repeats_the_last_known_row(self):
+        exog = encode_exog(pd.DataFrame({'Promo': [0, 1], 'StateHoliday': ['0', 'b'], 'SchoolHoliday': [1, 0]}))
+        self.assertEqual(exog['StateHoliday'].tolist(), [0.0, 2.0])
+
+        dates = pd.date_range('2015-08-01', periods=3)
+        future = prepare_future_exog(exog, dates)
+        self.assertEqual(list(future.index), list(dates))
+        self.assertEqual(future.to_numpy().tolist(), [[1.0, 2.0, 0.0]] * 3)
+
+    def test_forecast_rows_follow_the_frame(self):
+        frame = pd.DataFrame({'Forecasted Sales': np.array([1.5, 2.5], dtype=np.float32)},
+                             index=pd.date_range('2015-08-01', periods=2))
+        rows = forecast_rows(7, frame, generated_at=timezone.now())
+        self.assertEqual([(row.store_id, row.date, row.forecasted_sales) for row in rows],
+                         [(7, date(2015, 8, 1), 1.5), (7, date(2015, 8, 2), 2.5)])
+        self.assertIs(type(rows[0].forecasted_sales), float)
+
+
+def _completed_run(store_id, values, engine='arima', rmse=12.5):
+    run = ForecastRun.objects.create(
+        store_id=store_id, engine=engine, status=Status.COMPLETED, rmse=rmse, finished_at=timezone.now(),
+        holdout={'dates': ['2015-07-30', '2015-07-31'], 'actual': [10.0, 12.0], 'predicted': [11.0, 11.5]},
+    )
+    save_forecast(store_id, pd.DataFrame({'Forecasted Sales': values},
+                                         index=pd.date_range('2015-08-01', periods=len(values))), run=run)
+    return run
+
+
+class ForecastPlotTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.force_login(get_user_model().objects.create_user('manager', password='x'))
+
+    def test_plot_is_drawn_once_per_run(self):
+        run = _completed_run(1, [13.0, 14.0])
+        response = self.client.get('/auth/forecast-viewer/plot/1/')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content)[:8], b'\x89PNG\r\n\x1a\n')
+        self.assertTrue(os.path.exists(forecast_plot_path(run)))
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/auth/forecast-viewer/plot/1/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A newer run gets its own image and the old one is removed
+        newer = _completed_run(1, [15.0, 16.0])
+        self.assertEqual(render_forecast_plot(newer), forecast_plot_path(newer))
+        self.assertFalse(os.path.exists(forecast_plot_path(run)))
+        response = self.client.get('/auth/forecast-viewer/plot/1/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_store_without_a_run_is_404(self):
+        self.assertEqual(self.client.get('/auth/forecast-viewer/plot/9/').status_code, 404)
+
+    def test_web_process_does_not_import_model_libraries(self):
+        script = ("import django, sys; django.setup(); import inventory_dashboard.urls; "
+                  "print(sorted(m for m in ('matplotlib', 'pmdarima', 'sklearn', 'statsmodels') if m in sys.modules))")
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'InventoryViz.settings'}).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+class ForecastViewerTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('manager', password='x'))
+
+    def test_lists_stores_with_a_completed_run(self):
+        for store_id in (1, 12, 120, 3):
+            _completed_run(store_id, [1.0])
+        _completed_run(12, [2.0], engine='baseline')
+        ForecastRun.objects.create(store_id=5, status=Status.FAILED)
+
+        page = self.client.get('/auth/forecast-viewer/').context['page']
+        self.assertEqual([store['store_id'] for store in page.object_list], [1, 3, 12, 120])
+        self.assertEqual(page.object_list[2]['engine'], 'baseline')
+
+        page = self.client.get('/auth/forecast-viewer/', {'q': '12'}).context['page']
+        self.assertEqual([store['store_id'] for store in page.object_list], [12, 120])
+
+        response = self.client.get('/auth/forecast-viewer/', {'store': '12'})
+        self.assertEqual(response.context['selected_run'].engine, 'baseline')
+        self.assertEqual(response.context['csv_url'], '/auth/forecast-viewer/csv/12/')
+
+    def test_csv_streams_the_newest_forecast(self):
+        _completed_run(1, [1.0, 2.0])
+        _completed_run(1, [3.25, 4.5])
+        response = self.client.get('/auth/forecast-viewer/csv/1/')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="store_1_forecast.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(),
+                         ['Date,Forecasted Sales,Store', '2015-08-01,3.25,1', '2015-08-02,4.5,1'])
+        self.assertEqual(self.client.get('/auth/forecast-viewer/csv/2/').status_code, 404)
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        self.frame = _store_frame(days=120)
+
+    def test_one_scored_row_per_config_and_fold(self):
+        rows = backtest_store(1, self.frame, ['1,0,0', '0,0,1'], folds=2, horizon=14)
+        self.assertEqual([(row['config'], row['fold']) for row in rows],
+                         [('1,0,0', 0), ('0,0,1', 0), ('1,0,0', 1), ('0,0,1', 1)])
+        self.assertTrue(all(row['error'] == '' and row['rmse'] > 0 and row['mape'] > 0 for row in rows))
+
+        summary = summarize_backtest(rows + [{**rows[0], 'store_id': 2, 'rmse': np.nan, 'error': 'boom'}])
+        self.assertEqual(summary.loc['1,0,0', ['stores', 'folds', 'failed']].tolist(), [1, 2, 1])
+        self.assertEqual(summary.loc['0,0,1', 'failed'], 0)
+
+    def test_short_history_and_bad_data_become_error_rows(self):
+        rows = backtest_store(1, self.frame, ['1,0,0'], folds=2, horizon=40)
+        self.assertEqual([row['error'] for row in rows], ['Not enough history for this origin', ''])
+
+        rows = backtest_store(1, self.frame.drop(columns=['Promo']), ['1,0,0', 'auto'], folds=2, horizon=14)
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(row['error'].startswith('Could not prepare Store 1') for row in rows))
+
+    def test_slow_fit_times_out(self):
+        with mock.patch.object(backtest, 'search_arima_order', side_effect=lambda *args: time.sleep(5)):
+            rows = backtest_store(1, self.frame, ['auto'], folds=1, horizon=14, timeout=0.2)
+        self.assertEqual(rows[0]['error'], 'Timed out after 0.2s')
+        self.assertLess(rows[0]['fit_seconds'], 2)
+
+    def test_errors_and_configs(self):
+        rmse, mape = forecast_errors([100, 0, 200], [110, 5, 180])
+        self.assertAlmostEqual(rmse, np.sqrt((100 + 25 + 400) / 3))
+        self.assertAlmostEqual(mape, 10.0)  # The closed day is left out
+        self.assertEqual(parse_config('2,1,0'), ('2,1,0', (2, 1, 0)))
+        with self.assertRaises(ValueError):
+            parse_config('2,1')
+
+
+class SeasonalBaselineTests(TestCase):
+    def setUp(self):
+        self.frame = pd.concat([_store_frame(1, days=70, seed=1), _store_frame(2, days=70, seed=2)],
+                               ignore_index=True)
+
+    def test_naive_forecast_repeats_the_last_week(self):
+        matrix = np.arange(21, dtype=float).reshape(1, 21)
+        np.testing.assert_array_equal(seasonal_smoothing_forecast(matrix, 10, alpha=1.0),
+                                      [[14, 15, 16, 17, 18, 19, 20, 14, 15, 16]])
+        # Older weeks count less: weights 0.5 and 0.25 over the same weekday
+        smoothed = seasonal_smoothing_forecast(matrix[:, :14], 1, alpha=0.5)
+        self.assertAlmostEqual(smoothed[0, 0], (0.5 * 7 + 0.25 * 0) / 0.75)
+
+    def test_every_store_is_forecast_in_one_pass(self):
+        results = {result['store_id']: result
+                   for result in get_forecaster('seasonal-naive').forecast_stores(self.frame, [1, 2, 3], horizon=14)}
+
+        self.assertEqual((results[3]['status'], results[3]['error']), ('failed', 'No data for Store 3.'))
+        matrix, _, calendar = sales_matrix(self.frame, [1, 2])
+        for row, store_id in enumerate([1, 2]):
+            result = results[store_id]
+            self.assertEqual(result['status'], 'completed')
+            future = result['future_forecast']
+            self.assertEqual(list(future.index), list(pd.date_range(calendar[-1] + timedelta(days=1), periods=14)))
+            # Sundays are closed, so they carry Saturday's sales forward like preprocess_store_data
+            np.testing.assert_array_equal(future['Forecasted Sales'], np.tile(matrix[row, -7:], 2))
+            holdout = np.tile(matrix[row, -21:-14], 2)
+            self.assertAlmostEqual(result['rmse'], np.sqrt(np.mean((matrix[row, -14:] - holdout) ** 2)))
+
+        # One store alone gives the same forecast as in the batch
+        single = get_forecaster('seasonal-naive').forecast_store(2, self.frame[self.frame['Store'] == 2], horizon=14)
+        pd.testing.assert_frame_equal(single['future_forecast'], results[2]['future_forecast'])
+
+    def test_short_history_fails_every_store(self):
+        results = list(get_forecaster('baseline').forecast_stores(self.frame, [1, 2], horizon=35))
+        self.assertEqual([result['error'] for result in results],
+                         ['Need more than 70 days of data for the baseline.'] * 2)
+
+
+class StockTests(TestCase):
+    def setUp(self):
+        store = Store.objects.create(store_id=1, store_type='a', assortment='a')
+        for category, quantity in [('Groceries', 5), ('Clothing', 10)]:
+            DummyCategoryInventory.objects.create(store=store, category_name=category, quantity=quantity)
+
+    def quantity(self, category):
+        return DummyCategoryInventory.objects.get(store_id=1, category_name=category).quantity
+
+    def test_sale_never_takes_stock_below_zero(self):
+        self.assertEqual(apply_sale([(1, 'Groceries', 3)]), {(1, 'Groceries'): 2})
+        with self.assertRaises(InsufficientStock):
+            apply_sale([(1, 'Groceries', 3)])
+        self.assertEqual(self.quantity('Groceries'), 2)
+
+    def test_failed_line_rolls_back_the_whole_sale(self):
+        with self.assertRaises(InsufficientStock):
+            apply_sale([(1, 'Clothing', 4), (1, 'Groceries', 6)], reference='order-1')
+        with self.assertRaises(UnknownStockItem):
+            apply_sale([(1, 'Clothing', 4), (1, 'Toys', 1)])
+        self.assertEqual((self.quantity('Clothing'), self.quantity('Groceries')), (10, 5))
+
+    def test_process_sale_endpoint(self):
+        self.client.force_login(get_user_model().objects.create_user('manager', password='x'))
+
+        def post(payload):
+            return self.client.post('/auth/inventory/sale/', payload, content_type='application/json')
+
+        response = post({'lines': [{'store': 1, 'category': 'Groceries', 'quantity': 2},
+                                   {'store': '1', 'category': 'Groceries', 'quantity': 1}]})
+        self.assertEqual(response.json()['remaining'], [{'store': 1, 'category': 'Groceries', 'quantity': 2}])
+        self.assertEqual(post({'store': 1, 'category': 'Groceries', 'quantity': 3}).status_code, 409)
+        self.assertEqual(post({'store': 1, 'category': 'Toys', 'quantity': 1}).status_code, 404)
+        self.assertEqual(post({'store': 1, 'category': 'Groceries', 'quantity': 0}).status_code, 400)
+        self.assertEqual(post({'lines': []}).status_code, 400)
+        self.assertEqual(self.quantity('Groceries'), 2)
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        store = Store.objects.create(store_id=1, store_type='a', assortment='a')
+        for category, quantity in [('Groceries', 5), ('Clothing', 10)]:
+            DummyCategoryInventory.objects.create(store=store, category_name=category, quantity=quantity)
+        # Opening snapshots, so the ledger starts from the current quantities
+        take_stock_snapshots(cutoff=timezone.now())
+
+    def test_ledger_tracks_the_counters(self):
+        apply_sale([(1, 'Groceries', 2), (1, 'Clothing', 1)])
+        record_movements({(1, 'Groceries'): 7}, StockMovement.Kind.RECEIPT)
+        with self.assertRaises(InsufficientStock):
+            apply_sale([(1, 'Clothing', 1), (1, 'Groceries', 99)])
+        self.assertEqual(stock_levels([1]), {(1, 'Groceries'): 10, (1, 'Clothing'): 9})
+        self.assertEqual(stock_drift(), [])
+
+        # Compaction doesn't change the levels
+        take_stock_snapshots(cutoff=timezone.now())
+        apply_sale([(1, 'Groceries', 1)])
+        self.assertEqual(stock_levels([1]), {(1, 'Groceries'): 9, (1, 'Clothing'): 9})
+
+        # A write that bypasses the ledger shows up as drift
+        DummyCategoryInventory.objects.filter(category_name='Clothing').update(quantity=50)
+        self.assertEqual(stock_drift(), [(1, 'Clothing', 50, 9)])
+
+    def test_levels_at_a_past_moment(self):
+        before = timezone.now()
+        StockMovement.objects.create(store_id=1, category_name='Groceries', kind=StockMovement.Kind.SALE,
+                                     quantity=-2, created_at=before + timedelta(hours=1))
+        self.assertEqual(stock_levels([1], at=before)[1, 'Groceries'], 5)
+        self.assertEqual(stock_levels([1], at=before + timedelta(hours=2))[1, 'Groceries'], 3)
+
+    def test_set_levels_books_adjustments(self):
+        self.assertEqual(set_stock_levels({(1, 'Groceries'): 8, (1, 'Clothing'): 10}, dry_run=True),
+                         {(1, 'Groceries'): (5, 8)})
+        self.assertEqual(StockMovement.objects.count(), 0)
+
+        set_stock_levels({(1, 'Groceries'): 8, (1, 'Toys'): 4})
+        self.assertEqual(sorted(StockMovement.objects.values_list('category_name', 'kind', 'quantity')),
+                         [('Groceries', 'adjustment', 3), ('Toys', 'adjustment', 4)])
+        self.assertEqual(stock_drift(), [])
+
+    def test_snapshots_leave_out_the_newest_movements_by_default(self):
+        apply_sale([(1, 'Groceries', 1)])
+        self.assertEqual(take_stock_snapshots(), 0)
+        StockMovement.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(take_stock_snapshots(), 1)
+        self.assertEqual(StockSnapshot.objects.order_by('-last_movement_id')[0].quantity, 4)
+
+
+class ReorderPointTests(TestCase):
+    def setUp(self):
+        for store_id in (1, 2):
+            store = Store.objects.create(store_id=store_id, store_type='b', assortment='c', competition_distance=200)
+            for category in ('Groceries', 'Clothing'):
+                DummyCategoryInventory.objects.create(store=store, category_name=category, quantity=100)
+        save_forecast(1, pd.DataFrame({'Forecasted Sales': [100.0, 200.0, 300.0]},
+                                      index=pd.date_range('2015-08-01', periods=3, freq='D')))
+
+    def test_reorder_points_follow_the_forecast(self):
+        self.assertEqual(reorder.recompute_reorder_points(days_of_cover=2), 2)
+
+        split = category_splits(pd.DataFrame({'store_type': ['b'], 'assortment': ['c'], 'competition_distance': [200]}))
+        for row in DummyCategoryInventory.objects.filter(store_id=1):
+            self.assertAlmostEqual(row.daily_demand, 150.0 * split[row.category_name][0])
+            self.assertEqual(row.reorder_point, math.ceil(row.daily_demand * 2))
+            self.assertEqual(row.quantity, 100)
+        # No forecast, so store 2 keeps the default
+        self.assertEqual(set(DummyCategoryInventory.objects.filter(store_id=2).values_list('reorder_point', flat=True)),
+                         {15000})
+
+    def test_rows_deleted_mid_run_stay_deleted(self):
+        def delete_then_write():
+            # Runs after the stock rows were read, right before they are written
+            DummyCategoryInventory.objects.filter(store_id=1, category_name='Clothing').delete()
+            return transaction.atomic()
+
+        with mock.patch.object(reorder, 'transaction', mock.Mock(atomic=delete_then_write)):
+            self.assertEqual(reorder.recompute_reorder_points(), 1)
+        self.assertFalse(DummyCategoryInventory.objects.filter(store_id=1, category_name='Clothing').exists())
+        self.assertIsNotNone(DummyCategoryInventory.objects.get(store_id=1, category_name='Groceries').daily_demand)
+
+
+class CategorySplitTests(TestCase):
+    def setUp(self):
+        self.stores = [
+            Store(store_id=store_id, store_type=store_type, assortment=assortment, competition_distance=distance)
+            for store_id, (store_type, assortment, distance) in enumerate([
+                ('A', 'a', None), ('B', 'b', 0), ('C', 'c', 499), ('D', 'a', 500), ('a', 'c', 120), ('x', 'z', 80),
+            ], start=1)
+        ]
+
+    def test_matches_the_per_store_split(self):
+        frame = pd.DataFrame([(s.store_type, s.assortment, s.competition_distance) for s in self.stores],
+                             columns=['store_type', 'assortment', 'competition_distance'],
+                             index=[s.store_id for s in self.stores])
+        splits = category_splits(frame)
+        for store in self.stores:
+            expected = get_dummy_category_split(store)
+            self.assertEqual(list(splits.columns), list(expected))
+            for category, share in expected.items():
+                self.assertAlmostEqual(splits.loc[store.store_id, category], share)
+
+    def test_initialize_dummy_categories(self):
+        Store.objects.bulk_create(self.stores)
+        for store in self.stores[:5]:
+            Inventory.objects.create(store=store, quantity=1000 * store.store_id)
+
+        out = io.StringIO()
+        call_command('initialize_dummy_categories', '--dry-run', stdout=out)
+        self.assertIn('Nothing was written', out.getvalue())
+        self.assertFalse(DummyCategoryInventory.objects.exists())
+
+        out = io.StringIO()
+        call_command('initialize_dummy_categories', stdout=out)
+        self.assertIn('skipped: 6', out.getvalue())
+        for store in self.stores[:5]:
+            levels = dict(DummyCategoryInventory.objects.filter(store=store).values_list('category_name', 'quantity'))
+            self.assertEqual(levels, {category: int(1000 * store.store_id * share)
+                                      for category, share in get_dummy_category_split(store).items()})
+        self.assertEqual(stock_drift(), [])
+
+        out = io.StringIO()
+        call_command('initialize_dummy_categories', stdout=out)
+        self.assertIn('Wrote 0 row(s), 15 already up to date.', out.getvalue())
+
+
+class InventoryDashboardTests(TestCase):
+    def setUp(self):
+        for store_id in range(1, 41):
+            store = Store.objects.create(store_id=store_id, store_type='a', assortment='a')
+            for category in ('Groceries', 'Electronics', 'Clothing'):
+                DummyCategoryInventory.objects.create(store=store, category_name=category, quantity=store_id * 10)
+
+    def get_page(self, **params):
+        response = self.client.get('/auth/inventory/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page']
+
+    def test_pages_through_every_row(self):
+        page = self.get_page()
+        self.assertEqual(page.paginator.count, 120)
+        self.assertEqual(len(page.object_list), INVENTORY_ROWS_PER_PAGE)
+        last = self.get_page(page=page.paginator.num_pages)
+        self.assertEqual(len(last.object_list), 120 - INVENTORY_ROWS_PER_PAGE * (page.paginator.num_pages - 1))
+
+    def test_filters_and_sort(self):
+        page = self.get_page(category='Groceries', min_quantity=100, max_quantity=300, sort='-quantity')
+        self.assertEqual([item.store_id for item in page.object_list], list(range(30, 9, -1)))
+        self.assertTrue(all(item.category_name == 'Groceries' for item in page.object_list))
+
+    def test_invalid_filters_are_ignored(self):
+        page = self.get_page(store='abc', sort='bogus')
+        self.assertEqual(page.paginator.count, 120)
+        self.assertEqual(page.object_list[0].store_id, 1)
+
+    def test_low_stock_filter_uses_each_reorder_point(self):
+        DummyCategoryInventory.objects.filter(store_id=5, category_name='Clothing').update(reorder_point=60)
+        DummyCategoryInventory.objects.exclude(store_id=5, category_name='Clothing').update(reorder_point=0)
+        page = self.get_page(low_stock=1)
+        self.assertEqual([(item.store_id, item.category_name) for item in page.object_list], [(5, 'Clothing')])
+
+
+class CrashingForecaster(Forecaster):
+    """Kills its worker process on store 2; other stores take a moment and complete."""
+    name = 'crashing'
+
+    def forecast_store(self, store_id, store_df, **options):
+        if store_id == 2:
+            os._exit(1)
+        time.sleep(0.5)
+        return {'store_id': store_id, 'status': 'completed', 'rmse': 1.0, 'error': None}
+
+    def forecast_stores(self, frame, store_ids, horizon=None):
+        return []
+
+
+class PartialBatchForecaster(Forecaster):
+    """Batched engine that forecasts store 1, then leaves out or fails on the rest."""
+    name = 'partial'
+    batched = True
+
+    def __init__(self, error=None):
+        self.error = error
+
+    def forecast_store(self, store_id, store_df, **options):
+        raise NotImplementedError
+
+    def forecast_stores(self, frame, store_ids, horizon=None):
+        yield {'store_id': 1, 'status': 'completed', 'rmse': 1.0, 'error': None}
+        if self.error:
+            raise self.error
+
+
+class ForecastRunnerTests(TestCase):
+    def run_jobs(self, engine, store_ids, **options):
+        enqueue_forecasts(store_ids, engine.name)
+        command = ForecastSalesCommand(stdout=io.StringIO())
+        if engine.batched:
+            results = command._run_batched(engine, store_ids, lambda: None, lease=None, horizon=7)
+        else:
+            results = command._run(engine, store_ids, lambda store_id: None, priors={}, lease=None,
+                                   fit_options={}, **options)
+        return {job.store_id: result for job, result in results}
+
+    def test_dead_worker_fails_only_its_store(self):
+        results = self.run_jobs(CrashingForecaster(), [1, 2, 3], workers=2)
+
+        self.assertEqual(results[2]['status'], 'failed')
+        self.assertIn('Worker process died', results[2]['error'])
+        # Store 1 was in flight on the broken pool: run again on its own, without going back to the queue
+        self.assertEqual(results[1]['status'], 'completed')
+        self.assertEqual(results[3]['status'], 'completed')
+        self.assertEqual(ForecastRun.objects.get(store_id=1).attempts, 1)
+
+    def test_batched_engine_failure_fails_the_unforecast_stores(self):
+        results = self.run_jobs(PartialBatchForecaster(ValueError('bad frame')), [1, 2, 3])
+        self.assertEqual(results[1]['status'], 'completed')
+        self.assertEqual([results[store_id]['error'] for store_id in (2, 3)],
+                         ['Batched forecast failed: bad frame'] * 2)
+
+    def test_stores_left_out_by_a_batched_engine_are_failed(self):
+        results = self.run_jobs(PartialBatchForecaster(), [1, 2])
+        self.assertEqual((results[2]['status'], results[2]['error']), ('failed', 'No forecast returned for this store'))
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('manager', password='x'))
+        for store_id in (1, 2):
+            store = Store.objects.create(store_id=store_id, store_type='a', assortment='a')
+            for day in range(1, 4):
+                _sale(store, date(2015, 1, day), Decimal(f"{store_id}{day}.50"))
+
+    def test_filtered_gzipped_csv(self):
+        response = self.client.get('/auth/export/sales/', {'store': 2, 'start': '2015-01-02', 'gzip': 1})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="sales_store_2.csv.gz"')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(lines[0], 'Store,Date,DayOfWeek,Sales,Customers,Open,Promo,StateHoliday,SchoolHoliday')
+        self.assertEqual([line.split(',')[:4] for line in lines[1:]],
+                         [['2', '2015-01-02', '5', '22.50'], ['2', '2015-01-03', '6', '23.50']])
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get('/auth/export/sales/', {'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get('/auth/export/sales/', {'start': '01/02/2015'}).status_code, 400)
+        self.assertEqual(self.client.get('/auth/export/customers/').status_code, 404)
+
+
+class ParquetExportTests(TestCase):
+    def test_decimal_column_keeps_model_precision_across_row_groups(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        store = Store.objects.create(store_id=1, store_type='a', assortment='a')
+        amounts = [Decimal('0.50'), Decimal('7.00'), Decimal('12345678.90')]
+        for day, amount in enumerate(amounts, start=1):
+            Sales.objects.create(store=store, date=date(2015, 1, day), day_of_week=day, sales=amount, customers=1,
+                                 open=True, promo=False, state_holiday='0', school_holiday=False)
+
+        # One row per row group, so a schema inferred from the first would not fit the last
+        table = pq.read_table(io.BytesIO(b''.join(export_stream('sales', 'parquet', chunk_size=1))))
+        self.assertEqual(table.schema.field('Sales').type, pa.decimal128(10, 2))
+        self.assertEqual(table.schema.field('Date').type, pa.date32())
+        self.assertEqual(table.schema.field('Open').type, pa.bool_())
+        self.assertEqual(table.column('Sales').to_pylist(), amounts)
+
+    def test_empty_export_has_typed_columns(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(b''.join(export_stream('sales', 'parquet'))))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.schema.field('Store').type, pa.int64())
@@ -12,9 +12,15 @@ urlpatterns = [
     path('add-sales/', add_sales, name='add_sales'), 
     path('edit/<int:store>/<str:date>/', edit_sales, name='edit_sales'),
     path("sales-dashboard/", sales_dashboard, name="sales_dashboard"),
+    path("sales-dashboard/chart/<str:chart>/", views.sales_chart_data, name="sales_chart_data"),
+    path("sales-dashboard/cache-stats/", views.figure_cache_stats, name="figure_cache_stats"),
     path('forecast-viewer/', forecast_viewer, name='forecast_viewer'),
+    path('forecast-viewer/plot/<int:store_id>/', views.forecast_plot, name='forecast_plot'),
+    path('forecast-viewer/csv/<int:store_id>/', views.forecast_csv, name='forecast_csv'),
+    path('export/<str:dataset>/', views.export_data, name='export_data'),
     path('inventory/', views.inventory_dashboard, name='inventory_dashboard'),
     path('inventory/edit/<int:inventory_id>/', views.edit_inventory, name='edit_inventory'),
     path('inventory/delete/<int:inventory_id>/', views.delete_inventory, name='delete_inventory'),
+    path('inventory/sale/', views.process_sale, name='process_sale'),
 
 ]
@@ -1,52 +1,79 @@
 # inventory_dashboard/utils.py
 
+import numpy as np
+import pandas as pd
+
+# Share of a store's stock per category, before the adjustments below
+CATEGORY_SPLIT = {
+    "Groceries": 0.5,
+    "Electronics": 0.3,
+    "Clothing": 0.2,
+}
+
+# Adjustments by store_type (A, B, C, D)
+STORE_TYPE_SPLIT_ADJUSTMENTS = {
+    'A': {"Groceries": 0.1, "Electronics": -0.05, "Clothing": -0.05},  # Regular stores - focus more on groceries
+    'B': {},  # Superstores - balanced
+    'C': {"Electronics": 0.15, "Groceries": -0.1, "Clothing": -0.05},  # Specialized electronics stores
+    'D': {"Clothing": 0.2, "Groceries": -0.1, "Electronics": -0.1},  # Luxury clothing focus
+}
+
+# Adjustments by assortment
+ASSORTMENT_SPLIT_ADJUSTMENTS = {
+    'c': {"Clothing": 0.05},  # Extended assortment
+    'a': {"Electronics": -0.05},  # Basic assortment
+}
+
+# Adjustment for competition closer than this many meters
+NEARBY_COMPETITION_DISTANCE = 500
+NEARBY_COMPETITION_SPLIT_ADJUSTMENT = {"Electronics": 0.05}
+
+
+def _nearby_competition(competition_distance):
+    # A missing (or zero) distance counts as no nearby competition
+    return bool(competition_distance) and competition_distance < NEARBY_COMPETITION_DISTANCE
+
+
 def get_dummy_category_split(store):
     """
     Dynamically generates category splits for the store.
     """
-
-    split = {
-        "Groceries": 0.5,
-        "Electronics": 0.3,
-        "Clothing": 0.2,
-    }
-
-    # Adjust based on store_type (A, B, C, D)
-    if store.store_type == 'A':
-        # A - Regular stores - focus more on groceries
-        split["Groceries"] += 0.1
-        split["Electronics"] -= 0.05
-        split["Clothing"] -= 0.05
-
-    elif store.store_type == 'B':
-        # B - Superstores - balanced
-        pass  # No change
-
-    elif store.store_type == 'C':
-        # C - Specialized electronics stores
-        split["Electronics"] += 0.15
-        split["Groceries"] -= 0.1
-        split["Clothing"] -= 0.05
-
-    elif store.store_type == 'D':
-        # D - Luxury clothing focus
-        split["Clothing"] += 0.2
-        split["Groceries"] -= 0.1
-        split["Electronics"] -= 0.1
-
-    # Adjust for assortment
-    if store.assortment == 'c':  # Extended assortment
-        split["Clothing"] += 0.05
-
-    if store.assortment == 'a':  # Basic assortment
-        split["Electronics"] -= 0.05
-
-    # Adjust if nearby competition
-    if store.competition_distance and store.competition_distance < 500:
-        split["Electronics"] += 0.05
+    split = dict(CATEGORY_SPLIT)
+    adjustments = [
+        STORE_TYPE_SPLIT_ADJUSTMENTS.get(store.store_type, {}),
+        ASSORTMENT_SPLIT_ADJUSTMENTS.get(store.assortment, {}),
+        NEARBY_COMPETITION_SPLIT_ADJUSTMENT if _nearby_competition(store.competition_distance) else {},
+    ]
+    for adjustment in adjustments:
+        for category, change in adjustment.items():
+            split[category] += change
 
     # Normalize (ensure total = 1)
     total = sum(split.values())
     split = {k: v / total for k, v in split.items()}
 
     return split
+
+
+def _adjustment_table(adjustments, keys):
+    # One row of per-category changes for each key; keys without adjustments get zeros
+    table = pd.DataFrame.from_dict(adjustments, orient='index').reindex(columns=list(CATEGORY_SPLIT))
+    return table.reindex(keys).fillna(0).to_numpy()
+
+
+def category_splits(stores):
+    """
+    get_dummy_category_split for many stores at once. stores is a DataFrame with store_type,
+    assortment and competition_distance columns; returns one row of category shares per store
+    (same index), with a column per category.
+    """
+    base = np.array(list(CATEGORY_SPLIT.values()))
+    distance = pd.to_numeric(stores['competition_distance']).to_numpy(dtype=float)
+    nearby = (distance > 0) & (distance < NEARBY_COMPETITION_DISTANCE)
+    competition = np.array([NEARBY_COMPETITION_SPLIT_ADJUSTMENT.get(category, 0) for category in CATEGORY_SPLIT])
+
+    split = base + _adjustment_table(STORE_TYPE_SPLIT_ADJUSTMENTS, stores['store_type'])
+    split = split + _adjustment_table(ASSORTMENT_SPLIT_ADJUSTMENTS, stores['assortment'])
+    split = split + np.where(nearby[:, None], competition, 0)
+    split = split / split.sum(axis=1, keepdims=True)
+    return pd.DataFrame(split, index=stores.index, columns=list(CATEGORY_SPLIT))
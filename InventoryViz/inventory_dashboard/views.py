@@ -1,3 +1,4 @@
+import json
 import os
 from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
@@ -6,18 +7,38 @@ from django.contrib import messages
 from django_ratelimit.decorators import ratelimit
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from .forms import DummyCategoryInventoryForm, InventoryForm, SalesForm  
-from .models import DummyCategoryInventory, Sales, Store, Inventory  
+from .forms import DummyCategoryInventoryForm, InventoryFilterForm, InventoryForm, SalesForm
+from .models import DummyCategoryInventory, ForecastRun, Sales, Store, Inventory  
+from .aggregations import dashboard_series, load_sales_cube
+from .charts import DASHBOARD_CHARTS
+from .figure_cache import get_figure_cache, get_series_cache, sales_data_version
+from .forecast_plots import render_forecast_plot
+from .forecast_queue import latest_completed_run
+from .exports import EXPORT_CHUNK_SIZE, EXPORTS, csv_stream, export_stream
+from .forecasts import latest_forecast
+from .reorder import below_reorder_point
+from .rollups import refresh_sales_rollups
+from .stock import (
+    InsufficientStock,
+    UnknownStockItem,
+    apply_sale,
+    delete_stock_item,
+    parse_sale_lines,
+    save_stock_form,
+)
 from datetime import datetime  
-from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-from django.db.models import Sum, Avg
 from django.urls import reverse
-from django.http import JsonResponse
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_POST
 import logging
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from django.contrib.auth import get_user_model
+from plotly.offline import get_plotlyjs_version
+
+PLOTLY_JS_URL = f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
 
 
 def home(request):
@@ -43,7 +64,9 @@ def logout_view(request):
 
 @login_required
 def manager_dashboard(request):
-    return render(request, "inventory_dashboard/dashboard.html")
+    return render(request, "inventory_dashboard/dashboard.html", {
+        'plotly_js_url': PLOTLY_JS_URL,
+    })
 
 User = get_user_model()
 
@@ -88,7 +111,10 @@ def add_sales(request):
             if sale.date:
                 sale.day_of_week = sale.date.weekday() + 1  # Monday = 0 → Sunday = 7
 
-            sale.save()
+            # The rollup moves with the sale or not at all
+            with transaction.atomic():
+                sale.save()
+                refresh_sales_rollups([(sale.store_id, sale.date)])
             messages.success(request, 'Sales data has been successfully added!')
             return redirect('add_sales')  # Or your desired redirect
     else:
@@ -114,9 +140,12 @@ def edit_sales(request, store, date):
     sale = sales.first()
 
     if request.method == 'POST':
+        previous_key = (sale.store_id, sale.date)
         form = SalesForm(request.POST, instance=sale)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                refresh_sales_rollups([previous_key, (sale.store_id, sale.date)])
             messages.success(request, "Sales data updated successfully!") 
             return redirect(reverse('edit_sales', kwargs={'store': store, 'date': date}))
     else:
@@ -129,142 +158,207 @@ def edit_sales(request, store, date):
         'date': date,
     })
 
-def process_sale(store_id, sold_quantity):
+@login_required
+@require_POST
+def process_sale(request):
+    """
+    Takes a sale out of category stock. Body: {"store", "category", "quantity"}, or {"lines": [...]}
+    of those for a multi-line sale, which is applied all or nothing. Answers 409 when stock is
+    short and 404 for an unknown store/category.
+    """
     try:
-        # Retrieve store and its inventory
-        store = Store.objects.get(id=store_id)
-        inventory_item = Inventory.objects.get(store=store)
-        
-        # Update inventory quantity
-        inventory_item.quantity -= sold_quantity
-        inventory_item.save()
-
-        return JsonResponse({'success': True, 'message': 'Inventory updated successfully'})
-    except Inventory.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Inventory for the store not found'})
-    except Store.DoesNotExist:
-        return JsonResponse({'success': False, 'message': 'Store not found'})
-    
+        lines = parse_sale_lines(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
 
-def sales_dashboard(request):
-    # 1. Sales Trend Over Time (Daily + 7-day Moving Average)
-    daily_sales = Sales.objects.values('date').annotate(total_sales=Sum('sales')).order_by('date')
-    df_sales = pd.DataFrame(list(daily_sales))
-    df_sales['date'] = pd.to_datetime(df_sales['date'])
-    df_sales['moving_avg'] = df_sales['total_sales'].rolling(window=7).mean()
-
-    sales_time_fig = go.Figure()
-    sales_time_fig.add_trace(go.Scatter(x=df_sales['date'], y=df_sales['total_sales'], mode='lines', name='Daily Sales'))
-    sales_time_fig.add_trace(go.Scatter(x=df_sales['date'], y=df_sales['moving_avg'], mode='lines', name='7-Day Avg', line=dict(dash='dash')))
-    sales_time_fig.update_layout(title='Sales Trend Over Time with Moving Average', xaxis_title='Date', yaxis_title='Total Sales')
-
-    # 2. Sales with/without Promotion Status (Bar Chart)
-    promo_sales = Sales.objects.values('promo').annotate(total_sales=Sum('sales')).order_by('promo')
-    df_promo_sales = pd.DataFrame(list(promo_sales))
-    promo_sales_fig = px.bar(df_promo_sales, x='promo', y='total_sales', title='Sales with/without Promotion', labels={'promo': 'Promotion Status', 'total_sales': 'Total Sales'})
-    promo_sales_fig.update_xaxes(tickmode='array', tickvals=[0, 1], ticktext=['No Promo', 'Promo'])
-
-
-    # 3. Monthly Sales Trend (Year-over-Year Line Plot)
-    monthly_sales = Sales.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date')) \
-                                 .values('year', 'month') \
-                                 .annotate(total_sales=Sum('sales')) \
-                                 .order_by('year', 'month')
-    df_monthly_sales = pd.DataFrame(list(monthly_sales))
-    df_monthly_sales['month_name'] = pd.to_datetime(df_monthly_sales['month'], format='%m').dt.strftime('%b')
-    monthly_sales_fig = px.line(df_monthly_sales, x='month_name', y='total_sales', color='year',
-                                title='Monthly Sales Trend by Year', markers=True)
-
-    # 4. Store Type vs Average Sales
-    avg_sales_by_type = Sales.objects.select_related('store').values('store__store_type') \
-                                     .annotate(avg_sales=Avg('sales')).order_by('store__store_type')
-    df_avg_sales = pd.DataFrame(list(avg_sales_by_type))
-    avg_sales_fig = px.bar(df_avg_sales, x='store__store_type', y='avg_sales', color='store__store_type',
-                           title='Average Sales by Store Type', labels={'store__store_type': 'Store Type'})
-
-    # 5. Sales Distribution Histogram with Boxplot
-    all_sales = Sales.objects.values_list('sales', flat=True)
-    df_sales_dist = pd.DataFrame({'sales': list(all_sales)})
-    sales_dist_fig = px.histogram(df_sales_dist, x='sales', nbins=30, marginal='box',
-                                  title='Sales Distribution with Box Plot', labels={'sales': 'Sales Amount'})
-
-
-    # 6. Yearly Total Sales (Bar)
-    yearly_sales = Sales.objects.annotate(year=ExtractYear('date')) \
-                                .values('year') \
-                                .annotate(total_sales=Sum('sales')) \
-                                .order_by('year')
-    df_yearly = pd.DataFrame(list(yearly_sales))
-    yearly_sales_fig = px.bar(df_yearly, x='year', y='total_sales', text='total_sales',
-                              title='Total Sales per Year', labels={'year': 'Year', 'total_sales': 'Total Sales'})
-
-    # 7. Monthly Average Sales (Line Plot)
-    monthly_avg_sales = Sales.objects.annotate(month=ExtractMonth('date')) \
-                                     .values('month') \
-                                     .annotate(avg_sales=Avg('sales')) \
-                                     .order_by('month')
-    df_monthly_avg = pd.DataFrame(list(monthly_avg_sales))
-    df_monthly_avg['month_name'] = pd.to_datetime(df_monthly_avg['month'], format='%m').dt.strftime('%b')
-    monthly_avg_fig = px.line(df_monthly_avg, x='month_name', y='avg_sales', markers=True,
-                              title='Average Sales by Month', labels={'month_name': 'Month', 'avg_sales': 'Average Sales'})
-
-    # 8. Daily Sales Heatmap (Day vs Month)
-    day_month_sales = Sales.objects.annotate(day=ExtractDay('date'), month=ExtractMonth('date')) \
-                                   .values('day', 'month') \
-                                   .annotate(total_sales=Sum('sales')) \
-                                   .order_by('month', 'day')
-    df_day_month = pd.DataFrame(list(day_month_sales))
-    pivot_heatmap = df_day_month.pivot(index='day', columns='month', values='total_sales')
-    heatmap_fig = px.imshow(pivot_heatmap, labels=dict(x="Month", y="Day", color="Total Sales"),
-                            title="Daily Sales Heatmap by Month")
+    try:
+        remaining = apply_sale(lines)
+    except UnknownStockItem as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=404)
+    except InsufficientStock as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=409)
+
+    return JsonResponse({
+        'success': True,
+        'message': 'Inventory updated successfully',
+        'remaining': [
+            {'store': store_id, 'category': category, 'quantity': quantity}
+            for (store_id, category), quantity in sorted(remaining.items())
+        ],
+    })
 
+
+def sales_dashboard(request):
+    # Only the page skeleton; each chart fetches its data from sales_chart_data in parallel
     return render(request, 'inventory_dashboard/dashboard.html', {
-        'sales_time_fig': sales_time_fig.to_html(full_html=False),
-        'promo_sales_fig': promo_sales_fig.to_html(full_html=False),
-        'monthly_sales_fig': monthly_sales_fig.to_html(full_html=False),
-        'avg_sales_fig': avg_sales_fig.to_html(full_html=False),
-        'sales_dist_fig': sales_dist_fig.to_html(full_html=False),
-        'yearly_sales_fig': yearly_sales_fig.to_html(full_html=False),
-        'monthly_avg_fig': monthly_avg_fig.to_html(full_html=False),
-        'heatmap_fig': heatmap_fig.to_html(full_html=False),
         'stores': Store.objects.all(),
+        'plotly_js_url': PLOTLY_JS_URL,
     })
 
 
+def _sales_chart_etag(request, chart):
+    # Looked up once per request; the view reuses it as the cache version
+    request.sales_data_version = sales_data_version()
+    return f"{chart}-{request.sales_data_version}"
+
+
+@condition(etag_func=_sales_chart_etag)
+def sales_chart_data(request, chart):
+    if chart not in DASHBOARD_CHARTS:
+        raise Http404(f"Unknown chart '{chart}'")
+
+    # Payloads are cached per data version, so repeat requests only cost the version lookup.
+    # The series behind them are computed once per version and shared by the charts that use them.
+    version = request.sales_data_version
+    spec = DASHBOARD_CHARTS[chart]
+
+    def render_chart():
+        if not spec.uses_series:
+            return json.dumps(spec.data(), separators=(',', ':'))
+        series = get_series_cache().get_or_render('series', version, lambda: dashboard_series(load_sales_cube()))
+        return json.dumps(spec.data(series), separators=(',', ':'))
+
+    payload = get_figure_cache().get_or_render(f"data:{chart}", version, render_chart)
+    return HttpResponse(payload, content_type='application/json')
+
 
 @login_required
-def forecast_viewer(request):
-    plots_dir = os.path.join(settings.MEDIA_ROOT, 'forecast_plots')
-    csv_dir = os.path.join(settings.MEDIA_ROOT, 'forecast_csv')
+def figure_cache_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    stats = get_figure_cache().stats()
+    stats['data_version'] = sales_data_version()
+    return JsonResponse(stats)
+
+
+FORECAST_STORES_PER_PAGE = 50
 
-    stores = []
-    for file in os.listdir(plots_dir):
-        if file.startswith('store_') and file.endswith('.png'):
-            store_id = file.split('_')[1]
-            stores.append(store_id)
+
+def _store_id_prefix(prefix, max_digits=6):
+    """Store ids starting with the digits in prefix, as index-friendly ranges (12 -> 12, 120-129, 1200-1299, ...)."""
+    low = high = int(prefix)
+    ranges = Q()
+    for _ in range(max_digits - len(prefix) + 1):
+        ranges |= Q(store_id__range=(low, high))
+        low, high = low * 10, high * 10 + 9
+    return ranges
+
+
+@login_required
+def forecast_viewer(request):
+    # Stores with a completed run, straight off the (status, store_id) index of the run ledger,
+    # with the engine of the newest one (only evaluated for the stores on the page)
+    completed = ForecastRun.objects.filter(status=ForecastRun.Status.COMPLETED)
+    newest = completed.filter(store_id=OuterRef('store_id')).order_by('-finished_at', '-pk')
+    stores = completed.values('store_id') \
+                      .annotate(forecast_at=Max('finished_at'), engine=Subquery(newest.values('engine')[:1])) \
+                      .order_by('store_id')
+
+    query = request.GET.get('q', '').strip()
+    if query.isdigit():
+        stores = stores.filter(_store_id_prefix(query))
+    elif query:
+        stores = stores.none()
+    page = Paginator(stores, FORECAST_STORES_PER_PAGE).get_page(request.GET.get('page'))
 
     selected_store = request.GET.get('store')
-    plot_url = csv_url = None
+    selected_store = int(selected_store) if selected_store and selected_store.isdigit() else None
+    plot_url = csv_url = selected_run = None
 
-    if selected_store:
-        plot_url = os.path.join(settings.MEDIA_URL, f'forecast_plots/store_{selected_store}_forecast.png')
-        csv_url = os.path.join(settings.MEDIA_URL, f'forecast_csv/store_{selected_store}_forecast.csv')
+    if selected_store is not None:
+        # The plot is rendered on first request by forecast_plot and cached on disk
+        plot_url = reverse('forecast_plot', args=[selected_store])
+        csv_url = reverse('forecast_csv', args=[selected_store])
+        selected_run = latest_completed_run(selected_store)
 
     return render(request, 'inventory_dashboard/forecast_viewer.html', {
-        'stores': sorted(set(stores)),
+        'page': page,
+        'query': query,
         'selected_store': selected_store,
+        'selected_run': selected_run,
         'plot_url': plot_url,
         'csv_url': csv_url,
     })
 
-LOW_STOCK_THRESHOLD = 15000
+
+@login_required
+def forecast_csv(request, store_id):
+    rows = latest_forecast(store_id).values_list('date', 'forecasted_sales', 'store_id')
+    if not rows.exists():
+        raise Http404(f"No forecast for Store {store_id}")
+
+    stream = csv_stream(['Date', 'Forecasted Sales', 'Store'], rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    response = StreamingHttpResponse(stream, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="store_{store_id}_forecast.csv"'
+    return response
+
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+@login_required
+def export_data(request, dataset):
+    """
+    Streams sales, forecasts or inventory as CSV (optionally gzipped) or Parquet.
+    Query parameters: format=csv|parquet, store, start and end (YYYY-MM-DD, inclusive), gzip=1.
+    """
+    if dataset not in EXPORTS:
+        raise Http404(f"Unknown export '{dataset}'")
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}, status=400)
+    try:
+        store = int(request.GET['store']) if request.GET.get('store') else None
+        start, end = (
+            datetime.strptime(request.GET[name], '%Y-%m-%d').date() if request.GET.get(name) else None
+            for name in ('start', 'end')
+        )
+    except ValueError:
+        return JsonResponse({'error': 'store must be a number and start/end dates YYYY-MM-DD'}, status=400)
+    gzip = export_format == 'csv' and request.GET.get('gzip') in ('1', 'true')
+
+    stream = export_stream(dataset, export_format, gzip=gzip, store=store, start=start, end=end)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+    filename = f"{dataset}{f'_store_{store}' if store is not None else ''}.{export_format}{'.gz' if gzip else ''}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _forecast_plot_etag(request, store_id):
+    # A new run is a new image; unchanged runs are answered with 304 before anything is drawn
+    run = latest_completed_run(store_id)
+    return f"run-{run.pk}" if run else None
+
+
+@login_required
+@condition(etag_func=_forecast_plot_etag)
+def forecast_plot(request, store_id):
+    run = latest_completed_run(store_id)
+    if run is None or not run.holdout:
+        raise Http404(f"No forecast to plot for Store {store_id}")
+    return FileResponse(open(render_forecast_plot(run), 'rb'), content_type='image/png')
+
+
+INVENTORY_ROWS_PER_PAGE = 50
+LOW_STOCK_ALERTS_SHOWN = 20
+
+
 def inventory_dashboard(request):
-    dummy_category_inventories = DummyCategoryInventory.objects.all()
-    
-    low_stock_alerts = dummy_category_inventories.filter(quantity__lt=LOW_STOCK_THRESHOLD)
+    # Only the columns the table shows; store_id is read off the row, so no join or per-row query
+    stock = DummyCategoryInventory.objects.only('store_id', 'category_name', 'quantity', 'reorder_point', 'last_updated')
+    filters = InventoryFilterForm(request.GET)
+    page = Paginator(filters.apply(stock), INVENTORY_ROWS_PER_PAGE).get_page(request.GET.get('page'))
+
+    # Each category against its own forecast-driven reorder point, off the shortfall index
+    low_stock = below_reorder_point(stock)
     context = {
-        'dummy_category_inventories': dummy_category_inventories,
-        'low_stock_alerts': low_stock_alerts,
+        'page': page,
+        'filters': filters,
+        'categories': DummyCategoryInventory.objects.values_list('category_name', flat=True)
+                                                    .distinct().order_by('category_name'),
+        'low_stock_alerts': low_stock[:LOW_STOCK_ALERTS_SHOWN],
+        'low_stock_count': low_stock.count(),
     }
     return render(request, 'inventory_dashboard.html', context)
 
@@ -274,7 +368,7 @@ def edit_inventory(request, inventory_id):
     if request.method == 'POST':
         form = DummyCategoryInventoryForm(request.POST, instance=dummy_inventory)
         if form.is_valid():
-            form.save()
+            save_stock_form(form)
             messages.success(request, 'Inventory updated successfully!')
             return redirect('inventory_dashboard')
     else:
@@ -284,7 +378,7 @@ def edit_inventory(request, inventory_id):
 def delete_inventory(request, inventory_id):
     dummy_inventory = get_object_or_404(DummyCategoryInventory, id=inventory_id)
     if request.method == 'POST':
-        dummy_inventory.delete()
+        delete_stock_item(dummy_inventory)
         messages.success(request, 'Inventory deleted successfully!')
         return redirect('inventory_dashboard')
     return render(request, 'confirm_delete_inventory.html', {'dummy_inventory': dummy_inventory})
\ No newline at end of file